@@ -1,14 +1,47 @@
 import os
-import collections
+import itertools
 import logging
 import bpy
 import bmesh
-import bpyhelpers
 import mathutils
-from argument_parser_helper import common_parser, parse_arguments
-from export_to_ply_files import export_to_ply_files
-from export_to_obj_files import export_to_obj_files
+import mathutils.kdtree
+import numpy as np
+from argument_parser_helper import (
+    check_common_arguments,
+    check_sweep_arguments,
+    common_parser,
+    parse_arguments,
+)
+from export_concurrently import export_jobs, read_only_mesh_arrays, run_export_jobs
+from export_lod_pyramid import export_lod_pyramid
+from export_to_ply_files import derived_filename, point_cloud_filename
+from out_of_core_subdivision import export_out_of_core
+from mesh_to_arrays import (
+    UI_object_with_mesh_to_arrays,
+    UI_object_with_mesh_to_colors,
+    positions_to_UI_object_mesh,
+)
+from sample_point_cloud import sample_point_cloud
+from decimation import decimate, decimation_ratio
+from displacement_sweep import displaced_mesh_arrays, displacement_field
 from fill_holes import fill_holes
+from path_clearance import UI_object_with_path_to_path_graph
+from path_graph import write_path_graph
+from mesh_session import MeshSession
+from array_modifier_offset import array_modifier_offset
+from analytic_grid import grid_snapshot
+from sample_texture_colors import sample_texture_colors
+from stage_cache import Stage, StageCache, run_stages
+from stage_profiler import StageProfiler
+from mesh_topology import (
+    UI_object_with_mesh_to_topology,
+    assert_genus_number_boundaries,
+    print_topological_characteristics,
+)
+from mesh_snapshot import (
+    UI_object_with_mesh_to_snapshot,
+    snapshot_to_UI_object_mesh,
+)
 
 
 ########### Globals
@@ -19,19 +52,50 @@ logging.basicConfig(filename="Cave.log", encoding="utf-8", level=logging.INFO)
 class Cave:
     IDENTIFICATION_THRESHOLD = 5.1  # Totally empirical and ad-hoc to this Cave
     blender_pathfile = "../Blender/Cave_V6-1.blend"
+    blender_object_name = "Cave"
+    path_object_name = "Path"
+    # The modifiers whose strength is given by the sweepable parameters
+    SWEPT_MODIFIERS = {"rugosity": "Displace_structure", "relief": "Displace.walls"}
 
-    def __init__(self):
-        self.parse_arguments()
-        bpy.ops.wm.open_mainfile(filepath=Cave.blender_pathfile)
-        self.cave = bpy.data.objects["Cave"]
+    def __init__(self, argv=None, blender_object=None, **overrides):
+        """Build the cave out of the given arguments (when None, the command
+        line arguments are used). The keyword arguments override the
+        corresponding parsed arguments.
+        When provided, blender_object is used as the (pristine) source cave,
+        that is without (re)loading the Blender file."""
+        self.parse_arguments(argv, overrides)
+        self.output_filenames = list()
+        self.mesh_arrays = None
+        self.mesh_session = None
+        self.profiler = StageProfiler()
+        if blender_object is None:
+            with self.profiler.stage("load_blender_file"):
+                bpy.ops.wm.open_mainfile(filepath=Cave.blender_pathfile)
+                blender_object = bpy.data.objects[Cave.blender_object_name]
+        self.cave = blender_object
+        if self.out_of_core_patches > 0:
+            self.__generate_out_of_core()
+        elif self.sweep is not None:
+            self.__generate_sweep()
+        else:
+            self.__generate()
+        self.__write_run_report()
+
+    def __generate(self):
         self.__apply_modifiers()
         self.__replicate_to_build_grid()
+        self.__decimate_grid()
         self.__fill_holes()
+        self.__write_back_mesh_session()
         self.__assert_resulting_topology()
-        self.__export_to_ply_files()
-        self.__export_to_obj_files()
+        self.__extract_mesh_arrays()
+        self.__export()
+        self.__export_path_graph()
+        self.__export_lod_pyramid()
 
-    def parse_arguments(self):
+    @staticmethod
+    def argument_parser():
+        """The parser of the options of the cave generation"""
         parser = common_parser()
         parser.add_argument(
             "--grid_size_x",
@@ -63,7 +127,73 @@ class Cave:
             default=0.01,   # Defaulting to 0 disables the modifier
             type=float,
         )
-        args = parse_arguments(parser)
+        parser.add_argument(
+            "--rugosity_sweep",
+            help="Generate a variant per given rugosity (in place of --rugosity) "
+            "out of a single run of the pipeline, the displacement being "
+            "scaled on the vertex arrays",
+            nargs="+",
+            default=None,
+            type=float,
+        )
+        parser.add_argument(
+            "--relief_sweep",
+            help="Generate a variant per given relief (in place of --relief) out "
+            "of a single run of the pipeline (requires --rugosity 0, the "
+            "structure displacement depending on the relief)",
+            nargs="+",
+            default=None,
+            type=float,
+        )
+        parser.add_argument(
+            "--grid_engine",
+            help="How the grid is built: bridge (replicate with the Array "
+            "modifiers and bridge the identified boundaries with faces) or "
+            "analytic (transform the vertex arrays of each copy and merge the "
+            "seam vertices, whose correspondences are computed once on the "
+            "cave block, which is linear in the size of the grid)",
+            choices=["bridge", "analytic"],
+            default="bridge",
+            type=str,
+        )
+        return parser
+
+    @staticmethod
+    def check_arguments(parser, args):
+        """Fail (through the parser) when the parsed options are given invalid
+        values or unsupported combinations."""
+        check_common_arguments(parser, args)
+        if args.path_step > 0 and (args.grid_size_x > 1 or args.grid_size_y > 1):
+            parser.error("--path_step is only supported for a single cave block")
+        if args.out_of_core_patches > 0 and (
+            args.grid_size_x > 1 or args.grid_size_y > 1
+        ):
+            parser.error("--out_of_core_patches does not support grids")
+        if args.rugosity_sweep and args.relief_sweep:
+            parser.error("--rugosity_sweep and --relief_sweep are exclusive")
+        for sweep_option, sweep in (
+            ("--rugosity_sweep", args.rugosity_sweep),
+            ("--relief_sweep", args.relief_sweep),
+        ):
+            if not sweep:
+                continue
+            check_sweep_arguments(parser, args, sweep_option)
+            if args.grid_size_x > 1 or args.grid_size_y > 1:
+                parser.error(
+                    sweep_option + " is only supported for a single cave block"
+                )
+        if args.relief_sweep and args.rugosity != 0:
+            parser.error("--relief_sweep requires --rugosity 0")
+
+    def parse_arguments(self, argv=None, overrides=None):
+        parser = Cave.argument_parser()
+        args = parse_arguments(parser, argv)
+        for key, value in (overrides or {}).items():
+            setattr(args, key, value)
+        Cave.check_arguments(parser, args)
+        self.parameters = dict(vars(args))
+        self.no_run_report = args.no_run_report
+        self.grid_engine = args.grid_engine
         self.grid_size_x = args.grid_size_x
         self.grid_size_y = args.grid_size_y
         self.subdivision = args.subdivision
@@ -75,12 +205,171 @@ class Cave:
         self.verbose = args.verbose
         self.no_ply_export = args.no_ply_export
         self.no_obj_export = args.no_obj_export
+        self.color_mode = args.color_mode
+        self.cache_dir = args.cache_dir
+        self.cache_max_size = args.cache_max_size
+        self.ply_format = args.ply_format
+        self.tile_size = args.tile_size
+        self.lod_levels = args.lod_levels
+        self.point_cloud_sampling = args.point_cloud_sampling
+        self.point_count = args.point_count
+        self.point_spacing = args.point_spacing
+        self.point_cloud_seed = args.point_cloud_seed
+        self.point_cloud_format = args.point_cloud_format
+        self.quantization_bits = args.quantization_bits
+        self.path_step = args.path_step
+        self.export_workers = args.export_workers
+        self.decimate_ratio = args.decimate_ratio
+        self.target_faces = args.target_faces
+        self.target_file_size = args.target_file_size
+        self.out_of_core_patches = args.out_of_core_patches
+        # The swept parameter together with its values (None without sweep)
+        self.sweep = None
+        if args.rugosity_sweep:
+            self.sweep = ("rugosity", args.rugosity_sweep)
+        elif args.relief_sweep:
+            self.sweep = ("relief", args.relief_sweep)
 
-    def __apply_modifiers(self):
+    def __apply_modifiers(self, swept_modifier_name=None):
         """
         Parametrize the modifiers (of the basic cave block that is without the
-        grid modifiers), apply them and "bake" the vertex colors
+        grid modifiers), apply them and "bake" the vertex colors. The swept
+        modifier (when provided) is left to __generate_sweep(): the base mesh
+        of the sweep is then decimated prior to the displacement, and its
+        colors are only computed here when they do not depend on the
+        displacement (that is when texture sampled).
         """
+        # Note: baking _must_ occur after any modifier that acts on the vertices
+        # of the mesh. If, for examples, baking were to be applied before
+        # the "Subdivision" modifier, then the resulting vertices color would be
+        # sub-sampled (because it would be aligned with the density of
+        # vertices of the original mesh and not the final density resulting
+        # from the application of the "Subdivision" modifier).
+        stages = [
+            self.__modifier_stage(
+                "SimpleDeform", factor=self.slactatite_stretch_factor
+            ),
+            self.__modifier_stage("Subdivision", levels=self.subdivision),
+            self.__modifier_stage("Displace.ground"),
+            self.__modifier_stage("Displace.walls", strength=self.relief),
+            self.__modifier_stage("Displace_structure", strength=self.rugosity),
+        ]
+        stages = [stage for stage in stages if stage.name != swept_modifier_name]
+        if self.__is_decimated() and not self.__is_grid():
+            # The decimation of a grid is deferred (refer to __decimate_grid())
+            stages.append(
+                Stage("Decimate", self.__decimation_parameters(), None, self.__decimate)
+            )
+        if swept_modifier_name is None or self.color_mode != "bake":
+            stages.append(
+                Stage("bake", {"color_mode": self.color_mode}, None, self.__bake)
+            )
+        run_stages(self.cave, stages, self.__stage_cache(), self.profiler)
+
+    def __generate_sweep(self):
+        """Generate the variants of the cave that only differ by the strength of
+        their last displacement (refer to displacement_sweep.py): the pipeline
+        (up to that displacement) is run once, the displacement field is
+        computed once, and each variant is then a scaling of that field that
+        is exported as is.
+        The decimation is realized once on the base mesh, that is prior to
+        the displacement. The texture sampled colors (that only depend on the
+        UV coordinates) are shared by the variants, while baked colors are
+        baked on the geometry of each variant."""
+        parameter, strengths = self.sweep
+        modifier_name = Cave.SWEPT_MODIFIERS[parameter]
+        self.__apply_modifiers(modifier_name)
+        # The variants share the topology of the base mesh
+        self.__assert_resulting_topology()
+        with self.profiler.stage("extract_mesh_arrays"):
+            base = UI_object_with_mesh_to_arrays(self.cave)
+        with self.profiler.stage("displacement_field", self.cave):
+            self.__apply_modifier(modifier_name, strength=1.0)
+            field = displacement_field(
+                base.positions,
+                UI_object_with_mesh_to_arrays(self.cave).positions,
+                1.0,
+            )
+        for strength in strengths:
+            # The exported file names are the ones of the variant
+            setattr(self, parameter, strength)
+            with self.profiler.stage("displacement_" + str(strength)):
+                mesh_arrays = displaced_mesh_arrays(base, field, strength)
+            if self.color_mode == "bake":
+                mesh_arrays = self.__baked_variant(mesh_arrays)
+            self.mesh_arrays = read_only_mesh_arrays(mesh_arrays)
+            self.__sample_point_cloud()
+            self.__export()
+
+    def __baked_variant(self, mesh_arrays):
+        """The variant of a sweep with its colors baked on its own geometry,
+        the (lighting dependent) baked colors of the base mesh being stale"""
+        with self.profiler.stage("bake", self.cave):
+            positions_to_UI_object_mesh(mesh_arrays.positions, self.cave)
+            self.__bake()
+            return mesh_arrays._replace(colors=UI_object_with_mesh_to_colors(self.cave))
+
+    def __generate_out_of_core(self):
+        """Subdivide, displace, color and write the cave patch by patch (refer
+        to out_of_core_subdivision.py), which allows for subdivision levels
+        whose resulting mesh does not fit in memory. Only the binary PLY
+        triangulation and point cloud are written."""
+        if self.color_mode == "bake":
+            logger.warning("Out of core generation: colors are texture sampled")
+        # The stalactites stretch is a global deformation of the (small) base
+        # mesh: it is applied once and for all
+        with self.profiler.stage("SimpleDeform", self.cave):
+            self.__apply_modifier("SimpleDeform", factor=self.slactatite_stretch_factor)
+        patch_modifiers = {
+            "Subdivision": {"levels": self.subdivision},
+            "Displace.ground": {},
+            "Displace.walls": {"strength": self.relief},
+            "Displace_structure": {"strength": self.rugosity},
+        }
+        for modifier_name, modifier_parameters in patch_modifiers.items():
+            modifier = self.cave.modifiers[modifier_name]
+            for parameter, value in modifier_parameters.items():
+                setattr(modifier, parameter, value)
+        triangulation_filename = self.__export_triangulation_basename() + ".ply"
+        cloud_filename = point_cloud_filename(triangulation_filename)
+        with self.profiler.stage("out_of_core_generation"):
+            topology = export_out_of_core(
+                self.cave,
+                list(patch_modifiers),
+                self.out_of_core_patches,
+                triangulation_filename,
+                cloud_filename,
+                self.verbose,
+            )
+        self.output_filenames += [triangulation_filename, cloud_filename]
+        with self.profiler.stage("topology_assertion"):
+            assert_genus_number_boundaries(
+                topology,
+                *self.__expected_topology(),
+                "The topology of the cave is wrong."
+            )
+        if self.verbose:
+            print_topological_characteristics(topology)
+
+    def __stage_cache(self):
+        if not self.cache_dir:
+            return None
+        return StageCache(self.cache_dir, self.cache_max_size, Cave.blender_pathfile)
+
+    def __modifier_stage(self, modifier_name, **modifier_parameters):
+        """The pipeline stage parametrizing and applying the given modifier"""
+        return Stage(
+            modifier_name,
+            modifier_parameters,
+            modifier_name,
+            lambda: self.__apply_modifier(modifier_name, **modifier_parameters),
+        )
+
+    def __apply_modifier(self, modifier_name, **modifier_parameters):
+        """Parametrize the modifier of given name and apply it"""
+        modifier = self.cave.modifiers[modifier_name]
+        for parameter, value in modifier_parameters.items():
+            setattr(modifier, parameter, value)
         # The application of the modifiers is done through UI methods (prefixed
         # with "bpy.ops" as opposed to methods encountered in the bmesh module
         # that is prefixed with "bmesh."). Such methods apply on the objects
@@ -89,83 +378,146 @@ class Cave:
         with bpy.context.temp_override(
             selected_objects=[self.cave], object=self.cave, active_object=self.cave
         ):
+            bpy.ops.object.modifier_apply(modifier=modifier_name)
 
-            stalactites = self.cave.modifiers["SimpleDeform"]
-            stalactites.factor = self.slactatite_stretch_factor
-            bpy.ops.object.modifier_apply(modifier="SimpleDeform")
+    def __is_grid(self):
+        return self.grid_size_x > 1 or self.grid_size_y > 1
 
-            subdiv = self.cave.modifiers["Subdivision"]
-            subdiv.levels = self.subdivision
-            bpy.ops.object.modifier_apply(modifier="Subdivision")
+    def __is_decimated(self):
+        return self.decimate_ratio is not None or any(
+            value > 0 for value in (self.target_faces, self.target_file_size)
+        )
 
-            bpy.ops.object.modifier_apply(modifier="Displace.ground")
+    def __decimation_parameters(self):
+        return {
+            "decimate_ratio": self.decimate_ratio,
+            "target_faces": self.target_faces,
+            "target_file_size": self.target_file_size,
+        }
 
-            relief_geometric_noise = self.cave.modifiers["Displace.walls"]
-            relief_geometric_noise.strength = self.relief
-            bpy.ops.object.modifier_apply(modifier="Displace.walls")
+    def __decimate(self):
+        """Decimate the cave in order to meet the reduction constraints"""
+        ratio = decimation_ratio(
+            self.cave, self.decimate_ratio, self.target_faces, self.target_file_size
+        )
+        if ratio is None or ratio >= 1.0:
+            return
+        decimate(self.cave, ratio)
 
-            rugosity_geometric_noise = self.cave.modifiers["Displace_structure"]
-            rugosity_geometric_noise.strength = self.rugosity
-            bpy.ops.object.modifier_apply(modifier="Displace_structure")
+    def __decimate_grid(self):
+        """Decimate the (bridged) grid of caves. The decimation can not occur
+        prior to the replication (and thus to the bake) since it would alter
+        the boundaries of the cave block that the bridging identifies."""
+        if not self.__is_decimated() or not self.__is_grid():
+            return
+        # The Decimate modifier applies on the mesh
+        self.__write_back_mesh_session()
+        with self.profiler.stage("decimate", self.cave):
+            self.__decimate()
 
-            # Note: baking _must_ occur after any modifier that acts on the vertices
-            # of the mesh. If, for examples, baking were to be applied before
-            # the "Subdivision" modifier, then the resulting vertices color would be
-            # sub-sampled (because it would be aligned with the density of
-            # vertices of the original mesh and not the final density resulting
-            # from the application of the "Subdivision" modifier).
+    def __bake(self):
+        """Bake the vertex colors"""
+        if self.color_mode == "texture_sampling":
+            sample_texture_colors(self.cave)
+            return
+        with bpy.context.temp_override(
+            selected_objects=[self.cave], object=self.cave, active_object=self.cave
+        ):
             bpy.ops.object.bake(type="COMBINED")
 
     def __identifiable_boundary_indexes(self, boundaries):
         # Return (a list of) pairs of boundaries that are considered close enough to
         # be identifiable. Each boundary is first identified with the barycenter its
         # constituting vertices. Barycenters are then "compared".
+        # The barycenters are computed in bulk (out of the vertex coordinates
+        # of the mesh that the boundaries' bmesh was demoted from) and the
+        # comparisons are realized through a KD-tree neighbour query (as
+        # opposed to comparing all the pairs of barycenters), which is what
+        # allows for large grids.
+        mesh = self.cave.data
+        positions = np.empty(len(mesh.vertices) * 3, dtype=np.float64)
+        mesh.vertices.foreach_get("co", positions)
+        positions = positions.reshape(-1, 3)
+        vertex_indexes = np.fromiter(
+            (edge.verts[0].index for boundary in boundaries for edge in boundary),
+            dtype=np.int64,
+        )
+        boundary_lengths = np.fromiter(
+            (len(boundary) for boundary in boundaries), dtype=np.int64
+        )
+        offsets = np.concatenate(([0], np.cumsum(boundary_lengths)[:-1]))
+        boundaries_barycenters = (
+            np.add.reduceat(positions[vertex_indexes], offsets, axis=0)
+            / boundary_lengths[:, None]
+        )
+        # In case some visual debug of the centroid positions is required, use
+        #    from debug_utils import create_sphere
+        #    create_sphere("debug", mathutils.Matrix.Translation(centroid))
+
+        tree = mathutils.kdtree.KDTree(len(boundaries_barycenters))
+        for index, barycenter in enumerate(boundaries_barycenters):
+            tree.insert(barycenter, index)
+        tree.balance()
         result = list()
-        boundaries_barycenters = collections.deque(maxlen=len(boundaries))
-        for boundary in boundaries:
-            centroid = mathutils.Vector((0, 0, 0))
-            for edge in boundary:
-                centroid += edge.verts[0].co
-            centroid /= len(boundary)
-            boundaries_barycenters.append(centroid)
-            # In case some visual debug of the centroid positions is required, use
-            #    from debug_utils import create_sphere
-            #    create_sphere("debug", mathutils.Matrix.Translation(centroid))
-        for i in range(len(boundaries_barycenters)):
-            for j in range(i + 1, len(boundaries_barycenters)):
-                distance = (
-                    boundaries_barycenters[i] - boundaries_barycenters[j]
-                ).length
-                if distance < Cave.IDENTIFICATION_THRESHOLD:
-                    result.append((i, j))
+        for i, barycenter in enumerate(boundaries_barycenters):
+            partners = [
+                j
+                for (_, j, distance) in tree.find_range(
+                    barycenter, Cave.IDENTIFICATION_THRESHOLD
+                )
+                if j != i and distance < Cave.IDENTIFICATION_THRESHOLD
+            ]
+            if len(partners) > 1:
+                logger.warning(
+                    "Boundary "
+                    + str(i)
+                    + " has more than one candidate partner boundary: "
+                    + str(sorted(partners))
+                )
+            result.extend((i, j) for j in partners if j > i)
+        # Same ordering as a pairwise scan of the barycenters would provide
+        result.sort()
         return result
 
     def __fill_holes(self):
         """Fill in all holes (boundary edge list) with faces"""
         if not self.fill_holes:
             return
-        fill_holes(self.cave)
+        with self.profiler.stage("fill_holes"):
+            fill_holes(self.__mesh_session())
+
+    def __mesh_session(self):
+        """The (shared) MeshSession of the topological edits of the cave,
+        that is opened by the first of them"""
+        if self.mesh_session is None:
+            with self.profiler.stage("mesh_session_demotion"):
+                self.mesh_session = MeshSession(self.cave)
+        return self.mesh_session
+
+    def __write_back_mesh_session(self):
+        """Write the topological edits back to the mesh (once all of them
+        are realized)"""
+        if self.mesh_session is None:
+            return
+        with self.profiler.stage("mesh_session_write_back", self.cave):
+            self.mesh_session.write_back()
+        self.mesh_session = None
 
     def __replicate_to_build_grid(self):
         if self.grid_size_x <= 1 and self.grid_size_y <= 1:
             return
-        logger.debug(
-            "Number of boundaries prior to replications : "
-            + str(
-                len(
-                    bpyhelpers.bmesh_get_boundaries(
-                        bpyhelpers.UI_demote_UI_object_with_mesh_to_bmesh(self.cave)
-                    )
-                )
-            ),
-        )
+        if self.grid_engine == "analytic":
+            with self.profiler.stage("replication", self.cave):
+                self.__replicate_analytically()
+            return
+        self.__log_boundary_number("Number of boundaries prior to replications : ")
 
         # The application of the modifiers is done through UI methods (prefixed
         # with "bpy.ops" as opposed to methods encountered in the bmesh module
         # that is prefixed with "bmesh."). Such methods apply on the objects
         # that are selected. Hence this temporary override of the context that
         # designates the active objects.
-        with bpy.context.temp_override(
+        with self.profiler.stage("replication", self.cave), bpy.context.temp_override(
             selected_objects=[self.cave], object=self.cave, active_object=self.cave
         ):
             if self.grid_size_x > 1:
@@ -179,51 +531,101 @@ class Cave:
                 copier_y.count = self.grid_size_y
                 bpy.ops.object.modifier_apply(modifier="Array_X")
 
-            logger.debug(
-                "Number of boundaries AFTER repetitions (but before bridging): "
-                + str(
-                    len(
-                        bpyhelpers.bmesh_get_boundaries(
-                            bpyhelpers.UI_demote_UI_object_with_mesh_to_bmesh(self.cave)
-                        )
-                    )
-                ),
-            )
+        self.__log_boundary_number(
+            "Number of boundaries AFTER repetitions (but before bridging): "
+        )
+        self.__bridge_identifiable_boundaries()
+        self.__log_boundary_number("Number of boundaries AFTER BRIDGING: ")
 
-            cave_bmesh = bpyhelpers.UI_demote_UI_object_with_mesh_to_bmesh(self.cave)
-            boundaries = bpyhelpers.bmesh_get_boundaries(cave_bmesh)
-            to_identify = self.__identifiable_boundary_indexes(boundaries)
-            logger.debug(
-                "Number of boundary identifications to be realized "
-                + str(len(to_identify))
-            )
-            logger.debug("Pair of boundaries to identify " + str(to_identify))
-            for first_boundary_index, second_boundary_index in to_identify:
-                first_edges = boundaries[first_boundary_index]
-                second_edges = boundaries[second_boundary_index]
-                bmesh.ops.bridge_loops(
-                    cave_bmesh,
-                    edges=first_edges + second_edges,
-                )
-            # Note: it is KEY to write the bmesh back to the mesh, refer to
-            # https://docs.blender.org/api/current/bmesh.html#example-script
-            cave_bmesh.to_mesh(self.cave.data)
-            logger.debug(
-                "Number of boundaries AFTER BRIDGING: "
-                + str(
-                    len(
-                        bpyhelpers.bmesh_get_boundaries(
-                            bpyhelpers.UI_demote_UI_object_with_mesh_to_bmesh(self.cave)
-                        )
-                    )
-                )
+    def __replicate_analytically(self):
+        """Build the grid out of translated copies of the arrays of the cave
+        block, the identifiable boundaries of consecutive copies being merged
+        (refer to analytic_grid.py) as opposed to bridged"""
+        snapshot = UI_object_with_mesh_to_snapshot(self.cave)
+        # The "Array_Y" modifier replicates the block along the rows and the
+        # "Array_X" modifier then replicates the whole row
+        offset_x = array_modifier_offset(
+            self.cave.modifiers["Array_Y"], snapshot.positions
+        )
+        lower = snapshot.positions.min(axis=0)
+        upper = snapshot.positions.max(axis=0)
+        # The bounding box of the row is the one of its first and last copies
+        last_copy = (self.grid_size_x - 1) * offset_x
+        row_bounds = np.array([lower, upper, lower + last_copy, upper + last_copy])
+        offset_y = array_modifier_offset(self.cave.modifiers["Array_X"], row_bounds)
+        snapshot_to_UI_object_mesh(
+            grid_snapshot(
+                snapshot,
+                offset_x,
+                offset_y,
+                self.grid_size_x,
+                self.grid_size_y,
+                Cave.IDENTIFICATION_THRESHOLD,
+            ),
+            self.cave,
+        )
+        # The grid being built, the Array modifiers are not to be applied
+        for modifier_name in ("Array_Y", "Array_X"):
+            self.cave.modifiers.remove(self.cave.modifiers[modifier_name])
+
+    def __log_boundary_number(self, message):
+        # Counting the boundaries requires a full mesh extraction (unless the
+        # boundaries of an ongoing mesh session are at hand): it is thus only
+        # realized when debug logging is enabled.
+        if not logger.isEnabledFor(logging.DEBUG):
+            return
+        if self.mesh_session is not None:
+            logger.debug(message + str(len(self.mesh_session.boundaries())))
+            return
+        topology = UI_object_with_mesh_to_topology(self.cave)
+        logger.debug(message + str(topology.boundary_number))
+
+    def __bridge_identifiable_boundaries(self):
+        """Bridge (with faces) the pairs of boundaries of the cave that are
+        close enough to be identified (refer to __identifiable_boundary_indexes())
+        """
+        with self.profiler.stage("bridging"):
+            self.__bridge_boundaries()
+
+    def __bridge_boundaries(self):
+        # The bridging is the first edit of the session: its bmesh vertices
+        # are still indexed in the order of the mesh vertices (on which the
+        # boundary matching relies)
+        session = self.__mesh_session()
+        boundaries = session.boundaries()
+        to_identify = self.__identifiable_boundary_indexes(boundaries)
+        logger.debug(
+            "Number of boundary identifications to be realized " + str(len(to_identify))
+        )
+        logger.debug("Pair of boundaries to identify " + str(to_identify))
+        for first_boundary_index, second_boundary_index in to_identify:
+            first_edges = boundaries[first_boundary_index]
+            second_edges = boundaries[second_boundary_index]
+            bmesh.ops.bridge_loops(
+                session.bmesh,
+                edges=first_edges + second_edges,
             )
+        session.close_boundaries(itertools.chain.from_iterable(to_identify))
 
     def __assert_resulting_topology(self):
         """
         Assert the topology of the resulting geometry
         """
-        resulting_bmesh = bpyhelpers.UI_demote_UI_object_with_mesh_to_bmesh(self.cave)
+        with self.profiler.stage("topology_assertion"):
+            self.__assert_topology()
+
+    def __assert_topology(self):
+        # The topology is computed out of bulk extracted arrays, that is without
+        # demoting the (possibly large) mesh to a bmesh
+        topology = UI_object_with_mesh_to_topology(self.cave)
+        assert_genus_number_boundaries(
+            topology, *self.__expected_topology(), "The topology of the cave is wrong."
+        )
+        if self.verbose:
+            print_topological_characteristics(topology)
+
+    def __expected_topology(self):
+        """The expected (genus, number of boundaries) of the resulting cave"""
         # Concerning the expected genus:
         # the basic building block (the cave) genus is six. We build
         # a regular grid out of such an elementary building block:
@@ -240,14 +642,41 @@ class Cave:
             # block side sitting on the perimeter of the grid. Eventually, this is
             # equivalent to twice half of the perimeter:
             expected_boundary_number = 2 * (self.grid_size_x + self.grid_size_y)
-        bpyhelpers.bmesh_assert_genus_number_boundaries(
-            resulting_bmesh,
-            expected_genus,
-            expected_boundary_number,
-            "The topology of the cave is wrong.",
-        )
-        if self.verbose:
-            bpyhelpers.bmesh_print_topological_characteristics(resulting_bmesh)
+        return expected_genus, expected_boundary_number
+
+    def __extract_mesh_arrays(self):
+        """Extract (once) the resulting geometry shared by all the exports"""
+        if self.no_ply_export and self.no_obj_export and self.tile_size <= 0:
+            return
+        with self.profiler.stage("extract_mesh_arrays"):
+            # The geometry is shared (read only) by the concurrent writers
+            self.mesh_arrays = read_only_mesh_arrays(
+                UI_object_with_mesh_to_arrays(self.cave)
+            )
+        self.__sample_point_cloud()
+
+    def __sample_point_cloud(self):
+        with self.profiler.stage("sample_point_cloud"):
+            self.point_cloud = sample_point_cloud(
+                self.mesh_arrays,
+                self.point_cloud_sampling,
+                self.point_count,
+                self.point_spacing,
+                self.point_cloud_seed,
+            )
+
+    def resulting_mesh_arrays(self):
+        """The resulting geometry as (read only) arrays, that are extracted
+        (once) when no export already required them"""
+        if self.out_of_core_patches > 0:
+            raise ValueError(
+                "The out of core generation holds no resulting geometry in memory"
+            )
+        if self.mesh_arrays is None:
+            self.mesh_arrays = read_only_mesh_arrays(
+                UI_object_with_mesh_to_arrays(self.cave)
+            )
+        return self.mesh_arrays
 
     def __export_triangulation_basename(self):
         filename = (
@@ -267,18 +696,92 @@ class Cave:
         filename += "_triangulation"
         return os.path.join(self.outputdir, filename)
 
-    def __export_to_ply_files(self):
-        """Write the resulting PLY files"""
-        ply_triangulation_filename = self.__export_triangulation_basename() + ".ply"
-        print(ply_triangulation_filename)
-        export_to_ply_files(ply_triangulation_filename, self.verbose)
+    def __export(self):
+        """Write (concurrently) all the requested outputs of the resulting
+        geometry, each output being written by its own independent writer"""
+        if self.no_ply_export and self.no_obj_export and self.tile_size <= 0:
+            return
+        jobs = export_jobs(
+            self.mesh_arrays,
+            self.__export_triangulation_basename(),
+            not self.no_ply_export,
+            not self.no_obj_export,
+            self.ply_format,
+            self.point_cloud,
+            derived_filename(self.__export_triangulation_basename(), "tiles"),
+            self.tile_size,
+            self.point_cloud_format,
+            self.quantization_bits,
+        )
+        with self.profiler.stage("export"):
+            written = run_export_jobs(jobs, self.export_workers, self.verbose)
+        for filenames, seconds in written:
+            self.profiler.record("export " + os.path.basename(filenames[0]), seconds)
+        self.output_filenames += [
+            filename for job in jobs for filename in job.filenames
+        ]
+
+    def __export_path_graph(self):
+        """Write the resampled Path object together with the clearance of its
+        samples within the resulting geometry (refer to path_clearance.py)"""
+        if self.path_step <= 0:
+            return
+        UI_path = bpy.data.objects.get(Cave.path_object_name)
+        if UI_path is None:
+            raise ValueError(
+                "No " + Cave.path_object_name + " object to export the path of"
+            )
+        filename = (
+            derived_filename(self.__export_triangulation_basename(), "path_graph")
+            + ".npz"
+        )
+        with self.profiler.stage("path_graph"):
+            write_path_graph(
+                filename,
+                UI_object_with_path_to_path_graph(
+                    UI_path, self.resulting_mesh_arrays(), self.path_step
+                ),
+                self.path_step,
+            )
+        self.output_filenames.append(filename)
+
+    def __export_lod_pyramid(self):
+        """Write the coarser levels of detail together with their manifest"""
+        if self.lod_levels <= 1 or (self.no_ply_export and self.no_obj_export):
+            return
+        with self.profiler.stage("export_lod_pyramid"):
+            self.output_filenames += export_lod_pyramid(
+                self.cave,
+                self.mesh_arrays,
+                self.__export_triangulation_basename(),
+                self.lod_levels,
+                self.ply_format,
+                not self.no_ply_export,
+                not self.no_obj_export,
+                self.verbose,
+                self.point_cloud,
+                self.point_cloud_sampling,
+                self.point_count,
+                self.point_spacing,
+                self.point_cloud_seed,
+                self.point_cloud_format,
+                self.quantization_bits,
+                self.export_workers,
+            )
 
-    def __export_to_obj_files(self):
-        """Write the resulting OBJ files"""
-        if self.no_obj_export:
+    def __write_run_report(self):
+        """Write the (JSON) report of the per stage timings, memory usage and
+        mesh sizes next to the resulting files"""
+        if self.no_run_report:
             return
-        obj_triangulation_filename = self.__export_triangulation_basename() + ".obj"
-        export_to_obj_files(obj_triangulation_filename, self.verbose)
+        report_filename = (
+            derived_filename(self.__export_triangulation_basename(), "run_report")
+            + ".json"
+        )
+        self.profiler.write_report(
+            report_filename, self.parameters, self.output_filenames
+        )
+        self.report_filename = report_filename
 
 
 if __name__ == "__main__":
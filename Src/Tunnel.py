@@ -1,26 +1,82 @@
 import os
 import logging
 import bpy
-import bpyhelpers
-from argument_parser_helper import common_parser, parse_arguments
-from export_to_ply_files import export_to_ply_files
-from export_to_obj_files import export_to_obj_files
+from argument_parser_helper import (
+    check_common_arguments,
+    check_sweep_arguments,
+    common_parser,
+    parse_arguments,
+)
+from export_concurrently import export_jobs, read_only_mesh_arrays, run_export_jobs
+from export_lod_pyramid import export_lod_pyramid
+from export_to_ply_files import derived_filename, point_cloud_filename
+from out_of_core_subdivision import export_out_of_core
+from mesh_to_arrays import (
+    UI_object_with_mesh_to_arrays,
+    UI_object_with_mesh_to_colors,
+    positions_to_UI_object_mesh,
+)
+from sample_point_cloud import sample_point_cloud
+from decimation import decimate, decimation_ratio
+from displacement_sweep import displaced_mesh_arrays, displacement_field
 from fill_holes import fill_holes
+from path_clearance import UI_object_with_path_to_path_graph
+from path_graph import write_path_graph
+from mesh_session import MeshSession
+from sample_texture_colors import sample_texture_colors
+from stage_cache import Stage, StageCache, run_stages
+from stage_profiler import StageProfiler
+from mesh_topology import (
+    UI_object_with_mesh_to_topology,
+    assert_genus_number_boundaries,
+    print_topological_characteristics,
+)
+
+logger = logging.getLogger(__name__)
+
 
 class Tunnel:
     blender_pathfile = "../Blender/Tunnel_V7-1.blend"
+    blender_object_name = "Tunnel"
+    path_object_name = "Path"
+    # The modifiers whose strength is given by the sweepable parameters
+    SWEPT_MODIFIERS = {"relief": "Displace"}
+
+    def __init__(self, argv=None, blender_object=None, **overrides):
+        """Build the tunnel out of the given arguments (when None, the command
+        line arguments are used). The keyword arguments override the
+        corresponding parsed arguments.
+        When provided, blender_object is used as the (pristine) source tunnel,
+        that is without (re)loading the Blender file."""
+        self.parse_aguments(argv, overrides)
+        self.output_filenames = list()
+        self.mesh_arrays = None
+        self.profiler = StageProfiler()
+        if blender_object is None:
+            with self.profiler.stage("load_blender_file"):
+                bpy.ops.wm.open_mainfile(filepath=Tunnel.blender_pathfile)
+                blender_object = bpy.data.objects[Tunnel.blender_object_name]
+        self.tunnel = blender_object
+        if self.out_of_core_patches > 0:
+            self.__generate_out_of_core()
+        elif self.sweep is not None:
+            self.__generate_sweep()
+        else:
+            self.__generate()
+        self.__write_run_report()
 
-    def __init__(self):
-        self.parse_aguments()
-        bpy.ops.wm.open_mainfile(filepath=Tunnel.blender_pathfile)
-        self.tunnel = bpy.data.objects["Tunnel"]
+    def __generate(self):
         self.__apply_modifiers()
         self.__fill_holes()
         self.__assert_resulting_topology()
-        self.__export_to_ply_files()
-        self.__export_to_obj_files()
+        self.__extract_mesh_arrays()
+        self.__export()
+        self.__export_path_graph()
+        self.__export_lod_pyramid()
 
-    def parse_aguments(self):
+    @staticmethod
+    def argument_parser():
+        """The parser of the options of the tunnel generation"""
         parser = common_parser()
         parser.add_argument(
             "--relief",
@@ -28,7 +84,34 @@ class Tunnel:
             default=0.01,  # Defaulting to 0 (quietly) disables the modifier
             type=float,
         )
-        args = parse_arguments(parser)
+        parser.add_argument(
+            "--relief_sweep",
+            help="Generate a variant per given relief (in place of --relief) out "
+            "of a single run of the pipeline, the displacement being scaled on "
+            "the vertex arrays (the decimation being realized prior to the "
+            "displacement)",
+            nargs="+",
+            default=None,
+            type=float,
+        )
+        return parser
+
+    @staticmethod
+    def check_arguments(parser, args):
+        """Fail (through the parser) when the parsed options are given invalid
+        values or unsupported combinations."""
+        check_common_arguments(parser, args)
+        if args.relief_sweep:
+            check_sweep_arguments(parser, args, "--relief_sweep")
+
+    def parse_aguments(self, argv=None, overrides=None):
+        parser = Tunnel.argument_parser()
+        args = parse_arguments(parser, argv)
+        for key, value in (overrides or {}).items():
+            setattr(args, key, value)
+        Tunnel.check_arguments(parser, args)
+        self.parameters = dict(vars(args))
+        self.no_run_report = args.no_run_report
         self.subdivision = args.subdivision
         self.relief = args.relief
         self.fill_holes = args.fill_holes
@@ -36,11 +119,167 @@ class Tunnel:
         self.verbose = args.verbose
         self.no_ply_export = args.no_ply_export
         self.no_obj_export = args.no_obj_export
+        self.color_mode = args.color_mode
+        self.cache_dir = args.cache_dir
+        self.cache_max_size = args.cache_max_size
+        self.ply_format = args.ply_format
+        self.tile_size = args.tile_size
+        self.lod_levels = args.lod_levels
+        self.point_cloud_sampling = args.point_cloud_sampling
+        self.point_count = args.point_count
+        self.point_spacing = args.point_spacing
+        self.point_cloud_seed = args.point_cloud_seed
+        self.point_cloud_format = args.point_cloud_format
+        self.quantization_bits = args.quantization_bits
+        self.path_step = args.path_step
+        self.export_workers = args.export_workers
+        self.decimate_ratio = args.decimate_ratio
+        self.target_faces = args.target_faces
+        self.target_file_size = args.target_file_size
+        self.out_of_core_patches = args.out_of_core_patches
+        # The swept parameter together with its values (None without sweep)
+        self.sweep = None
+        if args.relief_sweep:
+            self.sweep = ("relief", args.relief_sweep)
 
-    def __apply_modifiers(self):
+    def __apply_modifiers(self, swept_modifier_name=None):
         """
         Parametrize the modifiers, apply them and "bake" the vertex colors.
+        The swept modifier (when provided) is left to __generate_sweep(): the
+        base mesh of the sweep is then decimated prior to the displacement,
+        and its colors are only computed here when they do not depend on the
+        displacement (that is when texture sampled).
         """
+        # Note: baking _must_ occur after any modifier that acts on the vertices
+        # of the mesh. If, for examples, baking were to be applied before
+        # the "Subdivision" modifier, then the resulting vertices color would be
+        # sub-sampled (because it would be aligned with the density of
+        # vertices of the original mesh and not the final density resulting
+        # from the application of the "Subdivision" modifier).
+        stages = [
+            self.__modifier_stage("Subdivision", levels=self.subdivision),
+            self.__modifier_stage("Displace", strength=self.relief),
+            Stage(
+                "Decimate",
+                {
+                    "decimate_ratio": self.decimate_ratio,
+                    "target_faces": self.target_faces,
+                    "target_file_size": self.target_file_size,
+                },
+                "Decimate",
+                self.__decimate,
+            ),
+            Stage("bake", {"color_mode": self.color_mode}, None, self.__bake),
+        ]
+        if swept_modifier_name is not None:
+            skipped = [swept_modifier_name]
+            if self.color_mode == "bake":
+                skipped.append("bake")
+            stages = [stage for stage in stages if stage.name not in skipped]
+        run_stages(self.tunnel, stages, self.__stage_cache(), self.profiler)
+
+    def __generate_sweep(self):
+        """Generate the variants of the tunnel that only differ by the strength
+        of their displacement (refer to displacement_sweep.py): the pipeline
+        (up to that displacement) is run once, the displacement field is
+        computed once, and each variant is then a scaling of that field that
+        is exported as is.
+        The decimation is realized once on the base mesh, that is prior to
+        the displacement. The texture sampled colors (that only depend on the
+        UV coordinates) are shared by the variants, while baked colors are
+        baked on the geometry of each variant."""
+        parameter, strengths = self.sweep
+        modifier_name = Tunnel.SWEPT_MODIFIERS[parameter]
+        self.__apply_modifiers(modifier_name)
+        # The variants share the topology of the base mesh
+        self.__assert_resulting_topology()
+        with self.profiler.stage("extract_mesh_arrays"):
+            base = UI_object_with_mesh_to_arrays(self.tunnel)
+        with self.profiler.stage("displacement_field", self.tunnel):
+            self.__apply_modifier(modifier_name, strength=1.0)
+            field = displacement_field(
+                base.positions,
+                UI_object_with_mesh_to_arrays(self.tunnel).positions,
+                1.0,
+            )
+        for strength in strengths:
+            # The exported file names are the ones of the variant
+            setattr(self, parameter, strength)
+            with self.profiler.stage("displacement_" + str(strength)):
+                mesh_arrays = displaced_mesh_arrays(base, field, strength)
+            if self.color_mode == "bake":
+                mesh_arrays = self.__baked_variant(mesh_arrays)
+            self.mesh_arrays = read_only_mesh_arrays(mesh_arrays)
+            self.__sample_point_cloud()
+            self.__export()
+
+    def __baked_variant(self, mesh_arrays):
+        """The variant of a sweep with its colors baked on its own geometry,
+        the (lighting dependent) baked colors of the base mesh being stale"""
+        with self.profiler.stage("bake", self.tunnel):
+            positions_to_UI_object_mesh(mesh_arrays.positions, self.tunnel)
+            self.__bake()
+            return mesh_arrays._replace(
+                colors=UI_object_with_mesh_to_colors(self.tunnel)
+            )
+
+    def __generate_out_of_core(self):
+        """Subdivide, displace, color and write the tunnel patch by patch
+        (refer to out_of_core_subdivision.py), which allows for subdivision
+        levels whose resulting mesh does not fit in memory. Only the binary PLY
+        triangulation and point cloud are written."""
+        # The decimation is a global operation (that can not be realized per
+        # patch): its modifier is left unapplied
+        if self.color_mode == "bake":
+            logger.warning("Out of core generation: colors are texture sampled")
+        patch_modifiers = {
+            "Subdivision": {"levels": self.subdivision},
+            "Displace": {"strength": self.relief},
+        }
+        for modifier_name, modifier_parameters in patch_modifiers.items():
+            modifier = self.tunnel.modifiers[modifier_name]
+            for parameter, value in modifier_parameters.items():
+                setattr(modifier, parameter, value)
+        triangulation_filename = self.__export_triangulation_basename() + ".ply"
+        cloud_filename = point_cloud_filename(triangulation_filename)
+        with self.profiler.stage("out_of_core_generation"):
+            topology = export_out_of_core(
+                self.tunnel,
+                list(patch_modifiers),
+                self.out_of_core_patches,
+                triangulation_filename,
+                cloud_filename,
+                self.verbose,
+            )
+        self.output_filenames += [triangulation_filename, cloud_filename]
+        with self.profiler.stage("topology_assertion"):
+            assert_genus_number_boundaries(
+                topology,
+                *self.__expected_topology(),
+                "The topology of the tunnel system is wrong.",
+            )
+        if self.verbose:
+            print_topological_characteristics(topology)
+
+    def __stage_cache(self):
+        if not self.cache_dir:
+            return None
+        return StageCache(self.cache_dir, self.cache_max_size, Tunnel.blender_pathfile)
+
+    def __modifier_stage(self, modifier_name, **modifier_parameters):
+        """The pipeline stage parametrizing and applying the given modifier"""
+        return Stage(
+            modifier_name,
+            modifier_parameters,
+            modifier_name,
+            lambda: self.__apply_modifier(modifier_name, **modifier_parameters),
+        )
+
+    def __apply_modifier(self, modifier_name, **modifier_parameters):
+        """Parametrize the modifier of given name and apply it"""
+        modifier = self.tunnel.modifiers[modifier_name]
+        for parameter, value in modifier_parameters.items():
+            setattr(modifier, parameter, value)
         # The application of the modifiers is done through UI methods (prefixed
         # with "bpy.ops" as opposed to methods encountered in the bmesh module
         # that is prefixed with "bmesh."). Such methods apply on the objects
@@ -51,48 +290,97 @@ class Tunnel:
             object=self.tunnel,
             active_object=self.tunnel,
         ):
+            bpy.ops.object.modifier_apply(modifier=modifier_name)
 
-            subdiv = self.tunnel.modifiers["Subdivision"]
-            subdiv.levels = self.subdivision
-            bpy.ops.object.modifier_apply(modifier="Subdivision")
-            relief_geometric_noise = self.tunnel.modifiers["Displace"]
-            relief_geometric_noise.strength = self.relief
-            bpy.ops.object.modifier_apply(modifier="Displace")
-            ## FIXME: provide a parameter
-            bpy.ops.object.modifier_apply(modifier="Decimate")
-
-            # Note: baking _must_ occur after any modifier that acts on the vertices
-            # of the mesh. If, for examples, baking were to be applied before
-            # the "Subdivision" modifier, then the resulting vertices color would be
-            # sub-sampled (because it would be aligned with the density of
-            # vertices of the original mesh and not the final density resulting
-            # from the application of the "Subdivision" modifier).
+    def __decimate(self):
+        """Decimate the tunnel in order to meet the reduction constraints (the
+        Decimate modifier is applied as is, that is with the ratio of the
+        Blender file, when no constraint is given)"""
+        ratio = decimation_ratio(
+            self.tunnel, self.decimate_ratio, self.target_faces, self.target_file_size
+        )
+        if ratio is None:
+            self.__apply_modifier("Decimate")
+            return
+        decimate(self.tunnel, ratio)
+
+    def __bake(self):
+        """Bake the vertex colors"""
+        if self.color_mode == "texture_sampling":
+            sample_texture_colors(self.tunnel)
+            return
+        with bpy.context.temp_override(
+            selected_objects=[self.tunnel],
+            object=self.tunnel,
+            active_object=self.tunnel,
+        ):
             bpy.ops.object.bake(type="COMBINED")
 
     def __fill_holes(self):
         """Fill in all holes (boundary edge list) with faces"""
         if not self.fill_holes:
             return
-        fill_holes(self.tunnel)
+        with self.profiler.stage("fill_holes"):
+            mesh_session = MeshSession(self.tunnel)
+            fill_holes(mesh_session)
+        with self.profiler.stage("mesh_session_write_back", self.tunnel):
+            mesh_session.write_back()
 
     def __assert_resulting_topology(self):
         """
         Assert the topology of the resulting geometry
         """
-        if self.fill_holes:
-            expected_boundary_number = 0
-        else:
-            expected_boundary_number = 2
-
-        tunnel_bmesh = bpyhelpers.UI_demote_UI_object_with_mesh_to_bmesh(self.tunnel)
-        bpyhelpers.bmesh_assert_genus_number_boundaries(
-            tunnel_bmesh,
-            25,
-            expected_boundary_number,
-            "The topology of the tunnel system is wrong.",
-        )
+        with self.profiler.stage("topology_assertion"):
+            topology = UI_object_with_mesh_to_topology(self.tunnel)
+            assert_genus_number_boundaries(
+                topology,
+                *self.__expected_topology(),
+                "The topology of the tunnel system is wrong.",
+            )
         if self.verbose:
-            bpyhelpers.bmesh_print_topological_characteristics(tunnel_bmesh)
+            print_topological_characteristics(topology)
+
+    def __expected_topology(self):
+        """The expected (genus, number of boundaries) of the resulting tunnel"""
+        # The tunnel system has two (open) ends, that are closed when filling
+        # the holes
+        if self.fill_holes:
+            return 25, 0
+        return 25, 2
+
+    def __extract_mesh_arrays(self):
+        """Extract (once) the resulting geometry shared by all the exports"""
+        if self.no_ply_export and self.no_obj_export and self.tile_size <= 0:
+            return
+        with self.profiler.stage("extract_mesh_arrays"):
+            # The geometry is shared (read only) by the concurrent writers
+            self.mesh_arrays = read_only_mesh_arrays(
+                UI_object_with_mesh_to_arrays(self.tunnel)
+            )
+        self.__sample_point_cloud()
+
+    def __sample_point_cloud(self):
+        with self.profiler.stage("sample_point_cloud"):
+            self.point_cloud = sample_point_cloud(
+                self.mesh_arrays,
+                self.point_cloud_sampling,
+                self.point_count,
+                self.point_spacing,
+                self.point_cloud_seed,
+            )
+
+    def resulting_mesh_arrays(self):
+        """The resulting geometry as (read only) arrays, that are extracted
+        (once) when no export already required them"""
+        if self.out_of_core_patches > 0:
+            raise ValueError(
+                "The out of core generation holds no resulting geometry in memory"
+            )
+        if self.mesh_arrays is None:
+            self.mesh_arrays = read_only_mesh_arrays(
+                UI_object_with_mesh_to_arrays(self.tunnel)
+            )
+        return self.mesh_arrays
 
     def __export_triangulation_basename(self):
         filename = "tunnel_sub_" + str(self.subdivision)
@@ -102,23 +390,95 @@ class Tunnel:
         filename += "_relief_" + str(self.relief)
         return os.path.join(self.outputdir, filename)
 
-    def __export_to_ply_files(self):
-        """Write the resulting PLY files"""
-        if self.no_ply_export:
+    def __export(self):
+        """Write (concurrently) all the requested outputs of the resulting
+        geometry, each output being written by its own independent writer"""
+        if self.no_ply_export and self.no_obj_export and self.tile_size <= 0:
             return
-        ply_triangulation_filename = self.__export_triangulation_basename() + ".ply"
-        export_to_ply_files(ply_triangulation_filename, self.verbose)
+        jobs = export_jobs(
+            self.mesh_arrays,
+            self.__export_triangulation_basename(),
+            not self.no_ply_export,
+            not self.no_obj_export,
+            self.ply_format,
+            self.point_cloud,
+            derived_filename(self.__export_triangulation_basename(), "tiles"),
+            self.tile_size,
+            self.point_cloud_format,
+            self.quantization_bits,
+        )
+        with self.profiler.stage("export"):
+            written = run_export_jobs(jobs, self.export_workers, self.verbose)
+        for filenames, seconds in written:
+            self.profiler.record("export " + os.path.basename(filenames[0]), seconds)
+        self.output_filenames += [
+            filename for job in jobs for filename in job.filenames
+        ]
 
-    def __export_to_obj_files(self):
-        """Write the resulting OBJ files"""
-        if self.no_obj_export:
+    def __export_path_graph(self):
+        """Write the resampled Path object together with the clearance of its
+        samples within the resulting geometry (refer to path_clearance.py)"""
+        if self.path_step <= 0:
             return
-        obj_triangulation_filename = self.__export_triangulation_basename() + ".obj"
-        export_to_obj_files(obj_triangulation_filename, self.verbose)
+        UI_path = bpy.data.objects.get(Tunnel.path_object_name)
+        if UI_path is None:
+            raise ValueError(
+                "No " + Tunnel.path_object_name + " object to export the path of"
+            )
+        filename = (
+            derived_filename(self.__export_triangulation_basename(), "path_graph")
+            + ".npz"
+        )
+        with self.profiler.stage("path_graph"):
+            write_path_graph(
+                filename,
+                UI_object_with_path_to_path_graph(
+                    UI_path, self.resulting_mesh_arrays(), self.path_step
+                ),
+                self.path_step,
+            )
+        self.output_filenames.append(filename)
+
+    def __export_lod_pyramid(self):
+        """Write the coarser levels of detail together with their manifest"""
+        if self.lod_levels <= 1 or (self.no_ply_export and self.no_obj_export):
+            return
+        with self.profiler.stage("export_lod_pyramid"):
+            self.output_filenames += export_lod_pyramid(
+                self.tunnel,
+                self.mesh_arrays,
+                self.__export_triangulation_basename(),
+                self.lod_levels,
+                self.ply_format,
+                not self.no_ply_export,
+                not self.no_obj_export,
+                self.verbose,
+                self.point_cloud,
+                self.point_cloud_sampling,
+                self.point_count,
+                self.point_spacing,
+                self.point_cloud_seed,
+                self.point_cloud_format,
+                self.quantization_bits,
+                self.export_workers,
+            )
+
+    def __write_run_report(self):
+        """Write the (JSON) report of the per stage timings, memory usage and
+        mesh sizes next to the resulting files"""
+        if self.no_run_report:
+            return
+        report_filename = (
+            derived_filename(self.__export_triangulation_basename(), "run_report")
+            + ".json"
+        )
+        self.profiler.write_report(
+            report_filename, self.parameters, self.output_filenames
+        )
+        self.report_filename = report_filename
 
 
 if __name__ == "__main__":
-    logger = logging.getLogger(__name__)
     logging.basicConfig(filename="tunnel.log", encoding="utf-8", level=logging.INFO)
     # The instantiation does it all
     tunnel = Tunnel()
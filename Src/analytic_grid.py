@@ -0,0 +1,210 @@
+import numpy as np
+
+
+def _edge_keys(first, second, vertex_number):
+    first, second = np.minimum(first, second), np.maximum(first, second)
+    return first.astype(np.int64) * vertex_number + second
+
+
+def boundary_loops(snapshot):
+    """The boundaries of a mesh as loops of consecutive vertices.
+
+    Args:
+        snapshot (MeshSnapshot): the mesh
+    Returns:
+        list of (numpy array, numpy array): for each boundary, its (ordered)
+           vertex indices and the indices of its edges (the edge k joining
+           the vertices k and k + 1)
+    """
+    vertex_number = len(snapshot.positions)
+    sizes = snapshot.polygon_sizes
+    starts = np.concatenate(([0], np.cumsum(sizes)[:-1]))
+    local_corners = np.arange(len(snapshot.corner_vertices)) - np.repeat(starts, sizes)
+    corners = np.arange(len(snapshot.corner_vertices))
+    next_corners = np.where(
+        local_corners + 1 == np.repeat(sizes, sizes),
+        corners - local_corners,
+        corners + 1,
+    )
+    origins = snapshot.corner_vertices
+    targets = snapshot.corner_vertices[next_corners]
+    corner_keys = _edge_keys(origins, targets, vertex_number)
+    keys, counts = np.unique(corner_keys, return_counts=True)
+    boundary = counts[np.searchsorted(keys, corner_keys)] == 1
+    # Following the (face oriented) boundary edges walks along the boundaries
+    next_vertices = np.full(vertex_number, -1, dtype=np.int64)
+    next_vertices[origins[boundary]] = targets[boundary]
+
+    edge_keys = _edge_keys(snapshot.edges[:, 0], snapshot.edges[:, 1], vertex_number)
+    edge_order = np.argsort(edge_keys)
+
+    loops = list()
+    visited = np.zeros(vertex_number, dtype=bool)
+    for start in np.flatnonzero(next_vertices >= 0):
+        if visited[start]:
+            continue
+        loop = list()
+        vertex = start
+        while not visited[vertex]:
+            visited[vertex] = True
+            loop.append(vertex)
+            vertex = next_vertices[vertex]
+        loop = np.array(loop, dtype=np.int64)
+        loop_keys = _edge_keys(loop, np.roll(loop, -1), vertex_number)
+        loop_edges = edge_order[
+            np.searchsorted(edge_keys, loop_keys, sorter=edge_order)
+        ]
+        loops.append((loop, loop_edges))
+    return loops
+
+
+def seam_vertex_pairs(snapshot, loops, offset, threshold):
+    """The correspondence between the boundary vertices of a mesh and the ones
+    of its copy translated by the given offset, for the pairs of boundaries
+    whose barycenters are closer than threshold.
+
+    The correspondence is computed once on the (single) mesh and then holds
+    between any two consecutive copies of a grid.
+
+    Args:
+        snapshot (MeshSnapshot): the replicated mesh
+        loops (list): its boundary loops (refer to boundary_loops())
+        offset (numpy array): the (3,) translation between consecutive copies
+        threshold (float): the maximal distance between the barycenters of
+           two identified boundaries
+    Returns:
+        (numpy array, numpy array, numpy array): the vertices of a copy, the
+           corresponding vertices of the next copy, and the boundary edges of
+           the next copy that are merged (and thus dropped)
+    """
+    barycenters = np.array(
+        [snapshot.positions[loop].mean(axis=0) for loop, _ in loops]
+    ).reshape(-1, 3)
+    kept = list()
+    merged = list()
+    dropped_edges = list()
+    for first, (first_loop, _) in enumerate(loops):
+        distances = np.linalg.norm(barycenters + offset - barycenters[first], axis=1)
+        for second in np.flatnonzero(distances < threshold):
+            if second == first:
+                continue
+            second_loop, second_edges = loops[second]
+            if len(second_loop) != len(first_loop):
+                raise ValueError(
+                    "Identified boundaries of distinct vertex numbers ("
+                    + str(len(first_loop))
+                    + " and "
+                    + str(len(second_loop))
+                    + ") can not be merged"
+                )
+            first_positions = snapshot.positions[first_loop]
+            second_positions = snapshot.positions[second_loop] + offset
+            # The loops of two identified boundaries run in opposite
+            # directions: the best of both directions (from the vertex the
+            # closest to the first one) is retained
+            start = np.argmin(
+                np.linalg.norm(second_positions - first_positions[0], axis=1)
+            )
+            best = None
+            for direction in (-1, 1):
+                order = (start + direction * np.arange(len(second_loop))) % len(
+                    second_loop
+                )
+                cost = np.sum(
+                    np.linalg.norm(second_positions[order] - first_positions, axis=1)
+                )
+                if best is None or cost < best[0]:
+                    best = (cost, order)
+            kept.append(first_loop)
+            merged.append(second_loop[best[1]])
+            dropped_edges.append(second_edges)
+    if not kept:
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty, empty
+    return np.concatenate(kept), np.concatenate(merged), np.concatenate(dropped_edges)
+
+
+def grid_snapshot(snapshot, offset_x, offset_y, grid_size_x, grid_size_y, threshold):
+    """The grid of copies of a mesh, the identified boundaries of consecutive
+    copies being merged (vertex to vertex, at their midpoints) as opposed to
+    bridged with faces.
+
+    The copies are laid out the way the Array modifiers replicate the mesh:
+    first along offset_x, then (the whole row) along offset_y. The seam
+    vertex correspondences being computed once on the single mesh (refer to
+    seam_vertex_pairs()), the construction of the grid is a mere index
+    remapping of the copies, whose cost is linear in the size of the grid.
+
+    Args:
+        snapshot (MeshSnapshot): the replicated mesh
+        offset_x (numpy array): the (3,) translation along the rows
+        offset_y (numpy array): the (3,) translation between the rows
+        grid_size_x (int): the number of copies of a row
+        grid_size_y (int): the number of rows
+        threshold (float): the maximal distance between the barycenters of
+           two identified boundaries
+    Returns:
+        MeshSnapshot: the grid
+    """
+    vertex_number = len(snapshot.positions)
+    edge_number = len(snapshot.edges)
+    tile_number = grid_size_x * grid_size_y
+    tiles_x = np.tile(np.arange(grid_size_x), grid_size_y)
+    tiles_y = np.repeat(np.arange(grid_size_y), grid_size_x)
+    offsets = np.outer(tiles_x, offset_x) + np.outer(tiles_y, offset_y)
+    positions = (snapshot.positions[None] + offsets[:, None]).reshape(-1, 3)
+
+    loops = boundary_loops(snapshot)
+    remap = np.arange(tile_number * vertex_number)
+    kept_edges = np.ones(tile_number * edge_number, dtype=bool)
+    # The copies followed by a copy along each axis and the index step
+    # between consecutive copies along that axis
+    for offset, tiles, tile_step in (
+        (offset_x, np.flatnonzero(tiles_x < grid_size_x - 1), 1),
+        (offset_y, np.flatnonzero(tiles_y < grid_size_y - 1), grid_size_x),
+    ):
+        if len(tiles) == 0:
+            continue
+        next_tiles = tiles + tile_step
+        kept, merged, dropped_edges = seam_vertex_pairs(
+            snapshot, loops, np.asarray(offset), threshold
+        )
+        kept = (tiles[:, None] * vertex_number + kept).ravel()
+        merged = (next_tiles[:, None] * vertex_number + merged).ravel()
+        positions[kept] = (positions[kept] + positions[merged]) / 2
+        remap[merged] = kept
+        kept_edges[(next_tiles[:, None] * edge_number + dropped_edges).ravel()] = False
+    kept_vertices = remap == np.arange(len(remap))
+    new_indices = np.cumsum(kept_vertices) - 1
+    vertex_indices = new_indices[remap]
+
+    def replicated(values):
+        return np.concatenate([values] * tile_number)
+
+    tile_vertex_offsets = np.arange(tile_number) * vertex_number
+    corner_vertices = vertex_indices[
+        (tile_vertex_offsets[:, None] + snapshot.corner_vertices).ravel()
+    ]
+    edges = vertex_indices[
+        (tile_vertex_offsets[:, None, None] + snapshot.edges).reshape(-1, 2)
+    ][kept_edges]
+    attributes = dict()
+    for name, (domain, data_type, values) in snapshot.attributes.items():
+        values = replicated(values)
+        if domain == "POINT":
+            values = values[kept_vertices]
+        elif domain == "EDGE":
+            values = values[kept_edges]
+        attributes[name] = (domain, data_type, values)
+    vertex_groups = {
+        name: replicated(weights)[kept_vertices]
+        for name, weights in snapshot.vertex_groups.items()
+    }
+    return snapshot._replace(
+        positions=positions[kept_vertices].astype(np.float32),
+        edges=edges.astype(np.int32),
+        polygon_sizes=replicated(snapshot.polygon_sizes),
+        corner_vertices=corner_vertices.astype(np.int32),
+        attributes=attributes,
+        vertex_groups=vertex_groups,
+    )
@@ -20,6 +20,16 @@ def common_parser():
         default=1,
         type=int,
     )
+    parser.add_argument(
+        "--out_of_core_patches",
+        help="When strictly positive, subdivide, displace and color the base "
+        "mesh by patches of (at most) that number of base faces, each patch "
+        "being streamed to the binary PLY files as soon as computed, which "
+        "allows for subdivision levels whose mesh does not fit in memory "
+        "(colors are then texture sampled and the other outputs skipped).",
+        default=0,
+        type=int,
+    )
     parser.add_argument(
         "--outputdir",
         help="Directory for resulting PLY files",
@@ -36,6 +46,147 @@ def common_parser():
         help="Do not export to OBJ files.",
         action="store_true",
     )
+    parser.add_argument(
+        "--no-run_report",
+        "--no-run-report",
+        help="Do not write the (JSON) run report holding the per stage "
+        "timings, memory usage and mesh sizes.",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--export_workers",
+        help="Number of threads concurrently writing the outputs (PLY, OBJ "
+        "triangulations and point clouds, tiles). 0 means one per output and "
+        "1 writes them in sequence.",
+        default=0,
+        type=int,
+    )
+    parser.add_argument(
+        "--ply-format",
+        help="Encoding of the resulting PLY files: binary (little endian, "
+        "compact and fast to write/read) or ascii (simple to parse).",
+        choices=["binary", "ascii"],
+        default="binary",
+        type=str,
+    )
+    parser.add_argument(
+        "--decimate_ratio",
+        help="Ratio of the faces kept by the (collapse) decimation of the "
+        "geometry (realized prior to the bake when possible)",
+        default=None,
+        type=float,
+    )
+    parser.add_argument(
+        "--target_faces",
+        help="Decimate the geometry down to (at most) this number of "
+        "triangles (not constrained when 0)",
+        default=0,
+        type=int,
+    )
+    parser.add_argument(
+        "--target_file_size",
+        help="Decimate the geometry so that its binary PLY triangulation "
+        "weighs (about) at most this number of megabytes (not constrained "
+        "when 0)",
+        default=0.0,
+        type=float,
+    )
+    parser.add_argument(
+        "--point_cloud_sampling",
+        help="How the point cloud is obtained: the vertices of the "
+        "triangulation, an (area weighted) uniform or a Poisson-disk sampling "
+        "of the surface, or a voxel grid downsampling of the vertices (the "
+        "last three requiring --point_count or --point_spacing).",
+        choices=["vertices", "uniform", "poisson_disk", "voxel"],
+        default="vertices",
+        type=str,
+    )
+    parser.add_argument(
+        "--point_count",
+        help="Target number of points of the (sampled) point cloud",
+        default=0,
+        type=int,
+    )
+    parser.add_argument(
+        "--point_spacing",
+        help="Target spacing between the points of the (sampled) point cloud "
+        "(takes precedence over --point_count)",
+        default=0.0,
+        type=float,
+    )
+    parser.add_argument(
+        "--point_cloud_seed",
+        help="Seed of the random point cloud samplings",
+        default=0,
+        type=int,
+    )
+    parser.add_argument(
+        "--point_cloud_format",
+        help="Format of the point cloud: ply (a point cloud file per "
+        "exported format) or chunked (a single file of quantized positions, "
+        "normals and uint8 colors, compressed by independent chunks of points "
+        "that can be read selectively and in parallel).",
+        choices=["ply", "chunked"],
+        default="ply",
+        type=str,
+    )
+    parser.add_argument(
+        "--quantization_bits",
+        help="Number of bits of each (bounding box relative) coordinate of "
+        "the positions of a chunked point cloud",
+        default=16,
+        type=int,
+    )
+    parser.add_argument(
+        "--path_step",
+        help="When strictly positive, also export the Path object (the "
+        "branched skeleton of the system) resampled at that step, together "
+        "with the distance to the surface, the free radius and the surface "
+        "normal precomputed at each sample.",
+        default=0.0,
+        type=float,
+    )
+    parser.add_argument(
+        "--lod_levels",
+        help="Number of levels of detail produced by the run: the level 0 is "
+        "the resulting geometry and each coarser level k is its decimation to "
+        "(1/4)^k of its faces (that is the face number of subdivision level "
+        "minus k). A manifest lists the files of all levels.",
+        default=1,
+        type=int,
+    )
+    parser.add_argument(
+        "--tile_size",
+        help="When strictly positive, also export the triangulation and the "
+        "point cloud partitioned along a regular 3D grid of tiles of that "
+        "size, each tile being a binary PLY file listed in an index file.",
+        default=0.0,
+        type=float,
+    )
+    parser.add_argument(
+        "--color_mode",
+        help="How vertex colors are computed: bake (a Cycles COMBINED bake, "
+        "that is with lighting) or texture_sampling (a much faster bilinear "
+        "sampling of the material images at the UV coordinates).",
+        choices=["bake", "texture_sampling"],
+        default="bake",
+        type=str,
+    )
+    parser.add_argument(
+        "--cache_dir",
+        help="Directory of the on disk cache of the intermediate meshes of the "
+        "modifier pipeline (a rerun resumes from the deepest cached stage). "
+        "Caching is disabled when not provided.",
+        default=None,
+        type=str,
+    )
+    parser.add_argument(
+        "--cache_max_size",
+        help="Size limit (in megabytes) of the cache of intermediate meshes "
+        "(least recently used meshes are evicted)",
+        default=10240,
+        type=int,
+    )
     parser.add_argument(
         "--fill_holes",
         help="Plug/fill surface boundaries/holes (topological change)",
@@ -44,8 +195,39 @@ def common_parser():
     return parser
 
 
-def parse_arguments(parser):
-    if "--" in sys.argv:
+def check_common_arguments(parser, args):
+    """Fail (through the parser) when the options of common_parser() are
+    given invalid values or unsupported combinations."""
+    if (
+        args.point_cloud_sampling != "vertices"
+        and args.point_count <= 0
+        and args.point_spacing <= 0
+    ):
+        parser.error(
+            "--point_cloud_sampling "
+            + args.point_cloud_sampling
+            + " requires --point_count or --point_spacing"
+        )
+    if args.decimate_ratio is not None and not 0 < args.decimate_ratio <= 1:
+        parser.error("--decimate_ratio must be in ]0, 1]")
+    if args.out_of_core_patches > 0 and args.fill_holes:
+        parser.error("--out_of_core_patches does not support --fill_holes")
+    if args.out_of_core_patches > 0 and args.point_cloud_format == "chunked":
+        parser.error(
+            "--out_of_core_patches does not support --point_cloud_format chunked"
+        )
+    if args.out_of_core_patches > 0 and args.path_step > 0:
+        parser.error("--out_of_core_patches does not support --path_step")
+    if not 1 <= args.quantization_bits <= 32:
+        parser.error("--quantization_bits must range from 1 to 32")
+
+
+def parse_arguments(parser, argv=None):
+    """Parse the given arguments (or when None, the command line ones)."""
+    if argv is not None:
+        args = parser.parse_args(argv)
+        args.headless = True
+    elif "--" in sys.argv:
         # We probably are running this script in UI mode (that is with commands
         # like `blender --python this_script.py -- --subdivision 2`) and thanks
         # to this
@@ -56,7 +238,8 @@ def parse_arguments(parser):
         args = parser.parse_args(argv)
         args.headless = False
     else:
-        args = parser.parse_args()
+        argv = sys.argv[1:]
+        args = parser.parse_args(argv)
         args.headless = True
     if args.verbose:
         parser.print_help()
@@ -64,3 +247,20 @@ def parse_arguments(parser):
         for arg in vars(args):
             print("   ", arg, ": ", getattr(args, arg))
     return args
+
+
+def check_sweep_arguments(parser, args, sweep_option):
+    """Fail (through the parser) when a displacement sweep is combined with
+    options that alter the topology or that require the Blender mesh of each
+    variant (the sweep variants only differ by their vertex arrays). The
+    decimation options are supported, the decimation being realized on the
+    base mesh of the sweep (prior to the displacement)."""
+    unsupported = [
+        ("--fill_holes", args.fill_holes),
+        ("--out_of_core_patches", args.out_of_core_patches > 0),
+        ("--lod_levels", args.lod_levels > 1),
+        ("--path_step", args.path_step > 0),
+    ]
+    for option, is_set in unsupported:
+        if is_set:
+            parser.error(sweep_option + " does not support " + option)
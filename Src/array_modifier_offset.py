@@ -0,0 +1,29 @@
+import numpy as np
+
+
+def array_modifier_offset(array_modifier, positions):
+    """Translation between two consecutive copies realized by an Array modifier.
+
+    This mimics the offset computation of Blender's Array modifier: the
+    constant offset is added to the relative offset (that is expressed in
+    units of the bounding box dimensions of the mesh the modifier applies to).
+
+    Args:
+        array_modifier (bpy.types.ArrayModifier): the modifier
+        positions (numpy array): (vertex_number, 3) coordinates of the mesh on
+           which the modifier is applied
+    Returns:
+        numpy array: the (3,) offset
+    """
+    if array_modifier.use_object_offset:
+        raise ValueError(
+            "Array modifier " + array_modifier.name + ": object offsets are "
+            "not supported."
+        )
+    offset = np.zeros(3)
+    if array_modifier.use_constant_offset:
+        offset += np.array(array_modifier.constant_offset_displace)
+    if array_modifier.use_relative_offset:
+        dimensions = positions.max(axis=0) - positions.min(axis=0)
+        offset += np.array(array_modifier.relative_offset_displace) * dimensions
+    return offset
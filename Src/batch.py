@@ -0,0 +1,240 @@
+import argparse
+import concurrent.futures
+import importlib
+import itertools
+import json
+import multiprocessing
+import os
+import sys
+import time
+import bpy
+
+# The generator classes, each of them being defined in the module of same name
+GENERATORS = ["Cave", "Tunnel"]
+
+# Default number of worker processes: each of them holds its own Blender
+# instance and runs a whole generation, whose memory (as opposed to the
+# processor number) bounds the number of concurrent configurations
+DEFAULT_WORKERS = 2
+
+########### Worker process state
+_generator_class = None
+_pristine_object = None
+
+
+def sweep_configurations(sweep):
+    """Expand a sweep specification into its list of configurations.
+
+    A sweep specification is a dictionary of the form
+        {
+          "generator": "Cave",
+          "fixed": {"outputdir": "data", "no-obj-export": true},
+          "product": {"subdivision": [1, 2, 3], "relief": [0.1, 0.7]},
+          "configs": [{"subdivision": 4, "grid_size_x": 2}]
+        }
+    where "product" designates the cartesian product of the listed values
+    and "configs" an explicit list of configurations (both are optional).
+    The "fixed" options are shared by all the configurations. The option names
+    are the ones of the command line (without the leading "--").
+
+    Returns:
+        list of dictionaries: the (option name, value) of each configuration
+    """
+    fixed = sweep.get("fixed", {})
+    configurations = list()
+    product = sweep.get("product", {})
+    if product:
+        names = list(product.keys())
+        for values in itertools.product(*(product[name] for name in names)):
+            configurations.append({**fixed, **dict(zip(names, values))})
+    for configuration in sweep.get("configs", []):
+        configurations.append({**fixed, **configuration})
+    if not configurations:
+        configurations.append(dict(fixed))
+    return configurations
+
+
+def configuration_to_argv(configuration):
+    """Convert a configuration to its command line argument list"""
+    argv = list()
+    for name, value in configuration.items():
+        option = "--" + name if len(name) > 1 else "-" + name
+        if value is True:
+            argv.append(option)
+        elif value is False or value is None:
+            continue
+        elif isinstance(value, list):
+            # Options of several values (e.g. the displacement sweeps)
+            argv += [option] + [str(item) for item in value]
+        else:
+            argv += [option, str(value)]
+    return argv
+
+
+def warm_up(generator_name):
+    """Worker process initializer: load (once) the Blender file of the
+    generator and keep a pristine copy of its source object."""
+    global _generator_class, _pristine_object
+    _generator_class = getattr(importlib.import_module(generator_name), generator_name)
+    bpy.ops.wm.open_mainfile(filepath=_generator_class.blender_pathfile)
+    source = bpy.data.objects[_generator_class.blender_object_name]
+    _pristine_object = source.copy()
+    _pristine_object.data = source.data.copy()
+    _pristine_object.use_fake_user = True
+
+
+def _restored_object():
+    """Replace the (possibly modified) source object of the scene with a
+    fresh copy of the pristine one and return it."""
+    name = _generator_class.blender_object_name
+    current = bpy.data.objects[name]
+    collections = list(current.users_collection)
+    mesh_name = _pristine_object.data.name
+    mesh = current.data
+    bpy.data.objects.remove(current)
+    if mesh.users == 0:
+        bpy.data.meshes.remove(mesh)
+    restored = _pristine_object.copy()
+    restored.data = _pristine_object.data.copy()
+    restored.use_fake_user = False
+    restored.name = name
+    restored.data.name = mesh_name
+    for collection in collections:
+        collection.objects.link(restored)
+    return restored
+
+
+def run_configuration(index, configuration):
+    """Run (within a warm worker process, refer to warm_up()) the generator
+    with the given configuration and report its status, outputs and stage
+    timings."""
+    argv = configuration_to_argv(configuration)
+    start = time.perf_counter()
+    result = {
+        "index": index,
+        "configuration": configuration,
+        "arguments": argv,
+    }
+    try:
+        generator = _generator_class(argv, blender_object=_restored_object())
+        result["status"] = "success"
+        result["outputs"] = [
+            os.path.abspath(filename) for filename in generator.output_filenames
+        ]
+        result["stages"] = generator.profiler.stages
+    except (Exception, SystemExit) as error:
+        result["status"] = "failure"
+        result["error"] = repr(error)
+        result["outputs"] = []
+    result["elapsed_seconds"] = time.perf_counter() - start
+    return result
+
+
+def run_sweep(sweep, workers):
+    """Run all the configurations of a sweep (refer to sweep_configurations())
+    over a pool of warm worker processes.
+
+    Each worker loads the Blender file once and restores the pristine source
+    object between two configurations (as opposed to reloading the file).
+
+    Returns:
+        list of dictionaries: the report of each configuration
+    """
+    generator_name = sweep["generator"]
+    if generator_name not in GENERATORS:
+        raise ValueError(
+            "Unknown generator "
+            + generator_name
+            + " (expecting one of "
+            + ", ".join(GENERATORS)
+            + ")"
+        )
+    configurations = sweep_configurations(sweep)
+    results = list()
+    # Note: the workers are spawned (as opposed to forked) in order for
+    # each of them to hold its own bpy instance.
+    with concurrent.futures.ProcessPoolExecutor(
+        max_workers=min(workers, len(configurations)),
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=warm_up,
+        initargs=(generator_name,),
+    ) as executor:
+        futures = [
+            executor.submit(run_configuration, index, configuration)
+            for index, configuration in enumerate(configurations)
+        ]
+        for future in concurrent.futures.as_completed(futures):
+            result = future.result()
+            result["generator"] = generator_name
+            print(
+                generator_name,
+                "configuration",
+                result["index"],
+                result["status"],
+                "in {:.1f}s".format(result["elapsed_seconds"]),
+                " ".join(result["arguments"]),
+            )
+            results.append(result)
+    results.sort(key=lambda result: result["index"])
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="""
+        Run a sweep of Cave/Tunnel configurations over a pool of warm worker
+        processes and write a (JSON) manifest of the results.
+        """,
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    parser.add_argument(
+        "sweep",
+        help="JSON file holding a sweep specification or a list of sweep "
+        "specifications (refer to sweep_configurations())",
+        type=str,
+    )
+    parser.add_argument(
+        "--workers",
+        help="Number of worker processes. Each worker holds its own Blender "
+        "instance (bpy, the loaded Blender file and a pristine copy of the "
+        "source object) on top of the peak memory of the configuration it "
+        "runs, that grows fourfold with each subdivision level (refer to the "
+        "peak_rss_megabytes of the run reports): size it to the available "
+        "memory rather than to the processor number.",
+        default=DEFAULT_WORKERS,
+        type=int,
+    )
+    parser.add_argument(
+        "--manifest",
+        help="Resulting manifest file (per configuration timing and outputs)",
+        default="batch_manifest.json",
+        type=str,
+    )
+    args = parser.parse_args()
+    with open(args.sweep) as sweep_file:
+        sweeps = json.load(sweep_file)
+    if isinstance(sweeps, dict):
+        sweeps = [sweeps]
+
+    start = time.perf_counter()
+    results = list()
+    for sweep in sweeps:
+        results += run_sweep(sweep, args.workers)
+    manifest = {
+        "sweep": os.path.abspath(args.sweep),
+        "workers": args.workers,
+        "elapsed_seconds": time.perf_counter() - start,
+        "configurations": results,
+    }
+    with open(args.manifest, "w") as manifest_file:
+        json.dump(manifest, manifest_file, indent=2)
+    print("Manifest written in ", args.manifest)
+    failures = [result for result in results if result["status"] != "success"]
+    if failures:
+        print(len(failures), "configuration(s) failed.")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
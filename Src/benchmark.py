@@ -0,0 +1,393 @@
+import argparse
+import csv
+import glob
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+# The export formats that are benchmarked together with the generator
+# arguments selecting them
+FORMATS = {
+    "ply_binary": ["--no-obj-export", "--ply-format", "binary"],
+    "ply_ascii": ["--no-obj-export", "--ply-format", "ascii"],
+    "obj": ["--no-ply-export"],
+}
+
+# The extension of the triangulation and point cloud files of each format
+FORMAT_EXTENSIONS = {"ply_binary": ".ply", "ply_ascii": ".ply", "obj": ".obj"}
+
+# The vertex color modes (refer to the --color_mode generator option), the
+# first one being the default mode of the generators
+COLOR_MODES = ["bake", "texture_sampling"]
+
+# The stage of the run report computing the vertex colors (whatever the color
+# mode)
+COLOR_STAGE = "bake"
+
+# The measures compared against the baseline: for each of them, a larger
+# value (beyond the tolerance) is a regression
+COMPARED_MEASURES = [
+    "total_wall_seconds",
+    "color_seconds",
+    "peak_rss_megabytes",
+    "triangulation_bytes",
+    "point_cloud_bytes",
+]
+
+
+def benchmark_configurations(
+    generators, subdivisions, grid_sizes, formats, color_modes=None
+):
+    """The (generator, subdivision, grid size, format, color mode)
+    configurations to run (with the default color mode when None). Grid sizes
+    only apply to the Cave generator."""
+    color_modes = color_modes or COLOR_MODES[:1]
+    configurations = list()
+    for generator in generators:
+        for subdivision in subdivisions:
+            for grid_size in grid_sizes if generator == "Cave" else [None]:
+                for export_format in formats:
+                    for color_mode in color_modes:
+                        configurations.append(
+                            (
+                                generator,
+                                subdivision,
+                                grid_size,
+                                export_format,
+                                color_mode,
+                            )
+                        )
+    return configurations
+
+
+def configuration_name(
+    generator, subdivision, grid_size, export_format, color_mode=COLOR_MODES[0]
+):
+    name = generator + "_sub_" + str(subdivision)
+    if grid_size is not None:
+        name += "_grid_" + str(grid_size[0]) + "x" + str(grid_size[1])
+    name += "_" + export_format
+    # The default color mode is left out of the name, which keeps the former
+    # results usable as baselines
+    if color_mode != COLOR_MODES[0]:
+        name += "_" + color_mode
+    return name
+
+
+def _stage_measure(report, measure):
+    """The maximum value of the given measure over the stages of a report"""
+    values = [stage[measure] for stage in report["stages"] if measure in stage]
+    return max(values) if values else None
+
+
+def run_configuration(
+    generator, subdivision, grid_size, export_format, color_mode=COLOR_MODES[0]
+):
+    """Run the generator (in its own process) and gather the measures of its
+    run report together with the sizes of the resulting files"""
+    with tempfile.TemporaryDirectory() as outputdir:
+        command = [
+            sys.executable,
+            generator + ".py",
+            "--subdivision",
+            str(subdivision),
+            "--outputdir",
+            outputdir,
+            "--color_mode",
+            color_mode,
+        ] + FORMATS[export_format]
+        if grid_size is not None:
+            command += [
+                "--grid_size_x",
+                str(grid_size[0]),
+                "--grid_size_y",
+                str(grid_size[1]),
+            ]
+        subprocess.run(command, check=True, stdout=subprocess.DEVNULL)
+        report_filenames = glob.glob(os.path.join(outputdir, "*run_report*.json"))
+        if len(report_filenames) != 1:
+            sys.exit("No run report was written by: " + " ".join(command))
+        with open(report_filenames[0]) as report_file:
+            report = json.load(report_file)
+
+        result = {
+            "name": configuration_name(
+                generator, subdivision, grid_size, export_format, color_mode
+            ),
+            "generator": generator,
+            "subdivision": subdivision,
+            "grid_size": None if grid_size is None else list(grid_size),
+            "format": export_format,
+            "color_mode": color_mode,
+            "total_wall_seconds": report["total_wall_seconds"],
+            "peak_rss_megabytes": max(
+                (
+                    _stage_measure(report, "peak_rss_megabytes") or 0.0,
+                    _stage_measure(report, "children_peak_rss_megabytes") or 0.0,
+                )
+            ),
+        }
+        # The mesh size is the one recorded by the last stage knowing it
+        for stage in report["stages"]:
+            if "vertices" in stage:
+                result["vertices"] = stage["vertices"]
+                result["edges"] = stage["edges"]
+                result["faces"] = stage["faces"]
+        # The base names of the (level 0) triangulation and point cloud files
+        # end with their kind and the extension of the format, the other
+        # outputs (levels of detail, tiles...) are not measured
+        extension = FORMAT_EXTENSIONS[export_format]
+        for output in report["outputs"]:
+            for kind in ("triangulation", "point_cloud"):
+                if os.path.basename(output).endswith("_" + kind + extension):
+                    result[kind + "_bytes"] = os.path.getsize(output)
+        for stage in report["stages"]:
+            result[stage["stage"] + "_seconds"] = (
+                result.get(stage["stage"] + "_seconds", 0.0) + stage["wall_seconds"]
+            )
+        if COLOR_STAGE + "_seconds" in result:
+            result["color_seconds"] = result[COLOR_STAGE + "_seconds"]
+    return result
+
+
+def color_mode_speedups(results):
+    """The (human readable) comparison of the color stage times of the runs
+    only differing by their color mode, against the default mode."""
+    default_mode = COLOR_MODES[0]
+    references = {
+        result["name"]: result
+        for result in results
+        if result["color_mode"] == default_mode and "color_seconds" in result
+    }
+    comparisons = list()
+    for result in results:
+        if result["color_mode"] == default_mode or "color_seconds" not in result:
+            continue
+        suffix = "_" + result["color_mode"]
+        reference = references.get(result["name"][: -len(suffix)])
+        if reference is None:
+            continue
+        comparisons.append(
+            "{}: {} {:.1f}s, {} {:.1f}s (x{:.2f})".format(
+                reference["name"],
+                default_mode,
+                reference["color_seconds"],
+                result["color_mode"],
+                result["color_seconds"],
+                reference["color_seconds"] / max(result["color_seconds"], 1e-9),
+            )
+        )
+    return comparisons
+
+
+def compare_to_baseline(results, baseline, tolerance):
+    """The list of (human readable) regressions of the results with respect
+    to the baseline ones, that is of the compared measures exceeding their
+    baseline value by more than the given (relative) tolerance."""
+    baseline_results = {result["name"]: result for result in baseline}
+    regressions = list()
+    for result in results:
+        reference = baseline_results.get(result["name"])
+        if reference is None:
+            continue
+        for measure in COMPARED_MEASURES:
+            if not reference.get(measure) or measure not in result:
+                continue
+            ratio = result[measure] / reference[measure]
+            if ratio > 1.0 + tolerance:
+                regressions.append(
+                    "{}: {} regressed from {:.6g} to {:.6g} (+{:.0%}, tolerance "
+                    "{:.0%})".format(
+                        result["name"],
+                        measure,
+                        reference[measure],
+                        result[measure],
+                        ratio - 1.0,
+                        tolerance,
+                    )
+                )
+    return regressions
+
+
+def _human_count(count):
+    if count >= 1000:
+        return "{:,}k".format(round(count / 1000)).replace(",", " ")
+    return str(count)
+
+
+def _human_size(size):
+    return "{:.1f}Mb".format(size / (1024 * 1024))
+
+
+def _human_duration(seconds):
+    minutes, seconds = divmod(round(seconds), 60)
+    if minutes:
+        return str(minutes) + "'" + "{:02d}".format(seconds) + '"'
+    return str(seconds) + '"'
+
+
+def markdown_table(results):
+    """The results formatted as the "Dimensions/Sizes of resulting geometries"
+    tables of the README"""
+    lines = [
+        "| Configuration | # Vertices | #Edges | #Faces | Point Cloud "
+        "| Triangulation | Time |",
+        "| ------------- | ---------- | ------ | ------ | ----------- "
+        "| ------------- | ---- |",
+    ]
+    for result in results:
+        lines.append(
+            "| "
+            + " | ".join(
+                [
+                    result["name"],
+                    _human_count(result.get("vertices", 0)),
+                    _human_count(result.get("edges", 0)),
+                    _human_count(result.get("faces", 0)),
+                    _human_size(result.get("point_cloud_bytes", 0)),
+                    _human_size(result.get("triangulation_bytes", 0)),
+                    _human_duration(result["total_wall_seconds"]),
+                ]
+            )
+            + " |"
+        )
+    return "\n".join(lines) + "\n"
+
+
+def write_results(results, output_basename):
+    """Write the results both as JSON (usable as a baseline) and CSV files"""
+    with open(output_basename + ".json", "w") as json_file:
+        json.dump(results, json_file, indent=2)
+    fieldnames = list()
+    for result in results:
+        fieldnames += [key for key in result if key not in fieldnames]
+    with open(output_basename + ".csv", "w", newline="") as csv_file:
+        writer = csv.DictWriter(csv_file, fieldnames=fieldnames)
+        writer.writeheader()
+        writer.writerows(results)
+
+
+def _grid_size(text):
+    size_x, size_y = text.lower().split("x")
+    return (int(size_x), int(size_y))
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="""
+        Run the generators across subdivision levels, grid sizes, export
+        formats and color modes, gather the mesh sizes, file sizes, per stage times and peak
+        memory of each run and compare them to a baseline.
+        """,
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    parser.add_argument(
+        "--generators",
+        help="Comma separated list of generators",
+        default="Cave,Tunnel",
+        type=str,
+    )
+    parser.add_argument(
+        "--subdivisions",
+        help="Comma separated list of subdivision levels",
+        default="1,2",
+        type=str,
+    )
+    parser.add_argument(
+        "--grid_sizes",
+        help="Comma separated list of (Cave) grid sizes (e.g. 1x1,2x2)",
+        default="1x1",
+        type=str,
+    )
+    parser.add_argument(
+        "--formats",
+        help="Comma separated list of export formats among " + ", ".join(FORMATS),
+        default="ply_binary",
+        type=str,
+    )
+    parser.add_argument(
+        "--color_modes",
+        help="Comma separated list of vertex color modes among "
+        + ", ".join(COLOR_MODES)
+        + " (the color stage times of the modes are compared)",
+        default=COLOR_MODES[0],
+        type=str,
+    )
+    parser.add_argument(
+        "--output",
+        help="Basename of the resulting JSON and CSV files",
+        default="benchmark",
+        type=str,
+    )
+    parser.add_argument(
+        "--markdown",
+        help="Also write the results as a README like (markdown) table in "
+        "the given file",
+        default=None,
+        type=str,
+    )
+    parser.add_argument(
+        "--baseline",
+        help="JSON results (of a former run) to compare with",
+        default=None,
+        type=str,
+    )
+    parser.add_argument(
+        "--tolerance",
+        help="Relative increase (of times, memory and file sizes) over the "
+        "baseline beyond which a run is considered to regress",
+        default=0.2,
+        type=float,
+    )
+    args = parser.parse_args()
+    formats = args.formats.split(",")
+    for export_format in formats:
+        if export_format not in FORMATS:
+            parser.error("unknown export format: " + export_format)
+    color_modes = args.color_modes.split(",")
+    for color_mode in color_modes:
+        if color_mode not in COLOR_MODES:
+            parser.error("unknown color mode: " + color_mode)
+
+    configurations = benchmark_configurations(
+        args.generators.split(","),
+        [int(level) for level in args.subdivisions.split(",")],
+        [_grid_size(grid_size) for grid_size in args.grid_sizes.split(",")],
+        formats,
+        color_modes,
+    )
+    results = list()
+    for configuration in configurations:
+        result = run_configuration(*configuration)
+        print(
+            "{name}: {total_wall_seconds:.1f}s, {peak_rss_megabytes:.0f}MB".format(
+                **result
+            )
+        )
+        results.append(result)
+    for comparison in color_mode_speedups(results):
+        print(comparison)
+    write_results(results, args.output)
+    print("Results written in ", os.path.abspath(args.output + ".json"))
+    if args.markdown:
+        with open(args.markdown, "w") as markdown_file:
+            markdown_file.write(markdown_table(results))
+
+    if args.baseline is None:
+        return 0
+    with open(args.baseline) as baseline_file:
+        baseline = json.load(baseline_file)
+    regressions = compare_to_baseline(results, baseline, args.tolerance)
+    if regressions:
+        print("Regressions against the baseline " + args.baseline + ":")
+        for regression in regressions:
+            print("  " + regression)
+        return 1
+    print("No regression against the baseline " + args.baseline)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,254 @@
+import concurrent.futures
+import json
+import struct
+import zlib
+import numpy as np
+from mesh_to_arrays import MeshArrays
+
+# A chunked point cloud file (".cpc") is made of
+#  - the MAGIC bytes,
+#  - the chunks, each of them being independently zlib compressed,
+#  - the (JSON) index describing the quantization, the fields and the chunks
+#    (their offset in the file, compressed size, first point and number of
+#    points),
+#  - the footer: the (little endian uint64) size of the index followed by the
+#    MAGIC bytes.
+# Within a chunk (prior to its compression) the fields are stored column by
+# column (that compresses better than interleaved values): the quantized
+# positions, the normals (int8 components scaled by 127) and the (RGBA uint8)
+# colors.
+MAGIC = b"RIBSCPC1"
+_FOOTER = struct.Struct("<Q8s")
+
+# Number of points of a chunk, that is the granularity of random access
+POINT_CHUNK_SIZE = 1 << 16
+
+CHUNKED_POINT_CLOUD_EXTENSION = ".cpc"
+
+
+def _position_dtype(quantization_bits):
+    if quantization_bits <= 8:
+        return np.dtype("u1")
+    if quantization_bits <= 16:
+        return np.dtype("<u2")
+    return np.dtype("<u4")
+
+
+def _encode_chunk(points, lower, step, position_dtype, compression_level):
+    quantized = np.rint((points.positions - lower) / step)
+    columns = [quantized.astype(position_dtype)]
+    if points.normals is not None:
+        columns.append(np.rint(np.clip(points.normals, -1.0, 1.0) * 127).astype("i1"))
+    if points.colors is not None:
+        columns.append(points.colors.astype("u1"))
+    return zlib.compress(
+        b"".join(column.T.tobytes() for column in columns), compression_level
+    )
+
+
+def _point_slices(chunks):
+    # The points regrouped in successive POINT_CHUNK_SIZE points (but the last
+    # ones), as a list of (views on the) point slices per provided chunk
+    pending = None
+    for chunk in chunks:
+        points = (chunk.positions, chunk.normals, chunk.colors)
+        if pending is not None:
+            points = (
+                None if array is None else np.concatenate((pending_array, array))
+                for pending_array, array in zip(pending, points)
+            )
+        positions, normals, colors = points
+        slices = [
+            tuple(
+                None if array is None else array[start : start + POINT_CHUNK_SIZE]
+                for array in (positions, normals, colors)
+            )
+            for start in range(0, len(positions), POINT_CHUNK_SIZE)
+        ]
+        # A partial slice is completed with the points of the next chunks
+        pending = None
+        if slices and len(slices[-1][0]) < POINT_CHUNK_SIZE:
+            pending = slices.pop()
+        yield chunk, [MeshArrays(*arrays, None) for arrays in slices]
+    if pending is not None:
+        yield None, [MeshArrays(*pending, None)]
+
+
+def write_chunked_point_cloud(
+    filename,
+    chunks,
+    lower,
+    upper,
+    quantization_bits=16,
+    compression_level=6,
+    workers=0,
+):
+    """Write a point cloud in the chunked, quantized and compressed format
+    (refer to MAGIC).
+
+    The positions are quantized on a regular grid of 2^quantization_bits
+    steps along each axis of the given bounding box: the precision is thus
+    relative to the bounding box. Each chunk of POINT_CHUNK_SIZE points is
+    compressed on its own, which allows for reading any subset of the chunks
+    (in parallel).
+
+    Args:
+        filename (string): the name of the target file
+        chunks (iterable of MeshArrays): the points (the triangles being
+           ignored), provided by chunks of any size
+        lower (numpy array): the (3,) lower corner of the bounding box of
+           the points
+        upper (numpy array): the (3,) upper corner of the bounding box
+        quantization_bits (int): the number of bits of each quantized
+           coordinate (at most 32)
+        compression_level (int): the zlib compression level
+        workers (int): the number of threads compressing the chunks (one per
+           processor when 0)
+    """
+    if not 1 <= quantization_bits <= 32:
+        raise ValueError(
+            "The quantization bits must range from 1 to 32, got "
+            + str(quantization_bits)
+        )
+    lower = np.asarray(lower, dtype=np.float64)
+    extent = np.asarray(upper, dtype=np.float64) - lower
+    step = np.where(extent > 0, extent, 1.0) / ((1 << quantization_bits) - 1)
+    position_dtype = _position_dtype(quantization_bits)
+    layout = None
+    index = list()
+    point_number = 0
+    with open(filename, "wb") as output, concurrent.futures.ThreadPoolExecutor(
+        max_workers=workers or None
+    ) as executor:
+        output.write(MAGIC)
+        for chunk, slices in _point_slices(chunks):
+            if layout is None:
+                layout = chunk
+            # The chunks are compressed concurrently (zlib releases the GIL)
+            # and written in order
+            for points, compressed in zip(
+                slices,
+                executor.map(
+                    lambda points: _encode_chunk(
+                        points, lower, step, position_dtype, compression_level
+                    ),
+                    slices,
+                ),
+            ):
+                size = len(points.positions)
+                index.append([output.tell(), len(compressed), point_number, size])
+                output.write(compressed)
+                point_number += size
+        encoded_index = json.dumps(
+            {
+                "point_number": point_number,
+                "quantization_bits": quantization_bits,
+                "lower": lower.tolist(),
+                "step": step.tolist(),
+                "positions": position_dtype.str,
+                "normals": layout is not None and layout.normals is not None,
+                "colors": layout is not None and layout.colors is not None,
+                "chunks": index,
+            }
+        ).encode("utf-8")
+        output.write(encoded_index)
+        output.write(_FOOTER.pack(len(encoded_index), MAGIC))
+
+
+class ChunkedPointCloud:
+    """Random (and parallel) access to the chunks of a chunked point cloud
+    file (refer to write_chunked_point_cloud())"""
+
+    def __init__(self, filename):
+        self.filename = filename
+        with open(filename, "rb") as cloud_file:
+            if cloud_file.read(len(MAGIC)) != MAGIC:
+                raise ValueError(filename + " is not a chunked point cloud file")
+            cloud_file.seek(-_FOOTER.size, 2)
+            index_size, magic = _FOOTER.unpack(cloud_file.read(_FOOTER.size))
+            if magic != MAGIC:
+                raise ValueError(filename + " is truncated")
+            cloud_file.seek(-_FOOTER.size - index_size, 2)
+            index = json.loads(cloud_file.read(index_size))
+        self.point_number = index["point_number"]
+        self.quantization_bits = index["quantization_bits"]
+        self.lower = np.array(index["lower"])
+        self.step = np.array(index["step"])
+        self.chunks = index["chunks"]
+        self.__position_dtype = np.dtype(index["positions"])
+        self.__with_normals = index["normals"]
+        self.__with_colors = index["colors"]
+
+    @property
+    def chunk_number(self):
+        return len(self.chunks)
+
+    def chunks_of_points(self, first_point, last_point):
+        """The indices of the chunks holding the points ranging from
+        first_point to last_point (included)"""
+        first_points = [chunk[2] for chunk in self.chunks]
+        return list(
+            range(
+                np.searchsorted(first_points, first_point, side="right") - 1,
+                np.searchsorted(first_points, last_point, side="right"),
+            )
+        )
+
+    def read_chunk(self, chunk_index):
+        """The (dequantized) points of the chunk of given index"""
+        offset, size, _, point_number = self.chunks[chunk_index]
+        with open(self.filename, "rb") as cloud_file:
+            cloud_file.seek(offset)
+            data = zlib.decompress(cloud_file.read(size))
+
+        def column(dtype, components, start):
+            stop = start + point_number * components * dtype.itemsize
+            values = np.frombuffer(
+                data, dtype=dtype, count=point_number * components, offset=start
+            )
+            return values.reshape(components, point_number).T, stop
+
+        quantized, start = column(self.__position_dtype, 3, 0)
+        positions = (self.lower + quantized * self.step).astype(np.float32)
+        normals = None
+        if self.__with_normals:
+            normals, start = column(np.dtype("i1"), 3, start)
+            normals = normals.astype(np.float32) / 127
+            lengths = np.linalg.norm(normals, axis=1, keepdims=True)
+            lengths[lengths == 0] = 1.0
+            normals /= lengths
+        colors = None
+        if self.__with_colors:
+            colors, start = column(np.dtype("u1"), 4, start)
+            colors = np.ascontiguousarray(colors)
+        return MeshArrays(positions, normals, colors, np.empty((0, 3), dtype=np.int32))
+
+    def read(self, chunk_indices=None, workers=0):
+        """The points of the given chunks (all of them when None), that are
+        decompressed concurrently (zlib releases the GIL)
+
+        Args:
+            chunk_indices (list of int): the indices of the chunks to read
+            workers (int): the number of threads (one per processor when 0)
+        Returns:
+            MeshArrays: the points (without triangles)
+        """
+        if chunk_indices is None:
+            chunk_indices = range(self.chunk_number)
+        with concurrent.futures.ThreadPoolExecutor(
+            max_workers=workers or None
+        ) as executor:
+            chunks = list(executor.map(self.read_chunk, chunk_indices))
+        if not chunks:
+            return MeshArrays(
+                np.empty((0, 3), dtype=np.float32),
+                np.empty((0, 3), dtype=np.float32) if self.__with_normals else None,
+                np.empty((0, 4), dtype=np.uint8) if self.__with_colors else None,
+                np.empty((0, 3), dtype=np.int32),
+            )
+        return MeshArrays(
+            *(
+                None if arrays[0] is None else np.concatenate(arrays)
+                for arrays in zip(*chunks)
+            )
+        )
@@ -0,0 +1,97 @@
+import logging
+import bpy
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Sizes (in bytes) of a vertex (position, normal and color), of its texture
+# coordinates (when the mesh has a UV map) and of a triangle of a binary PLY
+# triangulation (refer to write_ply.py)
+PLY_VERTEX_SIZE = 28
+PLY_UV_SIZE = 8
+PLY_TRIANGLE_SIZE = 13
+
+
+def triangle_number(UI_geometry):
+    """The number of triangles of the triangulation of the mesh of a UI object"""
+    mesh = UI_geometry.data
+    polygon_sizes = np.empty(len(mesh.polygons), dtype=np.int32)
+    mesh.polygons.foreach_get("loop_total", polygon_sizes)
+    return int(np.sum(polygon_sizes - 2))
+
+
+def decimation_ratio(UI_geometry, decimate_ratio, target_faces, target_file_size):
+    """The ratio of the faces of the mesh of a UI object to be kept in order to
+    meet all the given (reduction) constraints.
+
+    Args:
+        UI_geometry (bpy.types.Object): the UI object holding the mesh
+        decimate_ratio (float): a raw ratio (None when not constrained)
+        target_faces (int): the target number of (triangular) faces (not
+           constrained when not strictly positive)
+        target_file_size (float): the target size (in megabytes) of the binary
+           PLY triangulation (not constrained when not strictly positive)
+    Returns:
+        float: the ratio (at most 1.0) or None when nothing is constrained
+    """
+    ratios = list()
+    if decimate_ratio is not None:
+        ratios.append(decimate_ratio)
+    triangles = 0
+    if target_faces > 0 or target_file_size > 0:
+        triangles = triangle_number(UI_geometry)
+    # An empty mesh meets any (faces or file size) target
+    if triangles > 0:
+        if target_faces > 0:
+            ratios.append(target_faces / triangles)
+        if target_file_size > 0:
+            # Both the vertex and the triangle numbers scale with the ratio
+            # (the vertices split along the UV seams are not accounted for)
+            vertex_size = PLY_VERTEX_SIZE
+            if UI_geometry.data.uv_layers.active is not None:
+                vertex_size += PLY_UV_SIZE
+            file_size = (
+                vertex_size * len(UI_geometry.data.vertices)
+                + PLY_TRIANGLE_SIZE * triangles
+            )
+            ratios.append(target_file_size * 1024 * 1024 / file_size)
+    if not ratios:
+        return None
+    return min(min(ratios), 1.0)
+
+
+def decimate(UI_geometry, ratio, modifier_name="Decimate"):
+    """Apply a (collapse) decimation of given ratio to the mesh of a UI object.
+
+    The decimation is realized with the modifier of given name, that is
+    created when the object holds no such modifier.
+
+    Args:
+        UI_geometry (bpy.types.Object): the UI object holding the mesh
+        ratio (float): the ratio of the faces to be kept
+        modifier_name (string): the name of the Decimate modifier
+    """
+    modifier = UI_geometry.modifiers.get(modifier_name)
+    if modifier is None:
+        modifier = UI_geometry.modifiers.new(modifier_name, "DECIMATE")
+    modifier.decimate_type = "COLLAPSE"
+    modifier.ratio = ratio
+    triangles = triangle_number(UI_geometry)
+    with bpy.context.temp_override(
+        selected_objects=[UI_geometry], object=UI_geometry, active_object=UI_geometry
+    ):
+        # Applying a modifier that is not the first one triggers a warning
+        bpy.ops.object.modifier_move_to_index(modifier=modifier_name, index=0)
+        bpy.ops.object.modifier_apply(modifier=modifier_name)
+    message = (
+        "Decimated (ratio "
+        + format(ratio, ".4g")
+        + ") from "
+        + str(triangles)
+        + " to "
+        + str(triangle_number(UI_geometry))
+        + " triangles and "
+        + str(len(UI_geometry.data.vertices))
+        + " vertices"
+    )
+    logger.info(message)
@@ -0,0 +1,76 @@
+import numpy as np
+
+# A Displace modifier moves each vertex by
+#   (texture(vertex) - midlevel) * strength * direction(vertex)
+# where neither the texture value nor the direction depend on the strength:
+# the displacement is linear in the strength. The displacement field of a unit
+# strength is thus computed once (by applying the modifier) and each variant
+# of a sweep over the strength is a mere scaling of that field.
+
+
+def displacement_field(base_positions, displaced_positions, strength):
+    """The displacement field of a unit strength out of the positions of a
+    mesh prior to and after its displacement with the given strength.
+
+    Args:
+        base_positions (numpy array): the (vertex_number, 3) positions prior to
+           the displacement
+        displaced_positions (numpy array): the (vertex_number, 3) positions
+           after the displacement
+        strength (float): the (non zero) strength of the displacement
+    Returns:
+        numpy array: the (vertex_number, 3) float32 unit strength field
+    """
+    if strength == 0:
+        raise ValueError("A displacement field requires a non zero strength")
+    return (
+        (displaced_positions.astype(np.float64) - base_positions) / strength
+    ).astype(np.float32)
+
+
+def vertex_normals(positions, triangles):
+    """The unit vertex normals of a triangulation, that are the average of the
+    normals of the incident triangles weighted by their corner angles.
+
+    Args:
+        positions (numpy array): the (vertex_number, 3) positions
+        triangles (numpy array): the (triangle_number, 3) vertex indices
+    Returns:
+        numpy array: the (vertex_number, 3) float32 normals
+    """
+    corners = positions[triangles].astype(np.float64)
+    face_normals = np.cross(
+        corners[:, 1] - corners[:, 0], corners[:, 2] - corners[:, 0]
+    )
+    lengths = np.linalg.norm(face_normals, axis=1, keepdims=True)
+    face_normals /= np.where(lengths > 0, lengths, 1.0)
+    normals = np.zeros((len(positions), 3))
+    for corner in range(3):
+        first = corners[:, (corner + 1) % 3] - corners[:, corner]
+        second = corners[:, (corner + 2) % 3] - corners[:, corner]
+        angles = np.arctan2(
+            np.linalg.norm(np.cross(first, second), axis=1),
+            np.einsum("ij,ij->i", first, second),
+        )
+        np.add.at(normals, triangles[:, corner], face_normals * angles[:, None])
+    lengths = np.linalg.norm(normals, axis=1, keepdims=True)
+    return (normals / np.where(lengths > 0, lengths, 1.0)).astype(np.float32)
+
+
+def displaced_mesh_arrays(mesh_arrays, field, strength):
+    """The geometry displaced by the given field scaled by strength, its
+    normals being recomputed (the colors, triangles and UVs are shared).
+
+    Args:
+        mesh_arrays (MeshArrays): the geometry prior to the displacement
+        field (numpy array): the (vertex_number, 3) unit strength displacement
+           field (refer to displacement_field())
+        strength (float): the strength of the displacement
+    Returns:
+        MeshArrays: the displaced geometry
+    """
+    positions = (mesh_arrays.positions + strength * field).astype(np.float32)
+    return mesh_arrays._replace(
+        positions=positions,
+        normals=vertex_normals(positions, mesh_arrays.triangles),
+    )
@@ -0,0 +1,221 @@
+import collections
+import concurrent.futures
+import logging
+import os
+import time
+from chunked_point_cloud import (
+    CHUNKED_POINT_CLOUD_EXTENSION,
+    write_chunked_point_cloud,
+)
+from export_to_ply_files import point_cloud_filename
+from export_to_tiles import export_to_tiles
+from write_obj import write_obj_files, write_obj_point_cloud
+from write_ply import write_ply_files, write_ply_point_cloud
+
+logger = logging.getLogger(__name__)
+
+# An independent export: the names of the files it writes and the callable
+# (without arguments) writing them
+ExportJob = collections.namedtuple("ExportJob", ["filenames", "function"])
+
+
+def read_only_mesh_arrays(mesh_arrays):
+    """Freeze (in place) the arrays of a geometry: the concurrent writers share
+    them and none of them is allowed to alter them."""
+    for array in mesh_arrays:
+        if array is not None:
+            array.flags.writeable = False
+    return mesh_arrays
+
+
+def export_jobs(
+    mesh_arrays,
+    triangulation_basename,
+    with_ply,
+    with_obj,
+    ply_format,
+    point_cloud=None,
+    tiles_directory=None,
+    tile_size=0.0,
+    point_cloud_format="ply",
+    quantization_bits=16,
+):
+    """The independent jobs writing the requested outputs of a geometry: one
+    job per format (and one for the tiles when requested). When the point
+    cloud is the vertex set of the triangulation, the job of a format writes
+    both its triangulation and point cloud files in a single pass (each chunk
+    of vertices being encoded once). With the "chunked" point cloud format,
+    the point cloud is written once, in a chunked point cloud file, instead of
+    once per format.
+
+    Args:
+        mesh_arrays (MeshArrays): the (read only) geometry to write
+        triangulation_basename (string): the name (without extension) of the
+           triangulation files
+        with_ply (boolean): write the PLY files
+        with_obj (boolean): write the OBJ files
+        ply_format (string): "binary" or "ascii"
+        point_cloud (SampledPointCloud): the point cloud (None for the vertex
+           set of the triangulation)
+        tiles_directory (string): the directory of the tiles
+        tile_size (float): the size of the tiles (no tiles when not strictly
+           positive)
+        point_cloud_format (string): "ply" (the point cloud files of each
+           format) or "chunked" (refer to chunked_point_cloud.py), the point
+           clouds of the tiles being written in that format as well
+        quantization_bits (int): the number of bits of the quantized
+           coordinates of the chunked point cloud
+    """
+    with_cloud_per_format = point_cloud_format != "chunked"
+    jobs = list()
+    if with_ply:
+        triangulation_filename = triangulation_basename + ".ply"
+        cloud_filename = point_cloud_filename(triangulation_filename)
+        if with_cloud_per_format and point_cloud is None:
+            jobs.append(
+                ExportJob(
+                    [triangulation_filename, cloud_filename],
+                    lambda: write_ply_files(
+                        triangulation_filename, cloud_filename, mesh_arrays, ply_format
+                    ),
+                )
+            )
+        else:
+            jobs.append(
+                ExportJob(
+                    [triangulation_filename],
+                    lambda: write_ply_files(
+                        triangulation_filename, None, mesh_arrays, ply_format
+                    ),
+                )
+            )
+        if with_cloud_per_format and point_cloud is not None:
+            jobs.append(
+                ExportJob(
+                    [cloud_filename],
+                    lambda: write_ply_point_cloud(
+                        cloud_filename, point_cloud, ply_format
+                    ),
+                )
+            )
+    if with_obj:
+        obj_triangulation_filename = triangulation_basename + ".obj"
+        obj_cloud_filename = point_cloud_filename(obj_triangulation_filename)
+        if with_cloud_per_format and point_cloud is None:
+            jobs.append(
+                ExportJob(
+                    [obj_triangulation_filename, obj_cloud_filename],
+                    lambda: write_obj_files(
+                        obj_triangulation_filename, obj_cloud_filename, mesh_arrays
+                    ),
+                )
+            )
+        else:
+            jobs.append(
+                ExportJob(
+                    [obj_triangulation_filename],
+                    lambda: write_obj_files(
+                        obj_triangulation_filename, None, mesh_arrays
+                    ),
+                )
+            )
+        if with_cloud_per_format and point_cloud is not None:
+            jobs.append(
+                ExportJob(
+                    [obj_cloud_filename],
+                    lambda: write_obj_point_cloud(obj_cloud_filename, point_cloud),
+                )
+            )
+    if not with_cloud_per_format and (with_ply or with_obj):
+        chunked_cloud_filename = point_cloud_filename(
+            triangulation_basename + CHUNKED_POINT_CLOUD_EXTENSION
+        )
+        # Surface samples (and voxel averages) of the geometry lie within the
+        # bounding box of its vertices
+        lower = mesh_arrays.positions.min(axis=0)
+        upper = mesh_arrays.positions.max(axis=0)
+        jobs.append(
+            ExportJob(
+                [chunked_cloud_filename],
+                lambda: write_chunked_point_cloud(
+                    chunked_cloud_filename,
+                    [mesh_arrays] if point_cloud is None else point_cloud.chunks(),
+                    lower,
+                    upper,
+                    quantization_bits,
+                ),
+            )
+        )
+    if tile_size > 0:
+        jobs.append(
+            ExportJob(
+                [os.path.join(tiles_directory, "index.json")],
+                lambda: export_to_tiles(
+                    mesh_arrays,
+                    tiles_directory,
+                    tile_size,
+                    False,
+                    point_cloud,
+                    point_cloud_format,
+                    quantization_bits,
+                ),
+            )
+        )
+    return jobs
+
+
+def run_export_jobs(jobs, workers=0, verbose_mode=False):
+    """Run the export jobs concurrently (in a thread pool) and report, for each
+    of them, its completion or failure.
+
+    The binary writers (PLY, chunked point cloud, tiles) mostly spend their
+    time in numpy conversions, zlib compressions and file writes, that
+    release the GIL: they overlap. The text writers (ASCII PLY, OBJ) are
+    bound by the Python string formatting of their lines, that holds the GIL:
+    they do not run faster concurrently, only their file writes overlap with
+    the other jobs.
+
+    Args:
+        jobs (list of ExportJob): the jobs to run
+        workers (int): the number of threads (one per job when 0)
+        verbose_mode (boolean): be verbose on CLI or not
+    Returns:
+        list of (list of strings, float): the file names written by each job
+           together with the time (in seconds) spent writing them
+    Raises:
+        RuntimeError: when some of the jobs failed (once all of them are over)
+    """
+    if not jobs:
+        return list()
+
+    def timed(job):
+        start = time.perf_counter()
+        job.function()
+        return time.perf_counter() - start
+
+    written = list()
+    failures = list()
+    with concurrent.futures.ThreadPoolExecutor(
+        max_workers=workers or len(jobs)
+    ) as executor:
+        futures = {executor.submit(timed, job): job for job in jobs}
+        for future in concurrent.futures.as_completed(futures):
+            job = futures[future]
+            filenames = ", ".join(job.filenames)
+            try:
+                seconds = future.result()
+            except Exception as error:
+                logger.error("Export of " + filenames + " failed: " + str(error))
+                if verbose_mode:
+                    print("Export FAILED:", filenames, ":", error)
+                failures.append(filenames)
+                continue
+            logger.info(
+                "Exported " + filenames + " in " + format(seconds, ".1f") + " s"
+            )
+            if verbose_mode:
+                print("Exported", filenames, "in", format(seconds, ".1f"), "s")
+            written.append((job.filenames, seconds))
+    if failures:
+        raise RuntimeError("Failed exports: " + ", ".join(failures))
+    return written
@@ -0,0 +1,186 @@
+import json
+import bpy
+from export_concurrently import export_jobs, read_only_mesh_arrays, run_export_jobs
+from export_to_ply_files import derived_filename
+from mesh_to_arrays import UI_object_with_mesh_to_arrays
+from sample_point_cloud import sample_point_cloud
+
+# Each subdivision level multiplies the number of faces by four: the level of
+# detail k is thus decimated to (1/4)^k of the faces of the resulting mesh.
+LOD_RATIO = 0.25
+
+
+def _temporary_copy(UI_geometry):
+    # A copy (mesh included) of a UI object, without its (not applied)
+    # modifiers, linked to the scene so that modifiers can be applied to it
+    copy = UI_geometry.copy()
+    copy.data = UI_geometry.data.copy()
+    copy.modifiers.clear()
+    bpy.context.scene.collection.objects.link(copy)
+    return copy
+
+
+def _remove_temporary_copy(copy):
+    mesh = copy.data
+    bpy.data.objects.remove(copy)
+    bpy.data.meshes.remove(mesh)
+
+
+def _collapse_decimate(UI_geometry, ratio):
+    """Apply a (collapse) decimation of given ratio to the mesh of a UI object
+    (whose color attributes and UV maps are interpolated by the collapse).
+
+    Args:
+        UI_geometry (bpy.types.Object): the UI object holding the mesh
+        ratio (float): the ratio of the faces to be kept
+    """
+    modifier = UI_geometry.modifiers.new("LOD_Decimate", "DECIMATE")
+    modifier.decimate_type = "COLLAPSE"
+    modifier.ratio = ratio
+    with bpy.context.temp_override(
+        selected_objects=[UI_geometry], object=UI_geometry, active_object=UI_geometry
+    ):
+        bpy.ops.object.modifier_apply(modifier=modifier.name)
+
+
+def level_sampling(ratio, point_count, point_spacing):
+    """The (point count, point spacing) of the point cloud sampling of a level
+    of detail holding the given ratio of the faces of the resulting geometry:
+    the sampling density follows the face density.
+
+    Returns:
+        (int, float): the point count and spacing of the level
+    """
+    if point_count > 0:
+        point_count = max(1, int(round(point_count * ratio)))
+    return point_count, point_spacing / ratio**0.5
+
+
+def export_lod_pyramid(
+    UI_geometry,
+    mesh_arrays,
+    triangulation_basename,
+    lod_levels,
+    ply_format,
+    with_ply,
+    with_obj,
+    verbose_mode,
+    point_cloud=None,
+    point_cloud_sampling="vertices",
+    point_count=0,
+    point_spacing=0.0,
+    point_cloud_seed=0,
+    point_cloud_format="ply",
+    quantization_bits=16,
+    export_workers=0,
+):
+    """Write the levels of detail of a resulting geometry together with their
+    (JSON) manifest.
+
+    The level 0 is the resulting geometry itself (whose files are expected to
+    be already written). Each coarser level k is a decimation of the resulting
+    geometry (refer to LOD_RATIO) written in files suffixed with "_lod_k".
+    The levels are decimated in cascade (on a temporary copy of the object)
+    each one out of the previous one, so that each collapse only processes
+    the faces of the previous (four times smaller) level.
+    The point cloud of each level is sampled and written as the one of the
+    resulting geometry (refer to export_concurrently.export_jobs()), the
+    point count (or spacing) being scaled to the faces of the level (refer
+    to level_sampling()).
+
+    Args:
+        UI_geometry (bpy.types.Object): the UI object holding the mesh
+        mesh_arrays (MeshArrays): the (already extracted) resulting geometry
+        triangulation_basename (string): the name (without extension) of the
+           triangulation files of the resulting geometry
+        lod_levels (int): the number of levels (including the level 0)
+        ply_format (string): "binary" or "ascii"
+        with_ply (boolean): write the PLY files
+        with_obj (boolean): write the OBJ files
+        verbose_mode (boolean): be verbose on CLI or not
+        point_cloud (SampledPointCloud): the point cloud of the resulting
+           geometry (None for its vertex set)
+        point_cloud_sampling (string): the sampling of the point clouds
+           (refer to sample_point_cloud())
+        point_count (int): the point count of the resulting geometry sampling
+        point_spacing (float): the point spacing of the resulting geometry
+           sampling
+        point_cloud_seed (int): the seed of the random samplings
+        point_cloud_format (string): "ply" or "chunked"
+        quantization_bits (int): the number of bits of the quantized
+           coordinates of the chunked point clouds
+        export_workers (int): the number of threads writing the files of a
+           level (one per file when 0)
+    Returns:
+        list of strings: the names of the written files (manifest included)
+    """
+
+    def level_jobs(level_arrays, basename, level_point_cloud):
+        return export_jobs(
+            level_arrays,
+            basename,
+            with_ply,
+            with_obj,
+            ply_format,
+            level_point_cloud,
+            point_cloud_format=point_cloud_format,
+            quantization_bits=quantization_bits,
+        )
+
+    def level_entry(level, ratio, level_arrays, level_point_cloud, jobs):
+        return {
+            "level": level,
+            "ratio": ratio,
+            "vertex_number": len(level_arrays.positions),
+            "triangle_number": len(level_arrays.triangles),
+            "point_number": (
+                len(level_arrays.positions)
+                if level_point_cloud is None
+                else level_point_cloud.point_number
+            ),
+            "files": [filename for job in jobs for filename in job.filenames],
+        }
+
+    # The jobs of the level 0 are only listed (its files are already written)
+    levels = [
+        level_entry(
+            0,
+            1.0,
+            mesh_arrays,
+            point_cloud,
+            level_jobs(mesh_arrays, triangulation_basename, point_cloud),
+        )
+    ]
+    written = list()
+    decimated = _temporary_copy(UI_geometry)
+    try:
+        for level in range(1, lod_levels):
+            _collapse_decimate(decimated, LOD_RATIO)
+            level_arrays = read_only_mesh_arrays(
+                UI_object_with_mesh_to_arrays(decimated)
+            )
+            ratio = LOD_RATIO**level
+            level_point_cloud = sample_point_cloud(
+                level_arrays,
+                point_cloud_sampling,
+                *level_sampling(ratio, point_count, point_spacing),
+                point_cloud_seed,
+            )
+            basename = triangulation_basename + "_lod_" + str(level)
+            jobs = level_jobs(level_arrays, basename, level_point_cloud)
+            run_export_jobs(jobs, export_workers, verbose_mode)
+            levels.append(
+                level_entry(level, ratio, level_arrays, level_point_cloud, jobs)
+            )
+            written += levels[-1]["files"]
+    finally:
+        _remove_temporary_copy(decimated)
+
+    manifest_filename = (
+        derived_filename(triangulation_basename, "lod_manifest") + ".json"
+    )
+    with open(manifest_filename, "w") as manifest_file:
+        json.dump({"levels": levels}, manifest_file, indent=2)
+    if verbose_mode:
+        print("Level of detail manifest written in ", manifest_filename)
+    return written + [manifest_filename]
@@ -1,42 +1,48 @@
-import bpy
-from bpyhelpers import convert_ply_triangulation_to_point_cloud
+import os
+from write_ply import write_ply_files, write_ply_point_cloud
 
 
-def export_to_ply_files(triangulation_filename, verbose_mode):
+def derived_filename(triangulation_filename, kind):
+    """Name of the file of given kind (e.g. "point_cloud") associated to a
+    triangulation file: "triangulation" is replaced by kind in the base name
+    only (the directories are left untouched)"""
+    directory, basename = os.path.split(triangulation_filename)
+    return os.path.join(directory, basename.replace("triangulation", kind))
+
+
+def point_cloud_filename(triangulation_filename):
+    """Name of the point cloud file associated to a triangulation file"""
+    return derived_filename(triangulation_filename, "point_cloud")
+
+
+def export_to_ply_files(
+    mesh_arrays, triangulation_filename, verbose_mode, ply_format, point_cloud=None
+):
     """Write (in `PLY` file format)
     - the triangulated surface
     - the associated point cloud
 
+    Both files are written in a single pass out of the same (in memory) mesh
+    arrays, that is without re-parsing the triangulation file in order to
+    derive the point cloud.
+
     Args:
+        mesh_arrays (MeshArrays): the geometry to write
         triangulation_filename (string): the named of the target PLY file to
         hold the triangulation
         verbose_mode (boolean): be verbose on CLI or not
-    Note: the name of the point cloud file
+        ply_format (string): "binary" or "ascii"
+        point_cloud (SampledPointCloud): the point cloud to write (None for
+        the vertex set of the triangulation)
+    Note: the name of the point cloud file is derived from the triangulation
+    file name (refer to point_cloud_filename())
     """
-    # Debug note: when the UI is on (that is when is script is invocated with
-    # "blender --python Cave.py") then the following ply_export() will
-    # trigger the following runtime error:
-    #    Operator bpy.ops.wm.ply_export.poll() failed, context is incorrect
-    # Note that trying to use
-    #    bpy.context.view_layer.objects.active = cave
-    #    cave.select_set(True)
-    # as suggested by
-    #   https://blender.stackexchange.com/questions/275149/runtimeerror-operator-bpy-ops-object-convert-poll-failed-context-is-incorrec
-    # won't help.
-    # The source of this error is probably that objects should be selected ?!?!
-    bpy.ops.wm.ply_export(
-        filepath=triangulation_filename,
-        check_existing=True,  # Check and warn on overwriting existing files
-        forward_axis="Y",
-        up_axis="Z",
-        global_scale=1.0,
-        apply_modifiers=False,
-        export_selected_objects=True,
-        export_uv=True,
-        export_normals=True,
-        export_colors="SRGB",
-        export_triangulated_mesh=True,
-        ascii_format=True,
-        filter_glob="*.ply",
-    )
-    convert_ply_triangulation_to_point_cloud(triangulation_filename, verbose_mode)
+    cloud_filename = point_cloud_filename(triangulation_filename)
+    if point_cloud is None:
+        write_ply_files(triangulation_filename, cloud_filename, mesh_arrays, ply_format)
+    else:
+        write_ply_files(triangulation_filename, None, mesh_arrays, ply_format)
+        write_ply_point_cloud(cloud_filename, point_cloud, ply_format)
+    if verbose_mode:
+        print("PLY triangulation written in ", triangulation_filename)
+        print("PLY point cloud written in ", cloud_filename)
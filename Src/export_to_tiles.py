@@ -0,0 +1,109 @@
+import json
+import os
+from chunked_point_cloud import CHUNKED_POINT_CLOUD_EXTENSION, write_chunked_point_cloud
+from tile_mesh_arrays import tile_mesh_arrays
+from write_ply import write_ply_files
+
+
+def _bounds(mesh_arrays):
+    if len(mesh_arrays.positions) == 0:
+        return None
+    return [
+        mesh_arrays.positions.min(axis=0).tolist(),
+        mesh_arrays.positions.max(axis=0).tolist(),
+    ]
+
+
+def export_to_tiles(
+    mesh_arrays,
+    tiles_directory,
+    tile_size,
+    verbose_mode,
+    point_cloud=None,
+    point_cloud_format="ply",
+    quantization_bits=16,
+):
+    """Write the triangulation and the point cloud partitioned along a regular
+    3D grid of tiles, each tile being written as its own (binary) PLY files,
+    together with an index file (index.json) giving for each tile its file
+    names, bounds and counts.
+
+    Args:
+        mesh_arrays (MeshArrays): the geometry to write
+        tiles_directory (string): the directory holding the resulting files
+        tile_size (float): the edge length of the (cubic) tiles
+        verbose_mode (boolean): be verbose on CLI or not
+        point_cloud (SampledPointCloud): the point cloud (None for the vertex
+           set of the triangulation)
+        point_cloud_format (string): "ply" or "chunked" (the point cloud of
+           each tile is then a chunked point cloud file, refer to
+           chunked_point_cloud.py)
+        quantization_bits (int): the number of bits of the quantized
+           coordinates of the chunked point clouds
+    Returns:
+        string: the name of the index file
+    """
+    os.makedirs(tiles_directory, exist_ok=True)
+    points = None if point_cloud is None else point_cloud.points()
+    point_cloud_extension = ".ply"
+    if point_cloud_format == "chunked":
+        point_cloud_extension = CHUNKED_POINT_CLOUD_EXTENSION
+    tiles = list()
+    for tile in tile_mesh_arrays(mesh_arrays, tile_size, points):
+        suffix = "_".join(str(c) for c in tile.coordinates)
+        triangulation_filename = None
+        if len(tile.triangulation.triangles):
+            triangulation_filename = "triangulation_" + suffix + ".ply"
+        point_cloud_filename = None
+        if len(tile.point_cloud.positions):
+            point_cloud_filename = "point_cloud_" + suffix + point_cloud_extension
+        if triangulation_filename:
+            write_ply_files(
+                os.path.join(tiles_directory, triangulation_filename),
+                None,
+                tile.triangulation,
+            )
+        if point_cloud_filename and point_cloud_format == "chunked":
+            write_chunked_point_cloud(
+                os.path.join(tiles_directory, point_cloud_filename),
+                [tile.point_cloud],
+                tile.point_cloud.positions.min(axis=0),
+                tile.point_cloud.positions.max(axis=0),
+                quantization_bits,
+            )
+        elif point_cloud_filename:
+            write_ply_files(
+                None,
+                os.path.join(tiles_directory, point_cloud_filename),
+                tile.point_cloud,
+            )
+        tiles.append(
+            {
+                "coordinates": list(tile.coordinates),
+                "cell": [tile.lower.tolist(), tile.upper.tolist()],
+                # The triangles overlapping the cell border make the bounds of
+                # the triangulation exceed the cell
+                "triangulation_bounds": _bounds(tile.triangulation),
+                "triangulation": triangulation_filename,
+                "vertex_number": len(tile.triangulation.positions),
+                "triangle_number": len(tile.triangulation.triangles),
+                "point_cloud": point_cloud_filename,
+                "point_number": len(tile.point_cloud.positions),
+            }
+        )
+
+    index_filename = os.path.join(tiles_directory, "index.json")
+    index = {
+        "tile_size": tile_size,
+        "bounds": _bounds(mesh_arrays),
+        "vertex_number": len(mesh_arrays.positions),
+        "triangle_number": len(mesh_arrays.triangles),
+        "point_number": sum(tile["point_number"] for tile in tiles),
+        "point_cloud_format": point_cloud_format,
+        "tiles": tiles,
+    }
+    with open(index_filename, "w") as index_file:
+        json.dump(index, index_file, indent=2)
+    if verbose_mode:
+        print(str(len(tiles)) + " tiles written in ", tiles_directory)
+    return index_filename
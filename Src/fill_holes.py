@@ -1,8 +1,8 @@
 import bmesh
-import bpyhelpers
 
-def fill_holes(UI_geometry):
-    """Fill in all holes (boundary edge list) with faces"""
+def fill_holes(mesh_session):
+    """Fill in all holes (boundary edge list) of the bmesh of a MeshSession
+    with faces"""
     # Getting UI based operators like bpy.ops.mesh.fill() or
     # bpy.ops.mesh.grid_fill() are difficult to get working since they
     # have implicit and most often under the hood "context" assumptions, 
@@ -18,11 +18,14 @@ def fill_holes(UI_geometry):
     #   bpy.ops.mesh.fill()
     # Hence, we resolve to using the "low" level interface.
 
-    cave_bmesh = bpyhelpers.UI_demote_UI_object_with_mesh_to_bmesh(UI_geometry)
-    boundaries = bpyhelpers.bmesh_get_boundaries(cave_bmesh)
-    for boundary in boundaries:
-        bmesh.ops.holes_fill(cave_bmesh, edges=boundary, sides=0)
-    # Note: it is KEY to write the bmesh back to the mesh, refer to
-    # https://docs.blender.org/api/current/bmesh.html#example-script
-    cave_bmesh.to_mesh(UI_geometry.data)
+    # A single (batched) operation fills all the holes: holes_fill fills
+    # each closed loop of the given boundary edges with its own face
+    boundaries = mesh_session.boundaries()
+    if boundaries:
+        bmesh.ops.holes_fill(
+            mesh_session.bmesh,
+            edges=[edge for boundary in boundaries for edge in boundary],
+            sides=0,
+        )
+    mesh_session.close_boundaries(range(len(boundaries)))
 
@@ -0,0 +1,325 @@
+import argparse
+import importlib
+import json
+import struct
+import time
+from multiprocessing import resource_tracker, shared_memory
+import numpy as np
+from batch import GENERATORS
+from mesh_to_arrays import MeshArrays
+
+# The overrides disabling all the file outputs of a generator
+NO_OUTPUTS = {
+    "no_ply_export": True,
+    "no_obj_export": True,
+    "no_run_report": True,
+    "tile_size": 0.0,
+    "lod_levels": 1,
+    "path_step": 0.0,
+    "out_of_core_patches": 0,
+    "cache_dir": None,
+}
+
+# Arrays of a shared memory block start on multiples of this alignment
+_ALIGNMENT = 64
+
+# The shared memory block starts with the (little endian uint64) size of the
+# JSON descriptor that follows it. The arrays start at the (aligned) end of
+# the descriptor.
+_DESCRIPTOR_SIZE = struct.Struct("<Q")
+
+
+def _generator_class(generator_name):
+    if generator_name not in GENERATORS:
+        raise ValueError(
+            "Unknown generator "
+            + str(generator_name)
+            + " (expecting one of "
+            + ", ".join(GENERATORS)
+            + ")"
+        )
+    return getattr(importlib.import_module(generator_name), generator_name)
+
+
+def _raise_value_error(message):
+    raise ValueError(message)
+
+
+def _option_value(name, action, value):
+    # The value of an option converted (and checked) as the parser would
+    if action.nargs == 0:
+        if not isinstance(value, bool):
+            raise ValueError("The option " + name + " expects a boolean")
+        return value
+    if value is None:
+        return action.default
+    if isinstance(value, list) and action.nargs != "+":
+        raise ValueError("The option " + name + " expects a single value")
+    values = value if isinstance(value, list) else [value]
+    if not values:
+        raise ValueError("The option " + name + " expects at least one value")
+    converted = list()
+    for item in values:
+        if isinstance(item, (bool, list, dict)):
+            raise ValueError("Invalid value " + repr(item) + " of option " + name)
+        try:
+            item = item if action.type is None else action.type(str(item))
+        except ValueError:
+            raise ValueError("Invalid value " + repr(item) + " of option " + name)
+        if action.choices is not None and item not in action.choices:
+            raise ValueError(
+                "Invalid value "
+                + repr(item)
+                + " of option "
+                + name
+                + " (expecting one of "
+                + ", ".join(action.choices)
+                + ")"
+            )
+        converted.append(item)
+    return converted if action.nargs == "+" else converted[0]
+
+
+def generation_arguments(generator_name, parameters=None):
+    """The validated options of a generation, without any command line
+    parsing.
+
+    Args:
+        generator_name (string): one of GENERATORS
+        parameters (dict): the (option name, value) of the generation, the
+           option names being the ones of the command line without the
+           leading "--" (or their attribute names, e.g. no_ply_export for
+           --no-ply-export). The omitted (or None) options take their default
+           value.
+    Returns:
+        argparse.Namespace: all the options of the generator
+    Raises:
+        ValueError: on unknown options, invalid values or unsupported
+           combinations of options
+    """
+    generator_class = _generator_class(generator_name)
+    parser = generator_class.argument_parser()
+    # The checks of the generator fail through the parser, that must raise
+    # instead of exiting the process
+    parser.error = _raise_value_error
+    actions = dict()
+    for action in parser._actions:
+        if isinstance(action, argparse._HelpAction):
+            continue
+        actions[action.dest] = action
+        for option in action.option_strings:
+            actions[option.lstrip("-")] = action
+    args = parser.parse_args([])
+    args.headless = True
+    for name, value in (parameters or {}).items():
+        if name not in actions:
+            raise ValueError(
+                "Unknown option " + str(name) + " of generator " + generator_name
+            )
+        action = actions[name]
+        setattr(args, action.dest, _option_value(name, action, value))
+    generator_class.check_arguments(parser, args)
+    return args
+
+
+def generate(generator_name, parameters=None, blender_object=None, with_outputs=False):
+    """Run a generator within the current process and return it, that is
+    without any command line parsing (the command line of the process is
+    ignored).
+
+    Args:
+        generator_name (string): one of GENERATORS
+        parameters (dict): the (option name, value) of the generation (refer
+           to generation_arguments())
+        blender_object (bpy.types.Object): the (pristine) source object (the
+           Blender file of the generator is loaded when None)
+        with_outputs (boolean): write the files requested by the parameters
+           (no file is written otherwise, refer to NO_OUTPUTS)
+    Returns:
+        Cave or Tunnel: the generator, whose resulting_mesh_arrays() provides
+           the resulting geometry
+    Raises:
+        ValueError: on invalid parameters (refer to generation_arguments())
+    """
+    parameters = dict(parameters or {})
+    if not with_outputs:
+        parameters.update(NO_OUTPUTS)
+    args = generation_arguments(generator_name, parameters)
+    return _generator_class(generator_name)([], blender_object, **vars(args))
+
+
+def generate_mesh_arrays(generator_name, parameters=None, blender_object=None):
+    """The resulting geometry of a generation (refer to generate()) as
+    contiguous arrays, without writing any file.
+
+    Returns:
+        MeshArrays: the positions, normals, colors, triangles and UVs
+    """
+    generator = generate(generator_name, parameters, blender_object)
+    return MeshArrays(
+        *(
+            None if array is None else np.ascontiguousarray(array)
+            for array in generator.resulting_mesh_arrays()
+        )
+    )
+
+
+class SharedMeshArrays:
+    """MeshArrays held by a named shared memory block, that processes of the
+    same node can map without any copy (refer to publish_mesh_arrays() and
+    attach_mesh_arrays()).
+
+    The block starts with a JSON descriptor of the arrays (data type, shape
+    and offset) followed by the (aligned) arrays themselves. The arrays of
+    mesh_arrays are views on the block: they must be released before the
+    block is closed.
+    """
+
+    def __init__(self, shared_memory_block, mesh_arrays):
+        self.shared_memory = shared_memory_block
+        self.mesh_arrays = mesh_arrays
+
+    @property
+    def name(self):
+        return self.shared_memory.name
+
+    def close(self):
+        """Release the mapping of the block (within this process)"""
+        self.mesh_arrays = None
+        self.shared_memory.close()
+
+    def unlink(self):
+        """Destroy the block (once all the processes closed it)"""
+        self.shared_memory.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exception):
+        self.close()
+
+
+def _aligned(offset):
+    return -(-offset // _ALIGNMENT) * _ALIGNMENT
+
+
+def _views(buffer, descriptor, data_offset):
+    # The offsets of the descriptor are relative to the start of the arrays
+    arrays = dict()
+    for field, entry in descriptor.items():
+        if entry is None:
+            arrays[field] = None
+            continue
+        dtype, shape, offset = entry
+        arrays[field] = np.ndarray(
+            shape, dtype=np.dtype(dtype), buffer=buffer, offset=data_offset + offset
+        )
+    return MeshArrays(**arrays)
+
+
+def publish_mesh_arrays(mesh_arrays, name=None):
+    """Copy the given geometry into a (new) named shared memory block.
+
+    Args:
+        mesh_arrays (MeshArrays): the geometry
+        name (string): the name of the block (a unique name is chosen when
+           None)
+    Returns:
+        SharedMeshArrays: the block, whose creator is in charge of unlinking it
+    """
+    descriptor = dict()
+    offset = 0
+    for field, array in zip(MeshArrays._fields, mesh_arrays):
+        if array is None:
+            descriptor[field] = None
+            continue
+        offset = _aligned(offset)
+        descriptor[field] = (array.dtype.str, list(array.shape), offset)
+        offset += array.nbytes
+    encoded = json.dumps(descriptor).encode("utf-8")
+    data_offset = _aligned(_DESCRIPTOR_SIZE.size + len(encoded))
+
+    block = shared_memory.SharedMemory(
+        name=name, create=True, size=max(data_offset + offset, 1)
+    )
+    _DESCRIPTOR_SIZE.pack_into(block.buf, 0, len(encoded))
+    block.buf[_DESCRIPTOR_SIZE.size : _DESCRIPTOR_SIZE.size + len(encoded)] = encoded
+    shared = _views(block.buf, descriptor, data_offset)
+    for source, target in zip(mesh_arrays, shared):
+        if source is not None:
+            target[...] = source
+    return SharedMeshArrays(block, shared)
+
+
+def attach_mesh_arrays(name):
+    """Map (without any copy) the geometry of a shared memory block published
+    by publish_mesh_arrays(). The arrays are read only.
+
+    Returns:
+        SharedMeshArrays: the block, to be closed (but not unlinked) once done
+    """
+    # The block is owned by its publisher: an attaching process must not
+    # (as the resource tracker of Python < 3.13 does) unlink it at exit
+    try:
+        block = shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        block = shared_memory.SharedMemory(name=name)
+        resource_tracker.unregister(block._name, "shared_memory")
+    (size,) = _DESCRIPTOR_SIZE.unpack_from(block.buf, 0)
+    descriptor = json.loads(
+        bytes(block.buf[_DESCRIPTOR_SIZE.size : _DESCRIPTOR_SIZE.size + size])
+    )
+    mesh_arrays = _views(block.buf, descriptor, _aligned(_DESCRIPTOR_SIZE.size + size))
+    for array in mesh_arrays:
+        if array is not None:
+            array.flags.writeable = False
+    return SharedMeshArrays(block, mesh_arrays)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="""
+        Generate a Cave/Tunnel within this process and publish the resulting
+        geometry in a named shared memory block (refer to attach_mesh_arrays())
+        until interrupted.
+        """,
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    parser.add_argument("generator", help="The generator", choices=GENERATORS)
+    parser.add_argument(
+        "--parameters",
+        help="JSON object of the generation options (command line names "
+        'without the leading "--", e.g. {"subdivision": 3})',
+        default="{}",
+        type=str,
+    )
+    parser.add_argument(
+        "--name",
+        help="Name of the shared memory block",
+        default="ribs_mesh_arrays",
+        type=str,
+    )
+    args = parser.parse_args()
+    mesh_arrays = generate_mesh_arrays(args.generator, json.loads(args.parameters))
+    shared = publish_mesh_arrays(mesh_arrays, args.name)
+    print(
+        "Published",
+        len(mesh_arrays.positions),
+        "vertices and",
+        len(mesh_arrays.triangles),
+        "triangles in shared memory block",
+        shared.name,
+        "(interrupt to release it)",
+    )
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        shared.close()
+        shared.unlink()
+
+
+if __name__ == "__main__":
+    main()
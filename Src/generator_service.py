@@ -0,0 +1,237 @@
+import argparse
+import concurrent.futures
+import http.server
+import itertools
+import json
+import multiprocessing
+import threading
+import time
+from batch import GENERATORS, run_configuration, warm_up
+
+# Number of the (most recent) finished jobs whose status is kept
+FINISHED_JOB_HISTORY = 1000
+
+
+def _check_parameters(parameters):
+    """Fail (with a ValueError) when the parameters of a job are not a
+    dictionary of option values, that are scalars or lists of scalars (refer
+    to batch.configuration_to_argv())."""
+    if not isinstance(parameters, dict):
+        raise ValueError("The job parameters must be a (JSON) object")
+    scalar_types = (bool, int, float, str, type(None))
+    for name, value in parameters.items():
+        if isinstance(value, list):
+            valid = all(isinstance(item, scalar_types) for item in value)
+        else:
+            valid = isinstance(value, scalar_types)
+        if not valid:
+            raise ValueError(
+                "The value of the job parameter "
+                + name
+                + " must be a scalar or a list of scalars"
+            )
+
+
+class GeneratorService:
+    """A queue of generation jobs run by pools of warm worker processes, one
+    pool per generator, at most `workers` jobs running at once (all
+    generators included).
+
+    Each worker process imports bpy, loads the Blender file of its generator
+    and keeps a pristine copy of the source object once and for all (refer to
+    batch.warm_up()): the jobs thus only pay for the generation itself.
+    The status of the FINISHED_JOB_HISTORY most recent finished jobs is kept.
+    """
+
+    def __init__(self, workers):
+        # The jobs are dispatched to the process pools by (at most) workers
+        # threads, each of them waiting for the completion of its job: the
+        # number of running jobs is thus bounded across the pools
+        self.__dispatcher = concurrent.futures.ThreadPoolExecutor(max_workers=workers)
+        self.__executors = {
+            generator_name: concurrent.futures.ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=warm_up,
+                initargs=(generator_name,),
+            )
+            for generator_name in GENERATORS
+        }
+        self.__jobs = dict()
+        self.__lock = threading.Lock()
+        self.__job_ids = itertools.count(1)
+
+    def submit(self, generator_name, parameters):
+        """Queue a job and return its identifier.
+
+        Args:
+            generator_name (string): one of GENERATORS
+            parameters (dict): the (option name, value) of the job, the option
+               names being the ones of the command line without the leading
+               "--" (refer to batch.configuration_to_argv())
+        """
+        if generator_name not in GENERATORS:
+            raise ValueError(
+                "Unknown generator "
+                + str(generator_name)
+                + " (expecting one of "
+                + ", ".join(GENERATORS)
+                + ")"
+            )
+        # Catch malformed parameters before they reach a worker
+        _check_parameters(parameters)
+        executor = self.__executors[generator_name]
+        with self.__lock:
+            self.__forget_finished_jobs()
+            job_id = next(self.__job_ids)
+            future = self.__dispatcher.submit(
+                lambda: executor.submit(run_configuration, job_id, parameters).result()
+            )
+            self.__jobs[job_id] = {
+                "id": job_id,
+                "generator": generator_name,
+                "parameters": parameters,
+                "submitted": time.time(),
+                "future": future,
+            }
+        return job_id
+
+    def __forget_finished_jobs(self):
+        # The jobs are ordered by identifier, that is by submission
+        finished = [
+            job_id for job_id, job in self.__jobs.items() if job["future"].done()
+        ]
+        for job_id in finished[: max(0, len(finished) - FINISHED_JOB_HISTORY)]:
+            del self.__jobs[job_id]
+
+    def __status(self, job):
+        status = {key: value for key, value in job.items() if key != "future"}
+        future = job["future"]
+        if not future.done():
+            status["status"] = "running" if future.running() else "queued"
+            return status
+        try:
+            status.update(future.result())
+        except Exception as error:
+            # E.g. a worker process that died
+            status["status"] = "failure"
+            status["error"] = repr(error)
+        return status
+
+    def job(self, job_id):
+        """The status of a job (None when unknown). Once the job is over, the
+        status holds its output file names and per stage timings."""
+        with self.__lock:
+            job = self.__jobs.get(job_id)
+        if job is None:
+            return None
+        return self.__status(job)
+
+    def jobs(self):
+        with self.__lock:
+            jobs = list(self.__jobs.values())
+        return [self.__status(job) for job in jobs]
+
+    def shutdown(self):
+        self.__dispatcher.shutdown(wait=False, cancel_futures=True)
+        for executor in self.__executors.values():
+            executor.shutdown(cancel_futures=True)
+
+
+class _RequestHandler(http.server.BaseHTTPRequestHandler):
+    # The service is set by serve()
+    service = None
+
+    def __reply(self, code, body):
+        encoded = json.dumps(body, indent=2).encode("utf-8")
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(encoded)))
+        self.end_headers()
+        self.wfile.write(encoded)
+
+    def do_POST(self):
+        if self.path.rstrip("/") != "/jobs":
+            self.__reply(404, {"error": "Unknown resource " + self.path})
+            return
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            request = json.loads(self.rfile.read(length) or b"{}")
+            if not isinstance(request, dict):
+                raise ValueError("The request body must be a (JSON) object")
+            job_id = self.service.submit(
+                request.get("generator"), request.get("parameters", {})
+            )
+        except ValueError as error:
+            self.__reply(400, {"error": str(error)})
+            return
+        self.__reply(202, {"id": job_id, "status": "queued"})
+
+    def do_GET(self):
+        parts = [part for part in self.path.split("/") if part]
+        if parts == ["jobs"]:
+            self.__reply(200, self.service.jobs())
+            return
+        if len(parts) == 2 and parts[0] == "jobs" and parts[1].isdigit():
+            status = self.service.job(int(parts[1]))
+            if status is not None:
+                self.__reply(200, status)
+                return
+        self.__reply(404, {"error": "Unknown resource " + self.path})
+
+
+def serve(host, port, workers):
+    """Serve (until interrupted) the job API:
+    - POST /jobs with a {"generator": "Cave", "parameters": {...}} body queues
+      a job and answers its identifier,
+    - GET /jobs/<id> answers the status of a job (queued, running, success or
+      failure) and, once over, its output file names and stage timings,
+    - GET /jobs answers the status of all the jobs.
+    """
+    service = GeneratorService(workers)
+    _RequestHandler.service = service
+    server = http.server.ThreadingHTTPServer((host, port), _RequestHandler)
+    print("Generator service listening on http://" + host + ":" + str(port))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="""
+        Run a (local) HTTP service queuing Cave/Tunnel generation jobs over
+        pools of warm worker processes (that keep bpy and the pristine source
+        objects loaded).
+        """,
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    parser.add_argument(
+        "--host",
+        help="Listening address (keep it local: the API is not authenticated)",
+        default="127.0.0.1",
+        type=str,
+    )
+    parser.add_argument(
+        "--port",
+        help="Listening port",
+        default=8765,
+        type=int,
+    )
+    parser.add_argument(
+        "--workers",
+        help="Number of jobs running at once (and of worker processes per "
+        "generator)",
+        default=2,
+        type=int,
+    )
+    args = parser.parse_args()
+    serve(args.host, args.port, args.workers)
+
+
+if __name__ == "__main__":
+    main()
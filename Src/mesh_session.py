@@ -0,0 +1,48 @@
+import bpyhelpers
+
+
+class MeshSession:
+    """A bmesh demoted (once) out of the mesh of a UI object, on which the
+    successive topological edits (bridging, hole filling) are realized, and
+    that is written back (once) to the mesh when these edits are over.
+
+    Demoting a (large) mesh to a bmesh and writing it back are full mesh
+    copies: sharing a session across the edits avoids realizing them once per
+    edit. The boundaries of the bmesh are computed once and then updated by
+    the edits (refer to close_boundaries()).
+    Until the first edit, the bmesh vertices are indexed in the order of the
+    mesh vertices.
+    """
+
+    def __init__(self, UI_geometry):
+        self.UI_geometry = UI_geometry
+        self.bmesh = bpyhelpers.UI_demote_UI_object_with_mesh_to_bmesh(UI_geometry)
+        self.bmesh.verts.index_update()
+        self.__boundaries = None
+
+    def boundaries(self):
+        """The boundaries (as lists of edges) of the bmesh"""
+        if self.__boundaries is None:
+            self.__boundaries = bpyhelpers.bmesh_get_boundaries(self.bmesh)
+        return self.__boundaries
+
+    def close_boundaries(self, boundary_indexes):
+        """Record that the boundaries of given indexes (in boundaries()) are
+        no longer boundaries (e.g. they were bridged or filled): the edits
+        only add faces, so that the edges of the other boundaries remain
+        boundary edges."""
+        closed = set(boundary_indexes)
+        self.__boundaries = [
+            boundary
+            for index, boundary in enumerate(self.boundaries())
+            if index not in closed
+        ]
+
+    def write_back(self):
+        """Write the bmesh back to the mesh and release it"""
+        # Note: it is KEY to write the bmesh back to the mesh, refer to
+        # https://docs.blender.org/api/current/bmesh.html#example-script
+        self.bmesh.to_mesh(self.UI_geometry.data)
+        self.bmesh.free()
+        self.bmesh = None
+        self.__boundaries = None
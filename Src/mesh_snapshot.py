@@ -0,0 +1,326 @@
+import collections
+import json
+import bpy
+import numpy as np
+
+# A (polygonal, as opposed to triangulated) mesh expressed as flat numpy
+# arrays that can be stored on disk and written back to a Blender mesh:
+#  - positions: (vertex_number, 3) float32 local coordinates,
+#  - edges: (edge_number, 2) int32 vertex indices of each edge,
+#  - polygon_sizes: (polygon_number,) int32 number of corners of each polygon,
+#  - corner_vertices: (corner_number,) int32 vertex index of each corner (the
+#    corners of a polygon being consecutive),
+#  - attributes: dictionary of the (generic) attributes of the mesh (UV maps,
+#    color attributes, material indices, creases...) associating to each
+#    attribute name its (domain, data_type, values) triplet,
+#  - active_color: name of the active color attribute (or None),
+#  - active_uv: name of the active UV map (or None),
+#  - vertex_groups: dictionary associating to each vertex group name the
+#    (vertex_number,) float32 weights of the vertices (NaN for the vertices
+#    that do not belong to the group or whose weight is null, which is the
+#    same for the modifiers).
+MeshSnapshot = collections.namedtuple(
+    "MeshSnapshot",
+    [
+        "positions",
+        "edges",
+        "polygon_sizes",
+        "corner_vertices",
+        "attributes",
+        "active_color",
+        "active_uv",
+        "vertex_groups",
+    ],
+)
+
+# For each (supported) attribute data type: the name of the property
+# accessed in bulk, the number of components and the numpy type
+_ATTRIBUTE_LAYOUTS = {
+    "FLOAT": ("value", 1, np.float32),
+    "INT": ("value", 1, np.int32),
+    "INT8": ("value", 1, np.int32),
+    "BOOLEAN": ("value", 1, bool),
+    "FLOAT2": ("vector", 2, np.float32),
+    "FLOAT_VECTOR": ("vector", 3, np.float32),
+    "FLOAT_COLOR": ("color", 4, np.float32),
+    "BYTE_COLOR": ("color", 4, np.float32),
+    "QUATERNION": ("value", 4, np.float32),
+}
+
+
+def _is_snapshot_attribute(attribute):
+    # Internal attributes (whose names start with a dot) and the positions
+    # are held by the mesh topology and positions arrays
+    return (
+        not attribute.name.startswith(".")
+        and attribute.name != "position"
+        and attribute.data_type in _ATTRIBUTE_LAYOUTS
+    )
+
+
+# Prefix of the (temporary) point attributes holding the vertex group weights
+_WEIGHT_ATTRIBUTE = "ribs_vertex_group_"
+
+
+def _vertex_group_weights(UI_geometry):
+    """The (vertex_group_number, vertex_number) float32 weights of the vertex
+    groups of a UI object (NaN for the vertices that are not in a group or
+    whose weight is null).
+
+    The weights of a vertex group can not be accessed in bulk, but geometry
+    nodes can store them in (per group) point attributes, that can: such
+    nodes are evaluated on a temporary (modifier free) object sharing the
+    mesh, which is left untouched."""
+    node_group = bpy.data.node_groups.new("ribs_vertex_groups", "GeometryNodeTree")
+    node_group.interface.new_socket(
+        "Geometry", in_out="INPUT", socket_type="NodeSocketGeometry"
+    )
+    node_group.interface.new_socket(
+        "Geometry", in_out="OUTPUT", socket_type="NodeSocketGeometry"
+    )
+    nodes, links = node_group.nodes, node_group.links
+    geometry = nodes.new("NodeGroupInput").outputs[0]
+    for group in UI_geometry.vertex_groups:
+        weight = nodes.new("GeometryNodeInputNamedAttribute")
+        weight.data_type = "FLOAT"
+        weight.inputs["Name"].default_value = group.name
+        store = nodes.new("GeometryNodeStoreNamedAttribute")
+        store.data_type = "FLOAT"
+        store.domain = "POINT"
+        store.inputs["Name"].default_value = _WEIGHT_ATTRIBUTE + str(group.index)
+        # The value sockets depend on the Blender version: the float ones are
+        # the ones of type VALUE
+        links.new(
+            next(socket for socket in weight.outputs if socket.type == "VALUE"),
+            next(socket for socket in store.inputs if socket.type == "VALUE"),
+        )
+        links.new(geometry, store.inputs["Geometry"])
+        geometry = store.outputs["Geometry"]
+    links.new(geometry, nodes.new("NodeGroupOutput").inputs[0])
+
+    # Copying an object does not copy its mesh
+    evaluator = UI_geometry.copy()
+    evaluator.modifiers.clear()
+    evaluator.modifiers.new("ribs_vertex_groups", "NODES").node_group = node_group
+    bpy.context.scene.collection.objects.link(evaluator)
+    try:
+        depsgraph = bpy.context.evaluated_depsgraph_get()
+        mesh = evaluator.evaluated_get(depsgraph).data
+        weights = np.empty(
+            (len(UI_geometry.vertex_groups), len(mesh.vertices)), dtype=np.float32
+        )
+        for group in UI_geometry.vertex_groups:
+            mesh.attributes[_WEIGHT_ATTRIBUTE + str(group.index)].data.foreach_get(
+                "value", weights[group.index]
+            )
+    finally:
+        bpy.data.objects.remove(evaluator)
+        bpy.data.node_groups.remove(node_group)
+    # The non members of a group are evaluated as of null weight
+    weights[weights == 0] = np.nan
+    return weights
+
+
+def UI_object_with_mesh_to_snapshot(UI_geometry, with_vertex_groups=False):
+    """Extract (in bulk) the mesh of a UI object as a MeshSnapshot.
+
+    Args:
+        UI_geometry (bpy.types.Object): the UI object holding the mesh
+        with_vertex_groups (boolean): also extract the vertex group weights
+           (refer to _vertex_group_weights())
+    """
+    mesh = UI_geometry.data
+    positions = np.empty(len(mesh.vertices) * 3, dtype=np.float32)
+    mesh.vertices.foreach_get("co", positions)
+    edges = np.empty(len(mesh.edges) * 2, dtype=np.int32)
+    mesh.edges.foreach_get("vertices", edges)
+    polygon_sizes = np.empty(len(mesh.polygons), dtype=np.int32)
+    mesh.polygons.foreach_get("loop_total", polygon_sizes)
+    corner_vertices = np.empty(len(mesh.loops), dtype=np.int32)
+    mesh.loops.foreach_get("vertex_index", corner_vertices)
+
+    attributes = dict()
+    for attribute in mesh.attributes:
+        if not _is_snapshot_attribute(attribute):
+            continue
+        property_name, components, dtype = _ATTRIBUTE_LAYOUTS[attribute.data_type]
+        values = np.empty(len(attribute.data) * components, dtype=dtype)
+        attribute.data.foreach_get(property_name, values)
+        if components > 1:
+            values = values.reshape(-1, components)
+        attributes[attribute.name] = (attribute.domain, attribute.data_type, values)
+
+    active_color = mesh.color_attributes.active_color
+    active_uv = mesh.uv_layers.active
+
+    vertex_groups = dict()
+    if with_vertex_groups and UI_geometry.vertex_groups:
+        weights = _vertex_group_weights(UI_geometry)
+        for group in UI_geometry.vertex_groups:
+            vertex_groups[group.name] = weights[group.index]
+
+    return MeshSnapshot(
+        positions.reshape(-1, 3),
+        edges.reshape(-1, 2),
+        polygon_sizes,
+        corner_vertices,
+        attributes,
+        active_color.name if active_color else None,
+        active_uv.name if active_uv else None,
+        vertex_groups,
+    )
+
+
+def snapshot_to_UI_object_mesh(snapshot, UI_geometry):
+    """Replace the mesh of a UI object with a new mesh built out of a
+    MeshSnapshot. The materials of the former mesh are kept."""
+    previous_mesh = UI_geometry.data
+    mesh_name = previous_mesh.name
+    mesh = bpy.data.meshes.new(mesh_name + "_snapshot")
+    mesh.vertices.add(len(snapshot.positions))
+    mesh.vertices.foreach_set("co", snapshot.positions.ravel())
+    # The edges are provided prior to the polygons in order for the edge
+    # ordering (and thus the edge attributes) to be preserved.
+    mesh.edges.add(len(snapshot.edges))
+    mesh.edges.foreach_set("vertices", snapshot.edges.ravel())
+    mesh.loops.add(len(snapshot.corner_vertices))
+    mesh.loops.foreach_set("vertex_index", snapshot.corner_vertices)
+    mesh.polygons.add(len(snapshot.polygon_sizes))
+    loop_starts = np.concatenate(([0], np.cumsum(snapshot.polygon_sizes)[:-1]))
+    mesh.polygons.foreach_set("loop_start", loop_starts.astype(np.int32))
+    mesh.update(calc_edges=True)
+
+    for material in previous_mesh.materials:
+        mesh.materials.append(material)
+    for name, (domain, data_type, values) in snapshot.attributes.items():
+        attribute = mesh.attributes.get(name)
+        if attribute is None:
+            attribute = mesh.attributes.new(name, data_type, domain)
+        property_name = _ATTRIBUTE_LAYOUTS[data_type][0]
+        attribute.data.foreach_set(property_name, values.ravel())
+    if snapshot.active_color:
+        mesh.color_attributes.active_color = mesh.color_attributes[
+            snapshot.active_color
+        ]
+    if snapshot.active_uv:
+        mesh.uv_layers.active = mesh.uv_layers[snapshot.active_uv]
+
+    UI_geometry.data = mesh
+    if previous_mesh.users == 0:
+        bpy.data.meshes.remove(previous_mesh)
+    mesh.name = mesh_name
+
+    for name, weights in snapshot.vertex_groups.items():
+        group = UI_geometry.vertex_groups.get(name)
+        if group is None:
+            group = UI_geometry.vertex_groups.new(name=name)
+        members = np.flatnonzero(~np.isnan(weights))
+        # Vertices are added by batches of identical weight
+        unique_weights, inverse = np.unique(weights[members], return_inverse=True)
+        for weight_index, weight in enumerate(unique_weights):
+            group.add(
+                members[inverse == weight_index].tolist(), float(weight), "REPLACE"
+            )
+
+
+def snapshot_subset(snapshot, faces):
+    """Return the snapshot restricted to the given faces (sorted indices),
+    that is with only their corners, their edges and their vertices (which
+    are re-indexed densely). The attributes and vertex groups follow."""
+    polygon_starts = np.concatenate(([0], np.cumsum(snapshot.polygon_sizes)[:-1]))
+    sizes = snapshot.polygon_sizes[faces]
+    local_corners = np.arange(np.sum(sizes)) - np.repeat(
+        np.cumsum(sizes) - sizes, sizes
+    )
+    corners = np.repeat(polygon_starts[faces], sizes) + local_corners
+    # The corner following each corner within its face
+    next_corners = np.where(
+        local_corners + 1 == np.repeat(sizes, sizes),
+        corners - local_corners,
+        corners + 1,
+    )
+
+    vertex_number = len(snapshot.positions)
+
+    def edge_keys(first, second):
+        first, second = np.minimum(first, second), np.maximum(first, second)
+        return first.astype(np.int64) * vertex_number + second
+
+    face_edge_keys = edge_keys(
+        snapshot.corner_vertices[corners], snapshot.corner_vertices[next_corners]
+    )
+    edges = np.flatnonzero(
+        np.isin(edge_keys(snapshot.edges[:, 0], snapshot.edges[:, 1]), face_edge_keys)
+    )
+    vertices = np.unique(snapshot.corner_vertices[corners])
+    new_vertex_indices = np.full(vertex_number, -1, dtype=np.int32)
+    new_vertex_indices[vertices] = np.arange(len(vertices), dtype=np.int32)
+
+    domain_indices = {
+        "POINT": vertices,
+        "EDGE": edges,
+        "FACE": faces,
+        "CORNER": corners,
+    }
+    attributes = dict()
+    for name, (domain, data_type, values) in snapshot.attributes.items():
+        attributes[name] = (domain, data_type, values[domain_indices[domain]])
+    vertex_groups = {
+        name: weights[vertices] for name, weights in snapshot.vertex_groups.items()
+    }
+    return snapshot._replace(
+        positions=snapshot.positions[vertices],
+        edges=new_vertex_indices[snapshot.edges[edges]],
+        polygon_sizes=sizes,
+        corner_vertices=new_vertex_indices[snapshot.corner_vertices[corners]],
+        attributes=attributes,
+        vertex_groups=vertex_groups,
+    )
+
+
+def write_snapshot(filename, snapshot):
+    """Write (as uncompressed numpy binary arrays) a MeshSnapshot"""
+    arrays = {
+        "positions": snapshot.positions,
+        "edges": snapshot.edges,
+        "polygon_sizes": snapshot.polygon_sizes,
+        "corner_vertices": snapshot.corner_vertices,
+    }
+    metadata = {
+        "attributes": dict(),
+        "active_color": snapshot.active_color,
+        "active_uv": snapshot.active_uv,
+        "vertex_groups": list(snapshot.vertex_groups),
+    }
+    for index, (name, (domain, data_type, values)) in enumerate(
+        snapshot.attributes.items()
+    ):
+        metadata["attributes"][name] = (domain, data_type, index)
+        arrays["attribute_" + str(index)] = values
+    for index, weights in enumerate(snapshot.vertex_groups.values()):
+        arrays["vertex_group_" + str(index)] = weights
+    arrays["metadata"] = np.array(json.dumps(metadata))
+    with open(filename, "wb") as snapshot_file:
+        np.savez(snapshot_file, **arrays)
+
+
+def read_snapshot(filename):
+    """Read a MeshSnapshot written by write_snapshot()"""
+    with np.load(filename) as arrays:
+        metadata = json.loads(str(arrays["metadata"]))
+        attributes = dict()
+        for name, (domain, data_type, index) in metadata["attributes"].items():
+            attributes[name] = (domain, data_type, arrays["attribute_" + str(index)])
+        vertex_groups = dict()
+        for index, name in enumerate(metadata["vertex_groups"]):
+            vertex_groups[name] = arrays["vertex_group_" + str(index)]
+        return MeshSnapshot(
+            arrays["positions"],
+            arrays["edges"],
+            arrays["polygon_sizes"],
+            arrays["corner_vertices"],
+            attributes,
+            metadata["active_color"],
+            metadata["active_uv"],
+            vertex_groups,
+        )
@@ -0,0 +1,150 @@
+import collections
+import numpy as np
+
+# The geometry of a (triangulated) mesh expressed as flat numpy arrays:
+#  - positions: (vertex_number, 3) float32 world coordinates,
+#  - normals: (vertex_number, 3) float32 unit vertex normals,
+#  - colors: (vertex_number, 4) uint8 sRGB colors (RGBA) or None when the
+#    mesh has no color attribute,
+#  - triangles: (triangle_number, 3) int32 vertex indices,
+#  - uvs: (triangle_number, 3, 2) float32 texture coordinates of the corners
+#    of the triangles (out of the active UV map) or None when the mesh has no
+#    UV map. They are held per corner since a vertex lying on a UV seam has
+#    several texture coordinates.
+MeshArrays = collections.namedtuple(
+    "MeshArrays",
+    ["positions", "normals", "colors", "triangles", "uvs"],
+    defaults=(None,),
+)
+
+
+def UI_object_with_mesh_to_arrays(UI_geometry):
+    """Extract (in bulk) the geometry of the mesh of a UI object as arrays.
+
+    The mesh is read as is, that is without applying the (remaining)
+    modifiers, which is what the `apply_modifiers=False` option of the
+    Blender exporters does. The world transform of the object is applied.
+
+    Args:
+        UI_geometry (bpy.types.Object): the UI object holding the mesh
+    Returns:
+        MeshArrays: the positions, normals, colors, triangles and UVs
+    """
+    mesh = UI_geometry.data
+    vertex_number = len(mesh.vertices)
+
+    positions = np.empty(vertex_number * 3, dtype=np.float32)
+    mesh.vertices.foreach_get("co", positions)
+    positions = positions.reshape(-1, 3)
+
+    normals = np.empty(vertex_number * 3, dtype=np.float32)
+    mesh.vertex_normals.foreach_get("vector", normals)
+    normals = normals.reshape(-1, 3)
+
+    matrix = np.array(UI_geometry.matrix_world, dtype=np.float64)
+    linear = matrix[:3, :3]
+    positions = (positions @ linear.T + matrix[:3, 3]).astype(np.float32)
+    # Normals are transformed with the inverse transpose of the linear part
+    normals = normals @ np.linalg.inv(linear)
+    lengths = np.linalg.norm(normals, axis=1, keepdims=True)
+    lengths[lengths == 0.0] = 1.0
+    normals = (normals / lengths).astype(np.float32)
+
+    colors = UI_object_with_mesh_to_colors(UI_geometry)
+
+    mesh.calc_loop_triangles()
+    triangles = np.empty(len(mesh.loop_triangles) * 3, dtype=np.int32)
+    mesh.loop_triangles.foreach_get("vertices", triangles)
+    triangles = triangles.reshape(-1, 3)
+
+    uvs = None
+    uv_layer = mesh.uv_layers.active
+    if uv_layer is not None:
+        triangle_loops = np.empty(len(mesh.loop_triangles) * 3, dtype=np.int32)
+        mesh.loop_triangles.foreach_get("loops", triangle_loops)
+        loop_uvs = np.empty(len(mesh.loops) * 2, dtype=np.float32)
+        uv_layer.data.foreach_get("uv", loop_uvs)
+        uvs = loop_uvs.reshape(-1, 2)[triangle_loops].reshape(-1, 3, 2)
+
+    return MeshArrays(positions, normals, colors, triangles, uvs)
+
+
+def UI_object_with_mesh_to_colors(UI_geometry):
+    """The (vertex_number, 4) uint8 sRGB colors (RGBA) of the active color
+    attribute of the mesh of a UI object, None when the mesh has no color
+    attribute."""
+    mesh = UI_geometry.data
+    color_attribute = mesh.color_attributes.active_color
+    if color_attribute is None:
+        return None
+    return _vertex_colors(mesh, color_attribute, len(mesh.vertices))
+
+
+def positions_to_UI_object_mesh(positions, UI_geometry):
+    """Overwrite the vertex positions of the mesh of a UI object (of same
+    topology), that is the inverse of the positions of
+    UI_object_with_mesh_to_arrays().
+
+    Args:
+        positions (numpy array): the (vertex_number, 3) world coordinates
+        UI_geometry (bpy.types.Object): the UI object holding the mesh
+    """
+    mesh = UI_geometry.data
+    if len(positions) != len(mesh.vertices):
+        raise ValueError(
+            "Expecting "
+            + str(len(mesh.vertices))
+            + " vertex positions (got "
+            + str(len(positions))
+            + ")"
+        )
+    matrix = np.array(UI_geometry.matrix_world, dtype=np.float64)
+    local = (positions - matrix[:3, 3]) @ np.linalg.inv(matrix[:3, :3]).T
+    mesh.vertices.foreach_set("co", local.astype(np.float32).ravel())
+    mesh.update()
+
+
+def _vertex_colors(mesh, color_attribute, vertex_number):
+    # Return the (sRGB) colors of the given attribute as one RGBA uint8
+    # color per vertex. When the colors are held at face corners (which is
+    # the case when baking to "CORNER" domain attributes), the color of a
+    # vertex is the average of the colors of its corners.
+    values = np.empty(len(color_attribute.data) * 4, dtype=np.float32)
+    color_attribute.data.foreach_get("color_srgb", values)
+    values = values.reshape(-1, 4)
+    if color_attribute.domain == "CORNER":
+        loop_vertices = np.empty(len(mesh.loops), dtype=np.int32)
+        mesh.loops.foreach_get("vertex_index", loop_vertices)
+        values = corner_to_vertex_average(loop_vertices, values, vertex_number)
+    return np.round(np.clip(values, 0.0, 1.0) * 255.0).astype(np.uint8)
+
+
+def corner_to_vertex_average(corner_vertices, values, vertex_number):
+    """Average per vertex the values held at the face corners.
+
+    Args:
+        corner_vertices (numpy array): (corner_number,) vertex index of each
+           corner
+        values (numpy array): (corner_number, channels) values of the corners
+        vertex_number (int): the number of vertices
+    Returns:
+        numpy array: (vertex_number, channels) float64 average of the values
+           of the corners of each vertex (zero for the vertices without
+           corner)
+    """
+    counts = np.bincount(corner_vertices, minlength=vertex_number)
+    counts[counts == 0] = 1
+    return (
+        np.stack(
+            [
+                np.bincount(
+                    corner_vertices,
+                    weights=values[:, channel],
+                    minlength=vertex_number,
+                )
+                for channel in range(values.shape[1])
+            ],
+            axis=1,
+        )
+        / counts[:, None]
+    )
@@ -0,0 +1,148 @@
+import collections
+import logging
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# The topological characteristics of a (surface) mesh
+MeshTopology = collections.namedtuple(
+    "MeshTopology",
+    [
+        "vertex_number",
+        "edge_number",
+        "face_number",
+        "euler_characteristic",
+        "boundary_edge_number",
+        "boundary_number",
+        "genus",
+    ],
+)
+
+
+def _connected_component_labels(vertex_number, edges):
+    """Label each vertex with the smallest vertex index of its connected
+    component (for the graph of given edges). This is a vectorized union-find:
+    each pass hooks the vertices of every edge to their smallest label and
+    then compresses the paths (pointer jumping) until a fixed point."""
+    labels = np.arange(vertex_number)
+    if len(edges) == 0:
+        return labels
+    first, second = edges[:, 0], edges[:, 1]
+    while True:
+        hooked = np.minimum(labels[first], labels[second])
+        previous = labels.copy()
+        np.minimum.at(labels, labels[first], hooked)
+        np.minimum.at(labels, labels[second], hooked)
+        while True:
+            compressed = labels[labels]
+            if np.array_equal(compressed, labels):
+                break
+            labels = compressed
+        if np.array_equal(labels, previous):
+            return labels
+
+
+def boundary_loop_number(boundary_edges):
+    """The number of boundaries (closed loops) formed by the given boundary
+    edges, that is the number of connected components of their graph.
+
+    Args:
+        boundary_edges (numpy array): (edge_number, 2) vertex indices of each
+           boundary edge (the indices need not be dense)
+    """
+    if len(boundary_edges) == 0:
+        return 0
+    # Only the vertices sitting on a boundary matter: re-index them densely
+    boundary_vertices, boundary_edges = np.unique(boundary_edges, return_inverse=True)
+    labels = _connected_component_labels(
+        len(boundary_vertices), boundary_edges.reshape(-1, 2)
+    )
+    return len(np.unique(labels))
+
+
+def boundary_number(edges, edge_face_numbers):
+    """The number of boundaries (closed loops of boundary edges) of a mesh.
+
+    Args:
+        edges (numpy array): (edge_number, 2) vertex indices of each edge
+        edge_face_numbers (numpy array): number of faces incident to each edge
+    """
+    return boundary_loop_number(edges[edge_face_numbers == 1])
+
+
+def UI_object_with_mesh_to_topology(UI_geometry):
+    """Compute (with bulk accessors and without any bmesh demotion) the
+    topological characteristics of the mesh of a UI object.
+
+    Args:
+        UI_geometry (bpy.types.Object): the UI object holding the mesh
+    """
+    mesh = UI_geometry.data
+    edges = np.empty(len(mesh.edges) * 2, dtype=np.int32)
+    mesh.edges.foreach_get("vertices", edges)
+    edges = edges.reshape(-1, 2)
+    corner_edges = np.empty(len(mesh.loops), dtype=np.int32)
+    mesh.loops.foreach_get("edge_index", corner_edges)
+    # Each corner of a face designates the edge leaving it: the number of
+    # faces incident to an edge is thus the number of corners designating it
+    edge_face_numbers = np.bincount(corner_edges, minlength=len(edges))
+
+    vertex_number = len(mesh.vertices)
+    face_number = len(mesh.polygons)
+    euler_characteristic = vertex_number - len(edges) + face_number
+    boundaries = boundary_number(edges, edge_face_numbers)
+    # For a connected orientable surface with boundaries:
+    #   euler_characteristic = 2 - 2 * genus - boundary_number
+    genus = (2 - euler_characteristic - boundaries) // 2
+    return MeshTopology(
+        vertex_number,
+        len(edges),
+        face_number,
+        euler_characteristic,
+        int(np.count_nonzero(edge_face_numbers == 1)),
+        boundaries,
+        genus,
+    )
+
+
+def print_topological_characteristics(topology):
+    print("Number of vertices: ", topology.vertex_number)
+    print("Number of edges: ", topology.edge_number)
+    print("Number of faces: ", topology.face_number)
+    print("Euler characteristic: ", topology.euler_characteristic)
+    print("Number of boundary edges: ", topology.boundary_edge_number)
+    print("Number of boundaries: ", topology.boundary_number)
+    print("Genus: ", topology.genus)
+
+
+def assert_genus_number_boundaries(
+    topology, expected_genus, expected_boundary_number, message
+):
+    """Assert that the topology has the expected genus and number of
+    boundaries, failing with the given message otherwise.
+
+    Args:
+        topology (MeshTopology): the characteristics of the mesh
+        expected_genus (int): the expected genus
+        expected_boundary_number (int): the expected number of boundaries
+        message (string): the message of the failure
+    """
+    if (
+        topology.genus == expected_genus
+        and topology.boundary_number == expected_boundary_number
+    ):
+        return
+    logger.error(
+        message
+        + " Expected genus "
+        + str(expected_genus)
+        + " (got "
+        + str(topology.genus)
+        + ") and "
+        + str(expected_boundary_number)
+        + " boundaries (got "
+        + str(topology.boundary_number)
+        + ")."
+    )
+    print_topological_characteristics(topology)
+    raise AssertionError(message)
@@ -0,0 +1,320 @@
+import itertools
+import logging
+import bpy
+import numpy as np
+from mesh_snapshot import (
+    UI_object_with_mesh_to_snapshot,
+    snapshot_subset,
+    snapshot_to_UI_object_mesh,
+)
+from mesh_to_arrays import MeshArrays, UI_object_with_mesh_to_arrays
+from mesh_topology import MeshTopology, boundary_loop_number
+from sample_texture_colors import sample_texture_colors
+from write_ply import StreamedPlyWriter
+
+logger = logging.getLogger(__name__)
+
+# Name of the (face) attribute flagging the core faces of a patch, as opposed
+# to the faces of its halo
+CORE_ATTRIBUTE = "ribs_core"
+
+# Vertices of distinct patches closer than this fraction of the diagonal of
+# the base mesh are considered to be the same (seam) vertex
+SEAM_TOLERANCE = 1e-5
+
+# Number of bits of each quantized coordinate of a seam vertex key
+_KEY_BITS = 21
+
+
+def _polygon_starts(snapshot):
+    return np.concatenate(([0], np.cumsum(snapshot.polygon_sizes)[:-1]))
+
+
+def face_patches(snapshot, patch_faces):
+    """Partition the faces of a mesh in patches of (at most) patch_faces faces
+    by recursive coordinate bisection of the face centroids: each patch is
+    thus a compact region of the surface (with a short border).
+
+    Args:
+        snapshot (MeshSnapshot): the (base) mesh
+        patch_faces (int): the maximal number of faces of a patch
+    Returns:
+        list of numpy arrays: the (sorted) face indices of each patch
+    """
+    centroids = (
+        np.add.reduceat(
+            snapshot.positions[snapshot.corner_vertices], _polygon_starts(snapshot)
+        )
+        / snapshot.polygon_sizes[:, None]
+    )
+    patches = list()
+    to_split = [np.arange(len(snapshot.polygon_sizes))]
+    while to_split:
+        faces = to_split.pop()
+        if len(faces) <= patch_faces:
+            patches.append(np.sort(faces))
+            continue
+        face_centroids = centroids[faces]
+        axis = np.argmax(np.ptp(face_centroids, axis=0))
+        order = np.argsort(face_centroids[:, axis], kind="stable")
+        half = len(faces) // 2
+        to_split += [faces[order[half:]], faces[order[:half]]]
+    return patches
+
+
+def halo_faces(snapshot, faces):
+    """The faces (not in the given ones) sharing a vertex with the given
+    faces. Subdividing the faces together with this one ring halo yields
+    the same (Catmull-Clark) positions and normals as subdividing the whole
+    mesh, the subdivision stencils being local."""
+    vertices = np.zeros(len(snapshot.positions), dtype=bool)
+    polygon_starts = _polygon_starts(snapshot)
+    sizes = snapshot.polygon_sizes[faces]
+    corners = np.repeat(polygon_starts[faces], sizes) + (
+        np.arange(np.sum(sizes)) - np.repeat(np.cumsum(sizes) - sizes, sizes)
+    )
+    vertices[snapshot.corner_vertices[corners]] = True
+    touching = np.logical_or.reduceat(
+        vertices[snapshot.corner_vertices], polygon_starts
+    )
+    touching[faces] = False
+    return np.flatnonzero(touching)
+
+
+class _SeamVertices:
+    """The written vertices that are shared with patches yet to be processed,
+    looked up by (quantized) position"""
+
+    def __init__(self, lower, tolerance):
+        self.__lower = lower
+        self.__tolerance = tolerance
+        self.__keys = np.empty(0, dtype=np.int64)
+        self.__indices = np.empty(0, dtype=np.int64)
+        self.__positions = np.empty((0, 3), dtype=np.float32)
+
+    def __cells(self, positions):
+        cells = np.floor((positions - self.__lower) / self.__tolerance)
+        return np.clip(cells, 1, (1 << _KEY_BITS) - 2).astype(np.int64)
+
+    @staticmethod
+    def __keys_of(cells):
+        return (
+            (cells[:, 0] << (2 * _KEY_BITS)) | (cells[:, 1] << _KEY_BITS) | cells[:, 2]
+        )
+
+    def match(self, positions):
+        """The (global) index of the recorded vertex closest to each of the
+        given positions within the tolerance (-1 when there is none)"""
+        matches = np.full(len(positions), -1, dtype=np.int64)
+        if len(self.__keys) == 0 or len(positions) == 0:
+            return matches
+        distances = np.full(len(positions), self.__tolerance**2)
+        cells = self.__cells(positions)
+        # The cells being of tolerance size, a match sits in a neighbor cell
+        for offset in itertools.product((-1, 0, 1), repeat=3):
+            keys = self.__keys_of(cells + offset)
+            found = np.searchsorted(self.__keys, keys).clip(max=len(self.__keys) - 1)
+            hit = np.flatnonzero(self.__keys[found] == keys)
+            candidates = found[hit]
+            hit_distances = np.sum(
+                (positions[hit] - self.__positions[candidates]) ** 2, axis=1
+            )
+            closer = hit_distances <= distances[hit]
+            distances[hit[closer]] = hit_distances[closer]
+            matches[hit[closer]] = self.__indices[candidates[closer]]
+        return matches
+
+    def record(self, positions, indices):
+        """Record the given vertices (of given global indices)"""
+        keys = self.__keys_of(self.__cells(positions))
+        order = np.argsort(keys, kind="stable")
+        where = np.searchsorted(self.__keys, keys[order])
+        self.__keys = np.insert(self.__keys, where, keys[order])
+        self.__indices = np.insert(self.__indices, where, indices[order])
+        self.__positions = np.insert(self.__positions, where, positions[order], axis=0)
+
+
+def _subdivided_patch(UI_geometry, snapshot, modifier_names):
+    """The mesh arrays of the given patch (core and halo faces) once the
+    given modifiers are applied and the colors sampled, together with the
+    mask of the triangles of the core faces"""
+    patch = UI_geometry.copy()
+    patch.data = UI_geometry.data.copy()
+    bpy.context.scene.collection.objects.link(patch)
+    try:
+        snapshot_to_UI_object_mesh(snapshot, patch)
+        for modifier in list(patch.modifiers):
+            if modifier.name not in modifier_names:
+                patch.modifiers.remove(modifier)
+        with bpy.context.temp_override(
+            selected_objects=[patch], object=patch, active_object=patch
+        ):
+            for modifier_name in modifier_names:
+                bpy.ops.object.modifier_apply(modifier=modifier_name)
+        sample_texture_colors(patch)
+        mesh_arrays = UI_object_with_mesh_to_arrays(patch)
+        mesh = patch.data
+        triangle_polygons = np.empty(len(mesh.loop_triangles), dtype=np.int32)
+        mesh.loop_triangles.foreach_get("polygon_index", triangle_polygons)
+        core_faces = np.empty(len(mesh.polygons), dtype=np.int32)
+        mesh.attributes[CORE_ATTRIBUTE].data.foreach_get("value", core_faces)
+        return mesh_arrays, core_faces[triangle_polygons] != 0
+    finally:
+        mesh = patch.data
+        bpy.data.objects.remove(patch)
+        bpy.data.meshes.remove(mesh)
+
+
+def _boundary_edges(triangles, core_triangles):
+    """The edges of the core triangles that are incident to a single triangle
+    of the patch, that is the edges lying on the surface boundary"""
+    vertex_number = np.max(triangles) + 1
+
+    def edge_keys(triangles):
+        edges = np.sort(triangles[:, [0, 1, 1, 2, 2, 0]].reshape(-1, 2), axis=1)
+        return edges[:, 0].astype(np.int64) * vertex_number + edges[:, 1]
+
+    keys, counts = np.unique(edge_keys(triangles), return_counts=True)
+    core_keys = np.unique(edge_keys(triangles[core_triangles]))
+    boundary_keys = core_keys[counts[np.searchsorted(keys, core_keys)] == 1]
+    return np.stack(
+        (boundary_keys // vertex_number, boundary_keys % vertex_number), axis=1
+    )
+
+
+def export_out_of_core(
+    UI_geometry,
+    modifier_names,
+    patch_faces,
+    triangulation_filename,
+    point_cloud_filename,
+    verbose_mode,
+):
+    """Subdivide, displace and color the mesh of a UI object patch by patch,
+    streaming each patch to the (binary PLY) triangulation and point cloud
+    files, in order to reach subdivision levels whose resulting mesh does not
+    fit in memory.
+
+    Each patch is a region of (at most patch_faces) faces of the base mesh
+    processed together with its one ring halo of faces (refer to
+    halo_faces()): only the triangles of the region itself are written. The
+    vertices of the border of a region are shared with the neighboring
+    patches: they are written once, the later patches matching them by
+    position (refer to SEAM_TOLERANCE). The result is thus a single
+    watertight surface.
+
+    The colors are sampled out of the material textures (refer to
+    sample_texture_colors.py) since a Cycles bake can not be realized per
+    patch.
+
+    Args:
+        UI_geometry (bpy.types.Object): the UI object holding the (base) mesh
+        modifier_names (list of strings): the (parametrized) modifiers to
+           apply to each patch, in that order
+        patch_faces (int): the maximal number of base faces of a patch
+        triangulation_filename (string): the target PLY triangulation file
+        point_cloud_filename (string): the target PLY point cloud file
+        verbose_mode (boolean): be verbose on CLI or not
+    Returns:
+        MeshTopology: the topological characteristics of the written surface
+    """
+    snapshot = UI_object_with_mesh_to_snapshot(UI_geometry, with_vertex_groups=True)
+    patches = face_patches(snapshot, patch_faces)
+
+    matrix = np.array(UI_geometry.matrix_world, dtype=np.float64)
+    world_positions = snapshot.positions @ matrix[:3, :3].T + matrix[:3, 3]
+    lower = world_positions.min(axis=0)
+    diagonal = np.linalg.norm(world_positions.max(axis=0) - lower)
+    # The displacements may push the seam vertices out of the base bounding box
+    seam_vertices = _SeamVertices(lower - diagonal, SEAM_TOLERANCE * diagonal)
+
+    writer = None
+    # The (global indices of the) vertices of the boundary edges, whose loops
+    # are only closed once all the patches are written
+    boundary_edges = list()
+    try:
+        for patch_index, core in enumerate(patches):
+            faces = np.union1d(core, halo_faces(snapshot, core))
+            patch_snapshot = snapshot_subset(snapshot, faces)
+            patch_snapshot.attributes[CORE_ATTRIBUTE] = (
+                "FACE",
+                "INT",
+                np.isin(faces, core).astype(np.int32),
+            )
+            mesh_arrays, core_triangles = _subdivided_patch(
+                UI_geometry, patch_snapshot, modifier_names
+            )
+            if writer is None:
+                writer = StreamedPlyWriter(
+                    triangulation_filename, point_cloud_filename, mesh_arrays
+                )
+
+            vertex_number = len(mesh_arrays.positions)
+            in_core = np.zeros(vertex_number, dtype=bool)
+            in_core[mesh_arrays.triangles[core_triangles]] = True
+            in_halo = np.zeros(vertex_number, dtype=bool)
+            in_halo[mesh_arrays.triangles[~core_triangles]] = True
+            border = in_core & in_halo
+
+            global_indices = np.full(vertex_number, -1, dtype=np.int64)
+            global_indices[border] = seam_vertices.match(mesh_arrays.positions[border])
+            new = in_core & (global_indices < 0)
+            global_indices[new] = writer.vertex_number + np.arange(
+                np.count_nonzero(new)
+            )
+            writer.add_vertices(
+                MeshArrays(
+                    mesh_arrays.positions[new],
+                    None if mesh_arrays.normals is None else mesh_arrays.normals[new],
+                    None if mesh_arrays.colors is None else mesh_arrays.colors[new],
+                    None,
+                )
+            )
+            new_border = new & border
+            seam_vertices.record(
+                mesh_arrays.positions[new_border], global_indices[new_border]
+            )
+            writer.add_triangles(
+                global_indices[mesh_arrays.triangles[core_triangles]].astype(np.int32)
+            )
+            boundary_edges.append(
+                global_indices[_boundary_edges(mesh_arrays.triangles, core_triangles)]
+            )
+            message = (
+                "Patch "
+                + str(patch_index + 1)
+                + "/"
+                + str(len(patches))
+                + ": "
+                + str(np.count_nonzero(core_triangles))
+                + " triangles, "
+                + str(np.count_nonzero(new))
+                + " new vertices"
+            )
+            logger.info(message)
+            if verbose_mode:
+                print(message)
+    finally:
+        if writer is not None:
+            writer.close()
+    if verbose_mode:
+        print("Triangulation written in ", triangulation_filename)
+        print("Point cloud written in ", point_cloud_filename)
+
+    # The written surface is a triangulation: each inner edge is shared by
+    # two triangles and each boundary edge belongs to a single one
+    boundary_edges = np.concatenate(boundary_edges)
+    boundary_edge_number = len(boundary_edges)
+    face_number = writer.face_number
+    edge_number = (3 * face_number + boundary_edge_number) // 2
+    euler_characteristic = writer.vertex_number - edge_number + face_number
+    boundaries = boundary_loop_number(boundary_edges)
+    return MeshTopology(
+        writer.vertex_number,
+        edge_number,
+        face_number,
+        euler_characteristic,
+        boundary_edge_number,
+        boundaries,
+        (2 - euler_characteristic - boundaries) // 2,
+    )
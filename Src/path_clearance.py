@@ -0,0 +1,99 @@
+import numpy as np
+from mathutils.bvhtree import BVHTree
+from path_graph import (
+    PathGraph,
+    UI_object_with_path_to_graph,
+    path_tangents,
+    resample_path_graph,
+)
+
+# Number of the rays (evenly spread in the plane orthogonal to the path) cast
+# from each sample in order to measure its free radius
+RING_RAY_NUMBER = 16
+
+
+def _orthonormal_planes(tangents):
+    # Two unit vectors spanning, for each tangent, its orthogonal plane
+    axes = np.eye(3)[np.argmin(np.abs(tangents), axis=1)]
+    first = np.cross(tangents, axes)
+    first /= np.linalg.norm(first, axis=1, keepdims=True)
+    return first, np.cross(tangents, first)
+
+
+def mesh_arrays_to_bvh_tree(mesh_arrays):
+    """A spatial index (a BVH tree) of the triangles of a geometry.
+
+    The geometry is the exported one (refer to UI_object_with_mesh_to_arrays()),
+    that is in world coordinates and without the modifiers that were not
+    applied (e.g. the Array modifiers of a single block cave).
+    """
+    return BVHTree.FromPolygons(
+        mesh_arrays.positions.tolist(),
+        mesh_arrays.triangles.tolist(),
+        all_triangles=True,
+    )
+
+
+def path_clearances(tree, positions, tangents, ring_ray_number=RING_RAY_NUMBER):
+    """Query, once and for all, the clearance of the samples of a path within
+    a surface, out of a spatial index of the surface.
+
+    Args:
+        tree (mathutils.bvhtree.BVHTree): the spatial index of the surface
+           (refer to mesh_arrays_to_bvh_tree())
+        positions (numpy array): the (sample_number, 3) samples of the path
+        tangents (numpy array): the (sample_number, 3) unit tangents of the
+           path at the samples
+        ring_ray_number (int): the number of rays measuring the free radius
+    Returns:
+        (numpy array, numpy array, numpy array): for each sample, its distance
+           to the surface, its free radius (the distance to the surface along
+           the closest of the rays cast in the plane orthogonal to the path,
+           inf when none of them hits the surface) and the unit normal of the
+           surface at its nearest point
+    """
+    sample_number = len(positions)
+    distances = np.empty(sample_number)
+    free_radii = np.full(sample_number, np.inf)
+    normals = np.zeros((sample_number, 3))
+    first, second = _orthonormal_planes(tangents)
+    angles = 2 * np.pi * np.arange(ring_ray_number) / ring_ray_number
+    for index, position in enumerate(positions.tolist()):
+        _, normal, _, distance = tree.find_nearest(position)
+        distances[index] = distance
+        normals[index] = normal
+        for direction in (
+            np.outer(np.cos(angles), first[index])
+            + np.outer(np.sin(angles), second[index])
+        ).tolist():
+            hit = tree.ray_cast(position, direction)[3]
+            if hit is not None and hit < free_radii[index]:
+                free_radii[index] = hit
+    return distances, free_radii, normals
+
+
+def UI_object_with_path_to_path_graph(UI_path, mesh_arrays, step):
+    """The path of a UI object resampled at the given step (refer to
+    resample_path_graph()) together with the clearance of its samples within
+    the given surface (refer to path_clearances()).
+
+    Args:
+        UI_path (bpy.types.Object): the UI object holding the path
+        mesh_arrays (MeshArrays): the (resulting and exported) surface
+        step (float): the resampling step
+    Returns:
+        PathGraph: the resampled path
+    """
+    positions, edges = resample_path_graph(*UI_object_with_path_to_graph(UI_path), step)
+    tangents = path_tangents(positions, edges)
+    distances, free_radii, normals = path_clearances(
+        mesh_arrays_to_bvh_tree(mesh_arrays), positions, tangents
+    )
+    return PathGraph(
+        positions.astype(np.float32),
+        edges,
+        tangents.astype(np.float32),
+        distances.astype(np.float32),
+        free_radii.astype(np.float32),
+        normals.astype(np.float32),
+    )
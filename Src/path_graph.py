@@ -0,0 +1,174 @@
+import collections
+import numpy as np
+
+# A (branched) camera path expressed as flat numpy arrays:
+#  - positions: (sample_number, 3) float32 world coordinates of the samples,
+#  - edges: (edge_number, 2) int32 sample indices,
+#  - tangents: (sample_number, 3) float32 unit (unoriented) path directions,
+#  - surface_distances: (sample_number,) float32 distances to the (nearest
+#    point of the) surface,
+#  - free_radii: (sample_number,) float32 distances to the surface in the
+#    plane orthogonal to the path (refer to path_clearance.py), inf when that
+#    plane is not closed by the surface,
+#  - surface_normals: (sample_number, 3) float32 unit normals of the surface
+#    at the nearest point.
+PathGraph = collections.namedtuple(
+    "PathGraph",
+    [
+        "positions",
+        "edges",
+        "tangents",
+        "surface_distances",
+        "free_radii",
+        "surface_normals",
+    ],
+)
+
+
+def UI_object_with_path_to_graph(UI_path):
+    """The (world coordinates) vertices and edges of a UI object describing a
+    path, that is a mesh made of edges or a curve.
+
+    Args:
+        UI_path (bpy.types.Object): the UI object holding the path
+    Returns:
+        (numpy array, numpy array): the (vertex_number, 3) positions and the
+           (edge_number, 2) edges
+    """
+    # A (temporary) mesh copy converts curves and meshes alike
+    mesh = UI_path.to_mesh()
+    try:
+        positions = np.empty(len(mesh.vertices) * 3, dtype=np.float64)
+        mesh.vertices.foreach_get("co", positions)
+        edges = np.empty(len(mesh.edges) * 2, dtype=np.int32)
+        mesh.edges.foreach_get("vertices", edges)
+    finally:
+        UI_path.to_mesh_clear()
+    matrix = np.array(UI_path.matrix_world, dtype=np.float64)
+    positions = positions.reshape(-1, 3) @ matrix[:3, :3].T + matrix[:3, 3]
+    return positions, edges.reshape(-1, 2)
+
+
+def _chains(vertex_number, edges):
+    # The maximal chains of edges whose inner vertices are of degree two, as
+    # lists of consecutive vertices (a closed chain starting and ending with
+    # the same vertex)
+    neighbours = [list() for _ in range(vertex_number)]
+    for edge_index, (first, second) in enumerate(edges):
+        neighbours[first].append((second, edge_index))
+        neighbours[second].append((first, edge_index))
+    visited = np.zeros(len(edges), dtype=bool)
+
+    def walk(start, vertex, edge_index):
+        chain = [start]
+        while True:
+            visited[edge_index] = True
+            chain.append(vertex)
+            if len(neighbours[vertex]) != 2 or vertex == start:
+                return chain
+            vertex, edge_index = next(
+                (neighbour, index)
+                for neighbour, index in neighbours[vertex]
+                if not visited[index]
+            )
+
+    chains = list()
+    # Chains joining the branching points and extremities first, the
+    # remaining edges then forming closed loops
+    starts = [vertex for vertex in range(vertex_number) if len(neighbours[vertex]) != 2]
+    starts += range(vertex_number)
+    for start in starts:
+        for vertex, edge_index in neighbours[start]:
+            if not visited[edge_index]:
+                chains.append(walk(start, vertex, edge_index))
+    return chains
+
+
+def resample_path_graph(positions, edges, step):
+    """Resample a path graph at (about) the given step: each chain of edges
+    between two branching points (or extremities) is replaced by evenly
+    spaced samples along it, the branching points and extremities being kept.
+
+    Args:
+        positions (numpy array): the (vertex_number, 3) vertex positions
+        edges (numpy array): the (edge_number, 2) edges
+        step (float): the (maximal) distance between consecutive samples
+    Returns:
+        (numpy array, numpy array): the (sample_number, 3) positions and the
+           (edge_number, 2) edges of the resampled graph
+    """
+    if step <= 0:
+        raise ValueError("The path resampling step must be strictly positive")
+    chains = _chains(len(positions), edges)
+    # The extremities of the chains are kept (and shared by the chains)
+    kept = np.unique(
+        np.array(
+            [chain[index] for chain in chains for index in (0, -1)], dtype=np.int64
+        )
+    )
+    new_indices = np.full(len(positions), -1, dtype=np.int64)
+    new_indices[kept] = np.arange(len(kept))
+    samples = [positions[kept]]
+    sample_number = len(kept)
+    new_edges = list()
+    for chain in chains:
+        points = positions[chain]
+        lengths = np.concatenate(
+            ([0.0], np.cumsum(np.linalg.norm(np.diff(points, axis=0), axis=1)))
+        )
+        closed = chain[0] == chain[-1]
+        segment_number = max(3 if closed else 1, int(np.ceil(lengths[-1] / step)))
+        abscissas = np.linspace(0.0, lengths[-1], segment_number + 1)[1:-1]
+        inner = np.stack(
+            [np.interp(abscissas, lengths, points[:, axis]) for axis in range(3)],
+            axis=1,
+        )
+        indices = np.concatenate(
+            (
+                [new_indices[chain[0]]],
+                sample_number + np.arange(len(inner)),
+                [new_indices[chain[-1]]],
+            )
+        )
+        samples.append(inner)
+        sample_number += len(inner)
+        new_edges.append(np.stack((indices[:-1], indices[1:]), axis=1))
+    if not new_edges:
+        new_edges.append(np.empty((0, 2), dtype=np.int64))
+    return np.concatenate(samples), np.concatenate(new_edges).astype(np.int32)
+
+
+def path_tangents(positions, edges):
+    """The (unoriented) unit tangents of a path graph at its vertices, that is
+    the principal direction of the edges incident to each vertex (the
+    direction of the path through a chain, the dominant branch at a branching
+    point)."""
+    directions = positions[edges[:, 1]] - positions[edges[:, 0]]
+    lengths = np.linalg.norm(directions, axis=1, keepdims=True)
+    directions = directions / np.where(lengths > 0, lengths, 1.0)
+    outer_products = directions[:, :, None] * directions[:, None, :]
+    tensors = np.zeros((len(positions), 3, 3))
+    np.add.at(tensors, edges[:, 0], outer_products)
+    np.add.at(tensors, edges[:, 1], outer_products)
+    # The eigenvalues are in ascending order
+    return np.linalg.eigh(tensors)[1][:, :, -1]
+
+
+def write_path_graph(filename, path_graph, step):
+    """Write (as compressed numpy binary arrays) a PathGraph resampled at the
+    given step"""
+    with open(filename, "wb") as graph_file:
+        np.savez_compressed(graph_file, step=np.float32(step), **path_graph._asdict())
+
+
+def read_path_graph(filename):
+    """Read a PathGraph written by write_path_graph()
+
+    Returns:
+        (PathGraph, float): the graph and its resampling step
+    """
+    with np.load(filename) as arrays:
+        return (
+            PathGraph(*(arrays[field] for field in PathGraph._fields)),
+            float(arrays["step"]),
+        )
@@ -0,0 +1,292 @@
+import itertools
+import numpy as np
+from mesh_to_arrays import MeshArrays
+from write_ply import CHUNK_SIZE
+
+SAMPLINGS = ["vertices", "uniform", "poisson_disk", "voxel"]
+
+# The (approximate) number of points of a maximal Poisson-disk sampling of
+# radius r over a surface of area A is POISSON_DISK_DENSITY * A / r^2 (the 2D
+# random sequential adsorption jamming limit applied to disks of radius r/2)
+POISSON_DISK_DENSITY = 0.7
+
+# Number of uniform candidates drawn per expected Poisson-disk sample
+POISSON_DISK_CANDIDATES = 8
+
+
+def triangle_areas(mesh_arrays):
+    """The (float64) areas of the triangles of a geometry"""
+    positions = mesh_arrays.positions.astype(np.float64)
+    corners = [positions[mesh_arrays.triangles[:, corner]] for corner in range(3)]
+    normals = np.cross(corners[1] - corners[0], corners[2] - corners[0])
+    return 0.5 * np.linalg.norm(normals, axis=1)
+
+
+def _points(mesh_arrays, positions, normals, colors):
+    # The sampled points carry the optional fields of the sampled geometry
+    return MeshArrays(
+        positions.astype(np.float32),
+        None if mesh_arrays.normals is None else normals,
+        None if mesh_arrays.colors is None else colors,
+        np.empty((0, 3), dtype=np.int32),
+    )
+
+
+def _normalized(vectors):
+    lengths = np.linalg.norm(vectors, axis=1, keepdims=True)
+    lengths[lengths == 0] = 1.0
+    return (vectors / lengths).astype(np.float32)
+
+
+def _surface_samples(mesh_arrays, cumulated_areas, sample_number, rng):
+    """Area weighted uniform samples of the surface, with their normals and
+    colors interpolated (barycentrically) out of the vertex ones"""
+    triangles = mesh_arrays.triangles[
+        np.searchsorted(
+            cumulated_areas,
+            rng.random(sample_number) * cumulated_areas[-1],
+            side="right",
+        ).clip(max=len(mesh_arrays.triangles) - 1)
+    ]
+    u = rng.random(sample_number)
+    v = rng.random(sample_number)
+    # Folding the unit square on the triangle keeps the samples uniform
+    folded = u + v > 1.0
+    u[folded] = 1.0 - u[folded]
+    v[folded] = 1.0 - v[folded]
+    weights = np.stack((1.0 - u - v, u, v), axis=1)
+
+    def interpolate(values):
+        interpolated = weights[:, 0, None] * values[triangles[:, 0]]
+        for corner in (1, 2):
+            interpolated += weights[:, corner, None] * values[triangles[:, corner]]
+        return interpolated
+
+    normals = None
+    if mesh_arrays.normals is not None:
+        normals = _normalized(interpolate(mesh_arrays.normals))
+    colors = None
+    if mesh_arrays.colors is not None:
+        colors = np.rint(interpolate(mesh_arrays.colors)).astype(np.uint8)
+    return _points(mesh_arrays, interpolate(mesh_arrays.positions), normals, colors)
+
+
+def _cell_coordinates(positions, lower, cell_size, counts):
+    coordinates = np.floor((positions - lower) / cell_size).astype(np.int64)
+    np.clip(coordinates, 0, counts - 1, out=coordinates)
+    return coordinates
+
+
+def _poisson_disk_points(mesh_arrays, cumulated_areas, radius, rng):
+    """Poisson-disk sampling (no two points closer than radius) of the
+    surface by (parallel) dart throwing among uniform candidates.
+
+    The space is divided in cells of diagonal radius, so that a cell holds at
+    most one accepted point. The candidates are drawn by batches (of
+    CHUNK_SIZE candidates), each batch being processed by rounds, each round
+    drawing one candidate per free cell. Within a round, the cells are
+    processed by 27 phases (their coordinates modulo 3): the candidates of a
+    phase are more than radius apart and can thus be accepted independently,
+    each against the accepted points of the 5x5x5 neighboring cells only."""
+    expected = POISSON_DISK_DENSITY * cumulated_areas[-1] / radius**2
+    candidate_number = int(POISSON_DISK_CANDIDATES * expected) + 1
+    cell_size = radius / np.sqrt(3.0)
+    lower = mesh_arrays.positions.min(axis=0).astype(np.float64)
+    extent = mesh_arrays.positions.max(axis=0) - lower
+    counts = np.floor(extent / cell_size).astype(np.int64) + 1
+    offsets = np.array(list(itertools.product(range(-2, 3), repeat=3)))
+
+    # The accepted points (of all the batches) sorted by cell key
+    accepted_keys = np.empty(0, dtype=np.int64)
+    accepted_positions = np.empty((0, 3), dtype=np.float32)
+    batches = list()
+    for start in range(0, candidate_number, CHUNK_SIZE):
+        candidates = _surface_samples(
+            mesh_arrays,
+            cumulated_areas,
+            min(CHUNK_SIZE, candidate_number - start),
+            rng,
+        )
+        coordinates = _cell_coordinates(candidates.positions, lower, cell_size, counts)
+        keys = np.ravel_multi_index(coordinates.T, counts)
+        phases = np.ravel_multi_index((coordinates % 3).T, (3, 3, 3))
+        # Candidates sitting in a cell holding an accepted point are useless
+        remaining = np.flatnonzero(~np.isin(keys, accepted_keys))
+        accepted_indexes = [np.empty(0, dtype=np.int64)]
+        while len(remaining):
+            # One (random, the candidates being random) candidate per free cell
+            _, first = np.unique(keys[remaining], return_index=True)
+            drawn = remaining[first]
+            for phase in range(27):
+                phase_candidates = drawn[phases[drawn] == phase]
+                if len(phase_candidates) == 0:
+                    continue
+                valid = np.ones(len(phase_candidates), dtype=bool)
+                positions = candidates.positions[phase_candidates]
+                for offset in offsets if len(accepted_keys) else []:
+                    neighbors = coordinates[phase_candidates] + offset
+                    inside = np.all((neighbors >= 0) & (neighbors < counts), axis=1)
+                    neighbor_keys = np.ravel_multi_index(
+                        np.clip(neighbors, 0, counts - 1).T, counts
+                    )
+                    found = np.searchsorted(accepted_keys, neighbor_keys)
+                    found = found.clip(max=len(accepted_keys) - 1)
+                    occupied = inside & (accepted_keys[found] == neighbor_keys)
+                    if not np.any(occupied):
+                        continue
+                    differences = (
+                        positions[occupied] - accepted_positions[found[occupied]]
+                    )
+                    too_close = np.sum(differences**2, axis=1) < radius**2
+                    valid[np.flatnonzero(occupied)[too_close]] = False
+                accepted = phase_candidates[valid]
+                accepted_indexes.append(accepted)
+                accepted_keys = np.concatenate((accepted_keys, keys[accepted]))
+                accepted_positions = np.concatenate(
+                    (accepted_positions, candidates.positions[accepted])
+                )
+                order = np.argsort(accepted_keys, kind="stable")
+                accepted_keys = accepted_keys[order]
+                accepted_positions = accepted_positions[order]
+            # Drawn candidates are either accepted or definitively rejected
+            remaining = np.setdiff1d(remaining, drawn, assume_unique=True)
+            remaining = remaining[~np.isin(keys[remaining], accepted_keys)]
+        accepted = np.sort(np.concatenate(accepted_indexes))
+        batches.append(
+            [None if values is None else values[accepted] for values in candidates[:3]]
+        )
+
+    def concatenated(field):
+        if batches[0][field] is None:
+            return None
+        return np.concatenate([batch[field] for batch in batches])
+
+    return _points(mesh_arrays, concatenated(0), concatenated(1), concatenated(2))
+
+
+def _voxel_points(mesh_arrays, voxel_size):
+    """Voxel grid downsampling of the vertices: each (non empty) voxel is
+    represented by the average of its vertices (positions, normals and
+    colors)"""
+    positions = mesh_arrays.positions
+    lower = positions.min(axis=0).astype(np.float64)
+    coordinates = np.floor((positions - lower) / voxel_size).astype(np.int64)
+    _, voxels = np.unique(coordinates, axis=0, return_inverse=True)
+    voxels = voxels.ravel()
+    voxel_number = voxels.max() + 1
+    vertex_numbers = np.bincount(voxels, minlength=voxel_number)[:, None]
+
+    def average(values):
+        return (
+            np.stack(
+                [
+                    np.bincount(voxels, weights=values[:, i], minlength=voxel_number)
+                    for i in range(values.shape[1])
+                ],
+                axis=1,
+            )
+            / vertex_numbers
+        )
+
+    normals = None
+    if mesh_arrays.normals is not None:
+        normals = _normalized(average(mesh_arrays.normals))
+    colors = None
+    if mesh_arrays.colors is not None:
+        colors = np.rint(average(mesh_arrays.colors)).astype(np.uint8)
+    return _points(mesh_arrays, average(positions), normals, colors)
+
+
+class SampledPointCloud:
+    """A point cloud sampled out of (the surface or the vertices of) a
+    geometry, provided by chunks of MeshArrays (without triangles).
+
+    The uniform samples are drawn lazily, chunk by chunk, and out of a seeded
+    generator: the point cloud can thus be of any size and iterated several
+    times (e.g. once per export format) yielding the same points. The
+    Poisson-disk and voxel samplings are computed at construction.
+    """
+
+    def __init__(self, mesh_arrays, sampling, point_count, point_spacing, seed):
+        """
+        Args:
+            mesh_arrays (MeshArrays): the sampled geometry
+            sampling (string): "uniform", "poisson_disk" or "voxel"
+            point_count (int): the target number of points (used when
+               point_spacing is not strictly positive)
+            point_spacing (float): the target spacing between points
+            seed (int): the seed of the random generator
+        """
+        if point_count <= 0 and point_spacing <= 0:
+            raise ValueError(
+                "The " + sampling + " sampling requires a point count or spacing"
+            )
+        # The sampled points carry the same optional fields (normals,
+        # colors) as the vertices of this geometry
+        self.layout = mesh_arrays
+        self.seed = seed
+        self.__mesh_arrays = mesh_arrays
+        self.__cumulated_areas = np.cumsum(triangle_areas(mesh_arrays))
+        area = self.__cumulated_areas[-1]
+        self.__points = None
+        if sampling == "uniform":
+            if point_spacing > 0:
+                point_count = int(area / point_spacing**2)
+            self.point_number = point_count
+        elif sampling == "poisson_disk":
+            if point_spacing <= 0:
+                point_spacing = np.sqrt(POISSON_DISK_DENSITY * area / point_count)
+            self.__points = _poisson_disk_points(
+                mesh_arrays,
+                self.__cumulated_areas,
+                point_spacing,
+                np.random.default_rng(seed),
+            )
+            self.point_number = len(self.__points.positions)
+        elif sampling == "voxel":
+            if point_spacing <= 0:
+                # A voxel crossed by the surface holds about voxel_size^2 of it
+                point_spacing = np.sqrt(area / point_count)
+            self.__points = _voxel_points(mesh_arrays, point_spacing)
+            self.point_number = len(self.__points.positions)
+        else:
+            raise ValueError("Unknown point cloud sampling: " + sampling)
+
+    def chunks(self):
+        """Generate the points by chunks (of MeshArrays without triangles)"""
+        if self.__points is not None:
+            yield self.__points
+            return
+        rng = np.random.default_rng(self.seed)
+        for start in range(0, self.point_number, CHUNK_SIZE):
+            yield _surface_samples(
+                self.__mesh_arrays,
+                self.__cumulated_areas,
+                min(CHUNK_SIZE, self.point_number - start),
+                rng,
+            )
+
+    def points(self):
+        """All the points at once (as MeshArrays without triangles)"""
+        chunks = list(self.chunks())
+        if not chunks:
+            return _points(
+                self.layout,
+                np.empty((0, 3), dtype=np.float32),
+                np.empty((0, 3), dtype=np.float32),
+                np.empty((0, 4), dtype=np.uint8),
+            )
+        return MeshArrays(
+            *(
+                None if arrays[0] is None else np.concatenate(arrays)
+                for arrays in zip(*chunks)
+            )
+        )
+
+
+def sample_point_cloud(mesh_arrays, sampling, point_count, point_spacing, seed):
+    """The point cloud of given sampling, or None for the "vertices" sampling
+    (the point cloud being then the vertex set of the triangulation)"""
+    if sampling == "vertices":
+        return None
+    return SampledPointCloud(mesh_arrays, sampling, point_count, point_spacing, seed)
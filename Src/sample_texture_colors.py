@@ -0,0 +1,132 @@
+import numpy as np
+from mesh_to_arrays import corner_to_vertex_average
+
+
+def _srgb_to_linear(values):
+    return np.where(
+        values <= 0.04045, values / 12.92, ((values + 0.055) / 1.055) ** 2.4
+    )
+
+
+def _material_image(material):
+    """The image texture providing the base color of a material (or None)"""
+    if material is None or not material.use_nodes:
+        return None
+    nodes = material.node_tree.nodes
+    for node in nodes:
+        if node.type != "BSDF_PRINCIPLED":
+            continue
+        base_color = node.inputs["Base Color"]
+        if base_color.is_linked:
+            source = base_color.links[0].from_node
+            if source.type == "TEX_IMAGE" and source.image is not None:
+                return source.image
+    for node in nodes:
+        if node.type == "TEX_IMAGE" and node.image is not None:
+            return node.image
+    return None
+
+
+def _material_base_color(material):
+    """The (constant) linear base color of a material without image"""
+    if material is not None and material.use_nodes:
+        for node in material.node_tree.nodes:
+            if node.type == "BSDF_PRINCIPLED":
+                return np.array(node.inputs["Base Color"].default_value)
+    if material is not None:
+        return np.array(material.diffuse_color)
+    return np.ones(4)
+
+
+def _image_pixels(image):
+    """The (linear) RGBA pixels of an image as a (height, width, 4) array"""
+    width, height = image.size
+    pixels = np.empty(width * height * 4, dtype=np.float32)
+    image.pixels.foreach_get(pixels)
+    pixels = pixels.reshape(height, width, 4)
+    if image.colorspace_settings.name == "sRGB":
+        pixels[..., :3] = _srgb_to_linear(pixels[..., :3])
+    return pixels
+
+
+def bilinear_sample(pixels, uvs):
+    """Sample (with bilinear interpolation and repeat wrapping) an image at
+    the given UV coordinates.
+
+    Args:
+        pixels (numpy array): (height, width, channels) image
+        uvs (numpy array): (sample_number, 2) texture coordinates
+    Returns:
+        numpy array: (sample_number, channels) sampled values
+    """
+    height, width = pixels.shape[:2]
+    x = uvs[:, 0] * width - 0.5
+    y = uvs[:, 1] * height - 0.5
+    x0 = np.floor(x)
+    y0 = np.floor(y)
+    fx = (x - x0)[:, None]
+    fy = (y - y0)[:, None]
+    x0 = x0.astype(np.int64) % width
+    y0 = y0.astype(np.int64) % height
+    x1 = (x0 + 1) % width
+    y1 = (y0 + 1) % height
+    bottom = pixels[y0, x0] * (1.0 - fx) + pixels[y0, x1] * fx
+    top = pixels[y1, x0] * (1.0 - fx) + pixels[y1, x1] * fx
+    return bottom * (1.0 - fy) + top * fy
+
+
+def sample_texture_colors(UI_geometry):
+    """Set the (active) color attribute of the mesh of a UI object by sampling
+    the base color images of its materials at the UV coordinates.
+
+    This is a fast alternative to a Cycles "COMBINED" bake: it only yields
+    the (albedo) texture colors, that is without any lighting contribution.
+    Materials without image contribute their constant base color.
+
+    Args:
+        UI_geometry (bpy.types.Object): the UI object holding the mesh
+    Raises:
+        ValueError: when the mesh has no UV map
+    """
+    mesh = UI_geometry.data
+    uv_layer = mesh.uv_layers.active
+    if uv_layer is None:
+        raise ValueError(
+            "The mesh of "
+            + UI_geometry.name
+            + " has no (active) UV map to sample the textures at"
+        )
+    corner_number = len(mesh.loops)
+    uvs = np.empty(corner_number * 2, dtype=np.float32)
+    uv_layer.data.foreach_get("uv", uvs)
+    uvs = uvs.reshape(-1, 2)
+
+    polygon_sizes = np.empty(len(mesh.polygons), dtype=np.int32)
+    mesh.polygons.foreach_get("loop_total", polygon_sizes)
+    material_indices = np.empty(len(mesh.polygons), dtype=np.int32)
+    mesh.polygons.foreach_get("material_index", material_indices)
+    corner_materials = np.repeat(material_indices, polygon_sizes)
+
+    colors = np.ones((corner_number, 4), dtype=np.float32)
+    materials = list(mesh.materials) or [None]
+    for material_index, material in enumerate(materials):
+        corners = np.flatnonzero(corner_materials == material_index)
+        if len(corners) == 0:
+            continue
+        image = _material_image(material)
+        if image is None:
+            colors[corners] = _material_base_color(material)
+        else:
+            colors[corners] = bilinear_sample(_image_pixels(image), uvs[corners])
+
+    color_attribute = mesh.color_attributes.active_color
+    if color_attribute is None:
+        color_attribute = mesh.color_attributes.new("Color", "FLOAT_COLOR", "CORNER")
+        mesh.color_attributes.active_color = color_attribute
+    if color_attribute.domain == "POINT":
+        # The color of a vertex is the average of the colors of its corners
+        vertex_number = len(mesh.vertices)
+        corner_vertices = np.empty(corner_number, dtype=np.int32)
+        mesh.loops.foreach_get("vertex_index", corner_vertices)
+        colors = corner_to_vertex_average(corner_vertices, colors, vertex_number)
+    color_attribute.data.foreach_set("color", colors.astype(np.float32).ravel())
@@ -0,0 +1,146 @@
+import collections
+import contextlib
+import hashlib
+import json
+import logging
+import os
+from mesh_snapshot import (
+    UI_object_with_mesh_to_snapshot,
+    read_snapshot,
+    snapshot_to_UI_object_mesh,
+    write_snapshot,
+)
+
+logger = logging.getLogger(__name__)
+
+# A stage of a (modifier) pipeline: its name, the parameters it consumes, the
+# name of the modifier that it applies (or None) and the callable realizing it
+Stage = collections.namedtuple(
+    "Stage", ["name", "parameters", "modifier_name", "function"]
+)
+
+
+def _file_hash(filename):
+    digest = hashlib.sha256()
+    with open(filename, "rb") as hashed_file:
+        for block in iter(lambda: hashed_file.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class StageCache:
+    """A content addressed on disk cache of the intermediate meshes of a
+    (modifier) pipeline.
+
+    The key of the mesh resulting from a stage is the hash of the Blender
+    file together with the names and parameters of all the stages realized
+    so far. The cache size is bounded: the least recently used entries are
+    evicted once the size limit is exceeded.
+    """
+
+    def __init__(self, directory, max_size_megabytes, blender_pathfile):
+        self.directory = directory
+        self.max_size = max_size_megabytes * 1024 * 1024
+        self.blender_file_hash = _file_hash(blender_pathfile)
+        os.makedirs(self.directory, exist_ok=True)
+
+    def key(self, realized_stages):
+        """Key of the mesh resulting from the given list of (stage name,
+        stage parameters) pairs."""
+        digest = hashlib.sha256(self.blender_file_hash.encode("ascii"))
+        digest.update(json.dumps(realized_stages, sort_keys=True).encode("utf-8"))
+        return digest.hexdigest()
+
+    def __filename(self, key):
+        return os.path.join(self.directory, key + ".npz")
+
+    def load(self, key):
+        """Return the cached MeshSnapshot of given key (or None)"""
+        filename = self.__filename(key)
+        if not os.path.exists(filename):
+            logger.info("Stage cache miss: " + key)
+            return None
+        logger.info("Stage cache hit: " + key)
+        # Refreshing the modification time is what the LRU eviction relies on
+        os.utime(filename)
+        return read_snapshot(filename)
+
+    def store(self, key, snapshot):
+        filename = self.__filename(key)
+        temporary_filename = filename + ".tmp"
+        write_snapshot(temporary_filename, snapshot)
+        # The renaming is atomic and thus safe with concurrent runs
+        os.replace(temporary_filename, filename)
+        logger.info("Stage cache store: " + key)
+        self.evict()
+
+    def evict(self):
+        """Remove the least recently used entries until the size of the
+        cache is below its limit."""
+        entries = list()
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(".npz"):
+                status = entry.stat()
+                entries.append((status.st_mtime, status.st_size, entry.path))
+        total_size = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total_size <= self.max_size:
+                break
+            os.remove(path)
+            total_size -= size
+            logger.info("Stage cache eviction: " + os.path.basename(path))
+
+
+def run_stages(UI_geometry, stages, cache=None, profiler=None):
+    """Run the stages of a (modifier) pipeline on a UI object, resuming from
+    the deepest cached stage when a cache is provided.
+
+    Args:
+        UI_geometry (bpy.types.Object): the UI object holding the mesh
+        stages (list of Stage): the stages in order
+        cache (StageCache): the cache (None disables caching)
+        profiler (StageProfiler): the profiler recording each stage (or None)
+    """
+
+    def profiled(name):
+        if profiler is None:
+            return contextlib.nullcontext()
+        return profiler.stage(name, UI_geometry)
+
+    if cache is None:
+        for stage in stages:
+            with profiled(stage.name):
+                stage.function()
+        return
+
+    keys = list()
+    realized_stages = list()
+    for stage in stages:
+        realized_stages.append([stage.name, stage.parameters])
+        keys.append(cache.key(realized_stages))
+
+    resumed = -1
+    for index in reversed(range(len(stages))):
+        with profiled("cache_load"):
+            snapshot = cache.load(keys[index])
+        if snapshot is not None:
+            with profiled("cache_restore"):
+                snapshot_to_UI_object_mesh(snapshot, UI_geometry)
+            resumed = index
+            break
+    # The modifiers of the stages realized by the cached mesh must not be
+    # applied a second time
+    for stage in stages[: resumed + 1]:
+        if stage.modifier_name is not None:
+            UI_geometry.modifiers.remove(UI_geometry.modifiers[stage.modifier_name])
+    if resumed >= 0:
+        logger.info("Resuming from cached stage " + stages[resumed].name)
+
+    for index in range(resumed + 1, len(stages)):
+        with profiled(stages[index].name):
+            stages[index].function()
+        with profiled("cache_store"):
+            cache.store(
+                keys[index],
+                UI_object_with_mesh_to_snapshot(UI_geometry, with_vertex_groups=True),
+            )
@@ -0,0 +1,88 @@
+import contextlib
+import json
+import sys
+import time
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+
+def _peak_rss_megabytes(who):
+    if resource is None:
+        return None
+    peak = resource.getrusage(who).ru_maxrss
+    # ru_maxrss is expressed in kilobytes on Linux but in bytes on macOS
+    if sys.platform == "darwin":
+        return peak / (1024 * 1024)
+    return peak / 1024
+
+
+def mesh_counts(UI_geometry):
+    """The (cheap to obtain) vertex, edge and face numbers of a UI object"""
+    mesh = UI_geometry.data
+    return {
+        "vertices": len(mesh.vertices),
+        "edges": len(mesh.edges),
+        "faces": len(mesh.polygons),
+    }
+
+
+class StageProfiler:
+    """Record, for each stage of a run, its wall clock time, CPU time, the
+    peak resident set size of the process (so far) and the size of the mesh
+    resulting from the stage."""
+
+    def __init__(self):
+        self.stages = list()
+        self.start = time.perf_counter()
+
+    @contextlib.contextmanager
+    def stage(self, name, UI_geometry=None):
+        """Context manager profiling the enclosed stage.
+
+        Args:
+            name (string): the name of the stage
+            UI_geometry (bpy.types.Object): the UI object (when provided) whose
+               mesh size is recorded at the end of the stage
+        """
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        try:
+            yield
+        finally:
+            record = {
+                "stage": name,
+                "wall_seconds": time.perf_counter() - wall_start,
+                "cpu_seconds": time.process_time() - cpu_start,
+            }
+            if resource is not None:
+                record["peak_rss_megabytes"] = _peak_rss_megabytes(resource.RUSAGE_SELF)
+                record["children_peak_rss_megabytes"] = _peak_rss_megabytes(
+                    resource.RUSAGE_CHILDREN
+                )
+            if UI_geometry is not None:
+                record.update(mesh_counts(UI_geometry))
+            self.stages.append(record)
+
+    def record(self, name, wall_seconds):
+        """Record a stage timed by the caller (e.g. in a worker thread)"""
+        self.stages.append({"stage": name, "wall_seconds": wall_seconds})
+
+    def write_report(self, filename, parameters, outputs):
+        """Write the (JSON) run report.
+
+        Args:
+            filename (string): the name of the target JSON file
+            parameters (dict): the parameters of the run
+            outputs (list of strings): the names of the files written by the run
+        """
+        report = {
+            "parameters": parameters,
+            "total_wall_seconds": time.perf_counter() - self.start,
+            "stages": self.stages,
+            "outputs": outputs,
+        }
+        with open(filename, "w") as report_file:
+            json.dump(report, report_file, indent=2)
@@ -0,0 +1,144 @@
+import bpy
+import numpy as np
+import pytest
+from analytic_grid import boundary_loops, grid_snapshot, seam_vertex_pairs
+from mesh_snapshot import MeshSnapshot, snapshot_to_UI_object_mesh
+from mesh_topology import UI_object_with_mesh_to_topology
+
+
+def tube_snapshot(ring_size):
+    """An open tube of unit length along the x axis made of two rings of
+    ring_size vertices (the vertex k of ring r being indexed r * ring_size + k)
+    and of ring_size quads"""
+    angles = 2 * np.pi * np.arange(ring_size) / ring_size
+    ring = np.stack((np.zeros(ring_size), np.cos(angles), np.sin(angles)), axis=1)
+    positions = np.concatenate((ring, ring + [1, 0, 0])).astype(np.float32)
+    k = np.arange(ring_size)
+    following = (k + 1) % ring_size
+    edges = np.concatenate(
+        (
+            np.stack((k, following), axis=1),
+            np.stack((k, k + ring_size), axis=1),
+            np.stack((k + ring_size, following + ring_size), axis=1),
+        )
+    )
+    corner_vertices = np.stack(
+        (k, following, following + ring_size, k + ring_size), axis=1
+    ).ravel()
+    return MeshSnapshot(
+        positions,
+        edges.astype(np.int32),
+        np.full(ring_size, 4, dtype=np.int32),
+        corner_vertices.astype(np.int32),
+        {
+            "vertex_index": ("POINT", "INT", np.arange(2 * ring_size)),
+            "edge_index": ("EDGE", "INT", np.arange(len(edges))),
+            "corner_index": ("CORNER", "INT", np.arange(4 * ring_size)),
+        },
+        None,
+        None,
+        {"group": np.linspace(0.0, 1.0, 2 * ring_size, dtype=np.float32)},
+    )
+
+
+def boundary_number_of(snapshot):
+    return len(boundary_loops(snapshot))
+
+
+def test_boundary_loops_of_a_tube():
+    snapshot = tube_snapshot(8)
+    loops = boundary_loops(snapshot)
+    assert len(loops) == 2
+    for loop, loop_edges in loops:
+        assert len(loop) == 8
+        # Both rings are at a constant abscissa
+        assert len(np.unique(snapshot.positions[loop, 0])) == 1
+        # The edge k joins the vertices k and k + 1 of the loop
+        assert np.array_equal(
+            np.sort(snapshot.edges[loop_edges], axis=1),
+            np.sort(np.stack((loop, np.roll(loop, -1)), axis=1), axis=1),
+        )
+
+
+def test_seam_vertex_pairs_of_a_tube():
+    snapshot = tube_snapshot(8)
+    offset = np.array([1.0, 0.0, 0.0])
+    kept, merged, dropped_edges = seam_vertex_pairs(
+        snapshot, boundary_loops(snapshot), offset, 0.1
+    )
+    # The end ring of a copy is merged with the start ring of the next one
+    assert np.all(kept >= 8)
+    assert np.all(merged < 8)
+    assert np.allclose(snapshot.positions[kept], snapshot.positions[merged] + offset)
+    assert len(dropped_edges) == 8
+    # Unmatched boundaries are not merged
+    kept, merged, dropped_edges = seam_vertex_pairs(
+        snapshot, boundary_loops(snapshot), np.array([0.0, 5.0, 0.0]), 0.1
+    )
+    assert len(kept) == len(merged) == len(dropped_edges) == 0
+
+
+def test_seam_of_distinct_vertex_numbers():
+    # A triangle centered at the origin and a square centered at (1, 0, 0)
+    positions = np.float32(
+        [[0, 0, 2], [0, -1, -1], [0, 1, -1]]
+        + [[1, 1, 1], [1, -1, 1], [1, -1, -1], [1, 1, -1]]
+    )
+    snapshot = tube_snapshot(3)._replace(positions=positions)
+    loops = [(np.arange(3), np.arange(3)), (np.arange(3, 7), np.arange(3, 7))]
+    with pytest.raises(ValueError):
+        seam_vertex_pairs(snapshot, loops, np.float32([1, 0, 0]), 0.1)
+
+
+def test_row_of_tubes_is_a_single_tube():
+    ring_size = 8
+    snapshot = tube_snapshot(ring_size)
+    grid = grid_snapshot(snapshot, [1, 0, 0], [0, 5, 0], 3, 1, 0.1)
+    assert len(grid.positions) == 4 * ring_size
+    assert len(grid.edges) == 7 * ring_size
+    assert len(grid.polygon_sizes) == 3 * ring_size
+    assert len(grid.corner_vertices) == 12 * ring_size
+    assert boundary_number_of(grid) == 2
+    assert np.allclose(np.unique(grid.positions[:, 0]), [0, 1, 2, 3])
+    # No two edges join the same vertices
+    assert len(np.unique(np.sort(grid.edges, axis=1), axis=0)) == len(grid.edges)
+
+
+def test_grid_replicates_the_attributes_and_vertex_groups():
+    ring_size = 6
+    snapshot = tube_snapshot(ring_size)
+    grid = grid_snapshot(snapshot, [1, 0, 0], [0, 5, 0], 2, 2, 0.1)
+    # Two rows of two merged copies
+    vertex_number = 2 * 3 * ring_size
+    assert len(grid.positions) == vertex_number
+    assert boundary_number_of(grid) == 4
+    domain, data_type, values = grid.attributes["vertex_index"]
+    assert (domain, data_type) == ("POINT", "INT")
+    assert len(values) == vertex_number
+    # The merged vertices keep the values of the vertices of the first copy
+    assert np.array_equal(
+        values[: 3 * ring_size],
+        np.concatenate((np.arange(2 * ring_size), np.arange(ring_size, 2 * ring_size))),
+    )
+    assert len(grid.attributes["edge_index"][2]) == len(grid.edges)
+    assert len(grid.attributes["corner_index"][2]) == len(grid.corner_vertices)
+    assert len(grid.vertex_groups["group"]) == vertex_number
+    assert grid.positions.dtype == np.float32
+    assert grid.edges.dtype == grid.corner_vertices.dtype == np.int32
+
+
+def test_grid_is_a_valid_blender_mesh():
+    grid = grid_snapshot(tube_snapshot(8), [1, 0, 0], [0, 5, 0], 3, 2, 0.1)
+    UI_geometry = bpy.data.objects.new(
+        "analytic_grid_test", bpy.data.meshes.new("analytic_grid_test")
+    )
+    snapshot_to_UI_object_mesh(grid, UI_geometry)
+    mesh = UI_geometry.data
+    assert not mesh.validate()
+    assert len(mesh.vertices) == len(grid.positions)
+    assert len(mesh.edges) == len(grid.edges)
+    topology = UI_object_with_mesh_to_topology(UI_geometry)
+    # Two (disjoint) rows, each of them an open tube
+    assert topology.boundary_number == 4
+    assert topology.euler_characteristic == 0
+    assert UI_geometry.vertex_groups.keys() == ["group"]
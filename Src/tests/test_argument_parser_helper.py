@@ -0,0 +1,68 @@
+import pytest
+from argument_parser_helper import (
+    check_common_arguments,
+    check_sweep_arguments,
+    common_parser,
+    parse_arguments,
+)
+
+
+def checked_arguments(argv):
+    parser = common_parser()
+    args = parse_arguments(parser, argv)
+    check_common_arguments(parser, args)
+    return args
+
+
+def test_defaults():
+    args = checked_arguments([])
+    assert args.headless
+    assert args.decimate_ratio is None
+    assert not args.no_run_report
+
+
+@pytest.mark.parametrize("option", ["--no-run_report", "--no-run-report"])
+def test_run_report_opt_out(option):
+    assert checked_arguments([option]).no_run_report
+
+
+@pytest.mark.parametrize(
+    "argv",
+    [
+        ["--decimate_ratio", "0"],
+        ["--decimate_ratio", "1.5"],
+        ["--point_cloud_sampling", "uniform"],
+        ["--out_of_core_patches", "8", "--fill_holes"],
+        ["--quantization_bits", "0"],
+    ],
+)
+def test_rejected_arguments(argv, capsys):
+    with pytest.raises(SystemExit):
+        checked_arguments(argv)
+    assert "error: " in capsys.readouterr().err
+
+
+def test_accepted_decimation_ratio():
+    args = checked_arguments(["--decimate_ratio", "1"])
+    assert args.decimate_ratio == 1.0
+
+
+@pytest.mark.parametrize(
+    "argv, supported",
+    [
+        (["--decimate_ratio", "0.5"], True),
+        (["--target_faces", "1000", "--target_file_size", "2"], True),
+        (["--fill_holes"], False),
+        (["--lod_levels", "2"], False),
+        (["--path_step", "0.5"], False),
+    ],
+)
+def test_sweep_arguments(argv, supported, capsys):
+    parser = common_parser()
+    args = parse_arguments(parser, argv)
+    if supported:
+        check_sweep_arguments(parser, args, "--relief_sweep")
+        return
+    with pytest.raises(SystemExit):
+        check_sweep_arguments(parser, args, "--relief_sweep")
+    assert "--relief_sweep does not support" in capsys.readouterr().err
@@ -0,0 +1,34 @@
+from batch import configuration_to_argv, sweep_configurations
+
+
+def test_sweep_configurations():
+    sweep = {
+        "generator": "Cave",
+        "fixed": {"outputdir": "data", "no-obj-export": True},
+        "product": {"subdivision": [1, 2], "relief": [0.1, 0.7]},
+        "configs": [{"subdivision": 4, "outputdir": "large"}],
+    }
+    configurations = sweep_configurations(sweep)
+    assert len(configurations) == 5
+    assert configurations[1] == {
+        "outputdir": "data",
+        "no-obj-export": True,
+        "subdivision": 1,
+        "relief": 0.7,
+    }
+    # The explicit configurations override the fixed options
+    assert configurations[-1]["outputdir"] == "large"
+    assert sweep_configurations({"fixed": {"subdivision": 3}}) == [{"subdivision": 3}]
+
+
+def test_configuration_to_argv():
+    argv = configuration_to_argv(
+        {
+            "v": True,
+            "fill_holes": False,
+            "cache_dir": None,
+            "relief_sweep": [0.1, 0.2],
+            "subdivision": 2,
+        }
+    )
+    assert argv == ["-v", "--relief_sweep", "0.1", "0.2", "--subdivision", "2"]
@@ -0,0 +1,57 @@
+from benchmark import (
+    benchmark_configurations,
+    color_mode_speedups,
+    compare_to_baseline,
+    configuration_name,
+)
+
+
+def test_configurations_cross_the_color_modes():
+    configurations = benchmark_configurations(
+        ["Cave", "Tunnel"], [1], [(2, 2)], ["obj"], ["bake", "texture_sampling"]
+    )
+    assert configurations == [
+        ("Cave", 1, (2, 2), "obj", "bake"),
+        ("Cave", 1, (2, 2), "obj", "texture_sampling"),
+        ("Tunnel", 1, None, "obj", "bake"),
+        ("Tunnel", 1, None, "obj", "texture_sampling"),
+    ]
+    assert benchmark_configurations(["Tunnel"], [2], [(1, 1)], ["obj"]) == [
+        ("Tunnel", 2, None, "obj", "bake")
+    ]
+
+
+def test_default_color_mode_keeps_the_former_names():
+    assert configuration_name("Cave", 2, (1, 1), "ply_binary") == (
+        "Cave_sub_2_grid_1x1_ply_binary"
+    )
+    assert configuration_name("Tunnel", 3, None, "obj", "texture_sampling") == (
+        "Tunnel_sub_3_obj_texture_sampling"
+    )
+
+
+def result(color_mode, color_seconds, total_wall_seconds=100.0):
+    return {
+        "name": configuration_name("Tunnel", 1, None, "obj", color_mode),
+        "color_mode": color_mode,
+        "color_seconds": color_seconds,
+        "total_wall_seconds": total_wall_seconds,
+    }
+
+
+def test_color_stage_times_are_compared():
+    comparisons = color_mode_speedups(
+        [result("bake", 40.0), result("texture_sampling", 2.0)]
+    )
+    assert comparisons == [
+        "Tunnel_sub_1_obj: bake 40.0s, texture_sampling 2.0s (x20.00)"
+    ]
+    assert color_mode_speedups([result("texture_sampling", 2.0)]) == []
+
+
+def test_color_stage_regression():
+    regressions = compare_to_baseline(
+        [result("bake", 60.0)], [result("bake", 40.0)], 0.2
+    )
+    assert len(regressions) == 1
+    assert "color_seconds regressed from 40 to 60" in regressions[0]
@@ -0,0 +1,116 @@
+import numpy as np
+import pytest
+from chunked_point_cloud import (
+    POINT_CHUNK_SIZE,
+    ChunkedPointCloud,
+    write_chunked_point_cloud,
+)
+from mesh_to_arrays import MeshArrays
+
+
+def random_points(point_number, seed=0):
+    rng = np.random.default_rng(seed)
+    normals = rng.normal(size=(point_number, 3))
+    normals /= np.linalg.norm(normals, axis=1, keepdims=True)
+    return MeshArrays(
+        rng.uniform(-5.0, 5.0, size=(point_number, 3)).astype(np.float32),
+        normals.astype(np.float32),
+        rng.integers(0, 256, size=(point_number, 4), dtype=np.uint8),
+        np.empty((0, 3), dtype=np.int32),
+    )
+
+
+def written_cloud(filename, points, chunk_size, **options):
+    # The points are provided by chunks of a size unrelated to the file ones
+    chunks = [
+        MeshArrays(
+            *(
+                None if array is None else array[start : start + chunk_size]
+                for array in points[:3]
+            ),
+            points.triangles,
+        )
+        for start in range(0, len(points.positions), chunk_size)
+    ]
+    write_chunked_point_cloud(filename, chunks, [-5, -5, -5], [5, 5, 5], **options)
+    return ChunkedPointCloud(filename)
+
+
+def test_round_trip(tmp_path):
+    points = random_points(100000)
+    cloud = written_cloud(str(tmp_path / "cloud.cpc"), points, 30000)
+    assert cloud.point_number == 100000
+    assert cloud.chunk_number == 2
+    assert [chunk[3] for chunk in cloud.chunks] == [POINT_CHUNK_SIZE, 34464]
+    read = cloud.read(workers=2)
+    # 16 bits over an extent of 10
+    assert np.abs(read.positions - points.positions).max() <= 10 / 65535
+    # The normals are stored as int8 components
+    assert np.abs(read.normals - points.normals).max() < 0.02
+    assert np.allclose(np.linalg.norm(read.normals, axis=1), 1, atol=1e-6)
+    assert np.array_equal(read.colors, points.colors)
+    assert len(read.triangles) == 0
+
+
+def test_random_access(tmp_path):
+    points = random_points(3 * POINT_CHUNK_SIZE + 5)
+    cloud = written_cloud(str(tmp_path / "cloud.cpc"), points, 100000)
+    assert cloud.chunk_number == 4
+    assert cloud.chunks_of_points(0, 10) == [0]
+    assert cloud.chunks_of_points(POINT_CHUNK_SIZE - 1, POINT_CHUNK_SIZE) == [0, 1]
+    assert cloud.chunks_of_points(3 * POINT_CHUNK_SIZE, 3 * POINT_CHUNK_SIZE) == [3]
+    subset = cloud.read([1, 3])
+    assert np.array_equal(
+        subset.colors,
+        np.concatenate(
+            (
+                points.colors[POINT_CHUNK_SIZE : 2 * POINT_CHUNK_SIZE],
+                points.colors[3 * POINT_CHUNK_SIZE :],
+            )
+        ),
+    )
+    assert np.array_equal(cloud.read_chunk(3).colors, points.colors[-5:])
+
+
+def test_quantization_bits(tmp_path):
+    points = random_points(1000)
+    coarse = written_cloud(
+        str(tmp_path / "coarse.cpc"), points, 1000, quantization_bits=8
+    ).read()
+    assert np.abs(coarse.positions - points.positions).max() <= 10 / 255
+    fine = written_cloud(
+        str(tmp_path / "fine.cpc"), points, 1000, quantization_bits=32
+    ).read()
+    assert np.allclose(fine.positions, points.positions, atol=1e-5)
+    with pytest.raises(ValueError):
+        written_cloud(str(tmp_path / "wrong.cpc"), points, 1000, quantization_bits=33)
+
+
+def test_points_without_optional_fields(tmp_path):
+    points = random_points(1000)._replace(normals=None, colors=None)
+    read = written_cloud(str(tmp_path / "cloud.cpc"), points, 1000).read()
+    assert read.normals is None
+    assert read.colors is None
+    assert len(read.positions) == 1000
+
+
+def test_empty_cloud(tmp_path):
+    filename = str(tmp_path / "empty.cpc")
+    write_chunked_point_cloud(filename, [], [0, 0, 0], [1, 1, 1])
+    cloud = ChunkedPointCloud(filename)
+    assert cloud.point_number == 0
+    assert cloud.chunk_number == 0
+    assert cloud.read().positions.shape == (0, 3)
+
+
+def test_invalid_files(tmp_path):
+    not_a_cloud = tmp_path / "cloud.ply"
+    not_a_cloud.write_bytes(b"ply\nformat ascii 1.0\nend_header\n")
+    with pytest.raises(ValueError):
+        ChunkedPointCloud(str(not_a_cloud))
+    filename = str(tmp_path / "cloud.cpc")
+    written_cloud(filename, random_points(100), 100)
+    truncated = tmp_path / "truncated.cpc"
+    truncated.write_bytes(open(filename, "rb").read()[:-4])
+    with pytest.raises(ValueError):
+        ChunkedPointCloud(str(truncated))
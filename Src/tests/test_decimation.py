@@ -0,0 +1,72 @@
+import bpy
+import pytest
+from decimation import (
+    PLY_TRIANGLE_SIZE,
+    PLY_VERTEX_SIZE,
+    decimate,
+    decimation_ratio,
+    triangle_number,
+)
+
+
+@pytest.fixture
+def grid():
+    """A planar grid of 10 x 10 quads (121 vertices, 200 triangles) linked to
+    the scene (for the modifiers to be applied)"""
+    size = 11
+    vertices = [(x, y, 0) for y in range(size) for x in range(size)]
+    faces = [
+        (y * size + x, y * size + x + 1, (y + 1) * size + x + 1, (y + 1) * size + x)
+        for y in range(size - 1)
+        for x in range(size - 1)
+    ]
+    mesh = bpy.data.meshes.new("decimation_test")
+    mesh.from_pydata(vertices, [], faces)
+    UI_geometry = bpy.data.objects.new("decimation_test", mesh)
+    bpy.context.scene.collection.objects.link(UI_geometry)
+    yield UI_geometry
+    bpy.data.objects.remove(UI_geometry)
+
+
+def test_triangle_number(grid):
+    assert triangle_number(grid) == 200
+
+
+@pytest.mark.parametrize(
+    "decimate_ratio, target_faces, target_file_size, expected",
+    [
+        (None, 0, 0, None),
+        (0.3, 0, 0, 0.3),
+        (None, 50, 0, 0.25),
+        # The most constraining budget wins
+        (0.3, 50, 0, 0.25),
+        (0.1, 50, 0, 0.1),
+        # A budget above the current size never refines
+        (None, 1000, 0, 1.0),
+        (
+            None,
+            0,
+            (121 * PLY_VERTEX_SIZE + 200 * PLY_TRIANGLE_SIZE) / 2 / 1024 / 1024,
+            0.5,
+        ),
+    ],
+)
+def test_decimation_ratio(
+    grid, decimate_ratio, target_faces, target_file_size, expected
+):
+    ratio = decimation_ratio(grid, decimate_ratio, target_faces, target_file_size)
+    assert ratio == pytest.approx(expected)
+
+
+def test_empty_mesh_meets_any_target():
+    UI_geometry = bpy.data.objects.new(
+        "empty_decimation_test", bpy.data.meshes.new("empty_decimation_test")
+    )
+    assert decimation_ratio(UI_geometry, None, 50, 0.5) is None
+    assert decimation_ratio(UI_geometry, 0.5, 50, 0) == 0.5
+
+
+def test_decimate(grid):
+    decimate(grid, 0.5)
+    assert "Decimate" not in grid.modifiers
+    assert 0 < triangle_number(grid) <= 110
@@ -0,0 +1,140 @@
+import bpy
+import numpy as np
+import pytest
+from displacement_sweep import (
+    displaced_mesh_arrays,
+    displacement_field,
+    vertex_normals,
+)
+from mesh_to_arrays import (
+    MeshArrays,
+    UI_object_with_mesh_to_arrays,
+    UI_object_with_mesh_to_colors,
+    positions_to_UI_object_mesh,
+)
+
+
+@pytest.fixture
+def displaced_grid():
+    """A subdivided plane linked to the scene, displaced (along its normals)
+    by a Displace modifier of noise texture"""
+    size = 9
+    vertices = [(x, y, 0) for y in range(size) for x in range(size)]
+    faces = [
+        (y * size + x, y * size + x + 1, (y + 1) * size + x + 1, (y + 1) * size + x)
+        for y in range(size - 1)
+        for x in range(size - 1)
+    ]
+    mesh = bpy.data.meshes.new("displacement_test")
+    mesh.from_pydata(vertices, [], faces)
+    UI_geometry = bpy.data.objects.new("displacement_test", mesh)
+    bpy.context.scene.collection.objects.link(UI_geometry)
+    modifier = UI_geometry.modifiers.new("Relief", "DISPLACE")
+    modifier.texture = bpy.data.textures.new("displacement_test", "CLOUDS")
+    modifier.texture.noise_scale = 2.0
+    yield UI_geometry
+    bpy.data.objects.remove(UI_geometry)
+
+
+def evaluated_positions(UI_geometry, strength):
+    UI_geometry.modifiers["Relief"].strength = strength
+    depsgraph = bpy.context.evaluated_depsgraph_get()
+    evaluated = UI_geometry.evaluated_get(depsgraph)
+    mesh = evaluated.to_mesh()
+    positions = np.empty(len(mesh.vertices) * 3, dtype=np.float32)
+    mesh.vertices.foreach_get("co", positions)
+    evaluated.to_mesh_clear()
+    return positions.reshape(-1, 3)
+
+
+def test_field_of_a_displace_modifier_scales_linearly(displaced_grid):
+    base = evaluated_positions(displaced_grid, 0.0)
+    field = displacement_field(base, evaluated_positions(displaced_grid, 0.5), 0.5)
+    assert np.any(field != 0)
+    for strength in (-1.0, 0.25, 2.0):
+        np.testing.assert_allclose(
+            base + strength * field,
+            evaluated_positions(displaced_grid, strength),
+            atol=1e-5,
+        )
+
+
+def test_field_requires_a_non_zero_strength():
+    positions = np.zeros((3, 3), dtype=np.float32)
+    with pytest.raises(ValueError):
+        displacement_field(positions, positions, 0)
+
+
+def test_vertex_normals_of_a_pyramid():
+    # A square based pyramid without its base
+    positions = np.float32([[0, 0, 1], [1, 1, 0], [-1, 1, 0], [-1, -1, 0], [1, -1, 0]])
+    triangles = np.int32([[0, 1, 2], [0, 2, 3], [0, 3, 4], [0, 4, 1]])
+    normals = vertex_normals(positions, triangles)
+    np.testing.assert_allclose(normals[0], [0, 0, 1], atol=1e-6)
+    np.testing.assert_allclose(np.linalg.norm(normals, axis=1), 1, rtol=1e-6)
+    # The base vertices lean outward and upward
+    assert np.all(np.einsum("ij,ij->i", normals[1:, :2], positions[1:, :2]) > 0)
+    assert np.all(normals[1:, 2] > 0)
+
+
+def test_displaced_mesh_arrays():
+    mesh_arrays = MeshArrays(
+        np.float32([[0, 0, 0], [1, 0, 0], [0, 1, 0]]),
+        np.float32([[0, 0, 1]] * 3),
+        np.uint8([[255, 0, 0, 255]] * 3),
+        np.int32([[0, 1, 2]]),
+        np.float32([[[0, 0], [1, 0], [0, 1]]]),
+    )
+    # Rotate the triangle about the y axis
+    field = np.float32([[0, 0, 0], [0, 0, 1], [0, 0, 0]])
+    displaced = displaced_mesh_arrays(mesh_arrays, field, -1.0)
+    np.testing.assert_array_equal(displaced.positions[1], [1, 0, -1])
+    np.testing.assert_allclose(
+        displaced.normals, [[np.sqrt(0.5), 0, np.sqrt(0.5)]] * 3, rtol=1e-6
+    )
+    assert displaced.colors is mesh_arrays.colors
+    assert displaced.triangles is mesh_arrays.triangles
+    assert displaced.uvs is mesh_arrays.uvs
+
+
+def test_variant_positions_are_written_back(displaced_grid):
+    displaced_grid.location = (1, 2, 3)
+    displaced_grid.rotation_euler = (0.3, 0, 1.2)
+    displaced_grid.scale = (2, 1, 1)
+    bpy.context.view_layer.update()
+    base = UI_object_with_mesh_to_arrays(displaced_grid)
+    field = np.tile(np.float32([0, 0, 1]), (len(base.positions), 1))
+    field[::2] *= -1
+    variant = displaced_mesh_arrays(base, field, 0.5)
+    positions_to_UI_object_mesh(variant.positions, displaced_grid)
+    np.testing.assert_allclose(
+        UI_object_with_mesh_to_arrays(displaced_grid).positions,
+        variant.positions,
+        atol=1e-5,
+    )
+    with pytest.raises(ValueError):
+        positions_to_UI_object_mesh(variant.positions[1:], displaced_grid)
+
+
+def test_corner_colors_are_averaged_per_vertex(displaced_grid):
+    mesh = displaced_grid.data
+    assert UI_object_with_mesh_to_colors(displaced_grid) is None
+    attribute = mesh.color_attributes.new("Col", "FLOAT_COLOR", "CORNER")
+    mesh.color_attributes.active_color = attribute
+    loop_vertices = np.empty(len(mesh.loops), dtype=np.int32)
+    mesh.loops.foreach_get("vertex_index", loop_vertices)
+    # The (linear) red of the corners of each vertex alternate between 0 and 1
+    values = np.ones((len(mesh.loops), 4), dtype=np.float32)
+    values[:, 0] = np.arange(len(mesh.loops)) % 2
+    values[:, 1:3] = 0
+    attribute.data.foreach_set("color", values.ravel())
+    colors = UI_object_with_mesh_to_colors(displaced_grid)
+    assert colors.shape == (len(mesh.vertices), 4) and colors.dtype == np.uint8
+    counts = np.bincount(loop_vertices)
+    reds = np.bincount(loop_vertices, weights=values[:, 0]) / counts
+    # Only the vertices whose corners are all red (or none of them) are
+    # unaffected by the averaging of the sRGB values
+    assert np.any(reds == 1) and np.any(reds == 0)
+    np.testing.assert_array_equal(colors[reds == 1, 0], 255)
+    np.testing.assert_array_equal(colors[reds == 0, 0], 0)
+    np.testing.assert_array_equal(colors[:, 3], 255)
@@ -0,0 +1,85 @@
+import json
+import os
+import bpy
+import bmesh
+import pytest
+from chunked_point_cloud import ChunkedPointCloud
+from export_lod_pyramid import export_lod_pyramid, level_sampling
+from mesh_to_arrays import UI_object_with_mesh_to_arrays
+from sample_point_cloud import sample_point_cloud
+
+
+@pytest.fixture
+def sphere():
+    mesh = bpy.data.meshes.new("lod_test")
+    bm = bmesh.new()
+    bmesh.ops.create_uvsphere(bm, u_segments=64, v_segments=32, radius=1.0)
+    bm.to_mesh(mesh)
+    bm.free()
+    UI_geometry = bpy.data.objects.new("lod_test", mesh)
+    bpy.context.scene.collection.objects.link(UI_geometry)
+    yield UI_geometry
+    bpy.data.objects.remove(UI_geometry)
+    bpy.data.meshes.remove(mesh)
+
+
+def test_level_sampling_follows_the_face_density():
+    assert level_sampling(0.25, 1000, 0.0) == (250, 0.0)
+    assert level_sampling(0.0625, 0, 0.1) == (0, pytest.approx(0.4))
+    # A point count never vanishes
+    assert level_sampling(0.25**8, 1000, 0.0) == (1, 0.0)
+
+
+def test_levels_of_a_sampled_chunked_point_cloud(sphere, tmp_path):
+    mesh_arrays = UI_object_with_mesh_to_arrays(sphere)
+    point_cloud = sample_point_cloud(mesh_arrays, "uniform", 4000, 0.0, 1)
+    basename = os.path.join(tmp_path, "sphere_triangulation")
+    written = export_lod_pyramid(
+        sphere,
+        mesh_arrays,
+        basename,
+        3,
+        "binary",
+        True,
+        False,
+        False,
+        point_cloud,
+        "uniform",
+        4000,
+        0.0,
+        1,
+        "chunked",
+        12,
+    )
+    with open(written[-1]) as manifest_file:
+        levels = json.load(manifest_file)["levels"]
+    assert [level["point_number"] for level in levels] == [4000, 1000, 250]
+    for level in levels[1:]:
+        assert level["triangle_number"] < levels[0]["triangle_number"]
+        triangulation, cloud = level["files"]
+        assert triangulation.endswith("_lod_" + str(level["level"]) + ".ply")
+        assert cloud.endswith(".cpc")
+        assert ChunkedPointCloud(cloud).point_number == level["point_number"]
+    assert written[:-1] == levels[1]["files"] + levels[2]["files"]
+    # The files of the level 0 are listed, not written
+    assert not any(os.path.exists(filename) for filename in levels[0]["files"])
+
+
+def test_levels_of_the_vertices(sphere, tmp_path):
+    mesh_arrays = UI_object_with_mesh_to_arrays(sphere)
+    basename = os.path.join(tmp_path, "sphere_triangulation")
+    written = export_lod_pyramid(
+        sphere, mesh_arrays, basename, 2, "ascii", True, True, False
+    )
+    with open(written[-1]) as manifest_file:
+        levels = json.load(manifest_file)["levels"]
+    level = levels[1]
+    assert level["point_number"] == level["vertex_number"]
+    assert sorted(os.path.splitext(name)[1] for name in level["files"]) == [
+        ".obj",
+        ".obj",
+        ".ply",
+        ".ply",
+    ]
+    for filename in level["files"]:
+        assert os.path.getsize(filename) > 0
@@ -0,0 +1,25 @@
+import os
+import pytest
+from export_to_ply_files import derived_filename, point_cloud_filename
+
+
+@pytest.mark.parametrize(
+    "triangulation_filename, expected",
+    [
+        ("Cave_triangulation.ply", "Cave_point_cloud.ply"),
+        (
+            os.path.join("triangulation", "Cave_triangulation.ply"),
+            os.path.join("triangulation", "Cave_point_cloud.ply"),
+        ),
+        (
+            os.path.join("/tmp", "triangulation_runs", "Tunnel_triangulation.ply"),
+            os.path.join("/tmp", "triangulation_runs", "Tunnel_point_cloud.ply"),
+        ),
+    ],
+)
+def test_only_the_base_name_is_derived(triangulation_filename, expected):
+    assert point_cloud_filename(triangulation_filename) == expected
+
+
+def test_derived_kind():
+    assert derived_filename("Cave_triangulation.obj", "lod_0") == "Cave_lod_0.obj"
@@ -0,0 +1,59 @@
+import pytest
+from generator_api import NO_OUTPUTS, generation_arguments
+
+# The generator modules (whose parsers are checked) depend on bpyhelpers
+pytest.importorskip("bpyhelpers")
+
+
+def test_defaults_and_converted_values():
+    args = generation_arguments(
+        "Cave",
+        {"subdivision": 3, "relief": "0.5", "no-obj-export": True, "cache_dir": None},
+    )
+    assert args.subdivision == 3
+    assert args.relief == 0.5
+    assert args.no_obj_export
+    assert not args.no_ply_export
+    assert args.grid_size_x == 1
+    assert args.cache_dir is None
+
+
+def test_sweep_values():
+    args = generation_arguments("Tunnel", {"relief_sweep": [0.1, "0.2"]})
+    assert args.relief_sweep == [0.1, 0.2]
+
+
+@pytest.mark.parametrize(
+    "generator_name, parameters",
+    [
+        ("Labyrinth", {}),
+        ("Cave", {"unknown_option": 1}),
+        ("Cave", {"subdivision": 2.5}),
+        ("Cave", {"subdivision": True}),
+        ("Cave", {"fill_holes": "yes"}),
+        ("Cave", {"ply-format": "xml"}),
+        ("Cave", {"relief": [0.1, 0.2]}),
+        ("Tunnel", {"relief_sweep": []}),
+        ("Tunnel", {"decimate_ratio": 2}),
+        ("Cave", {"rugosity_sweep": [0.1], "relief_sweep": [0.2]}),
+    ],
+)
+def test_invalid_parameters_raise_value_errors(generator_name, parameters):
+    with pytest.raises(ValueError):
+        generation_arguments(generator_name, parameters)
+
+
+def test_no_outputs_are_valid_and_silence_every_output():
+    # Options that conflict with each other unless the outputs are off
+    parameters = {
+        "out_of_core_patches": 8,
+        "fill_holes": True,
+        "path_step": 0.5,
+        "grid_size_x": 2,
+    }
+    args = generation_arguments("Cave", {**parameters, **NO_OUTPUTS})
+    assert args.no_ply_export and args.no_obj_export
+    assert args.no_run_report
+    assert args.tile_size == 0 and args.lod_levels == 1
+    assert args.path_step == 0 and args.out_of_core_patches == 0
+    assert args.cache_dir is None
@@ -0,0 +1,113 @@
+import bpy
+import numpy as np
+import pytest
+from mesh_topology import (
+    MeshTopology,
+    UI_object_with_mesh_to_topology,
+    assert_genus_number_boundaries,
+    boundary_loop_number,
+    boundary_number,
+)
+
+
+def edges_of(faces):
+    """The (unique) edges of the given faces together with the number of
+    faces incident to each of them"""
+    edges = list()
+    for face in faces:
+        for corner in range(len(face)):
+            edges.append(sorted((face[corner], face[(corner + 1) % len(face)])))
+    return np.unique(np.array(edges), axis=0, return_counts=True)
+
+
+def tube_faces(ring_size, ring_number):
+    """The quads of an open tube made of ring_number rings of ring_size
+    vertices (the vertex k of ring r being indexed r * ring_size + k)"""
+    faces = list()
+    for ring in range(ring_number - 1):
+        for k in range(ring_size):
+            following = (k + 1) % ring_size
+            faces.append(
+                [
+                    ring * ring_size + k,
+                    ring * ring_size + following,
+                    (ring + 1) * ring_size + following,
+                    (ring + 1) * ring_size + k,
+                ]
+            )
+    return faces
+
+
+def test_closed_surface_has_no_boundary():
+    tetrahedron = [[0, 1, 2], [0, 3, 1], [1, 3, 2], [2, 3, 0]]
+    assert boundary_number(*edges_of(tetrahedron)) == 0
+
+
+def test_square_has_a_single_boundary():
+    edges, edge_face_numbers = edges_of([[0, 1, 2], [0, 2, 3]])
+    assert np.count_nonzero(edge_face_numbers == 1) == 4
+    assert boundary_number(edges, edge_face_numbers) == 1
+
+
+def test_tube_has_two_boundaries():
+    assert boundary_number(*edges_of(tube_faces(8, 5))) == 2
+
+
+def test_disjoint_tubes_boundaries_add_up():
+    faces = tube_faces(6, 3)
+    # The second tube is the first one with shifted vertex indices
+    faces += [[vertex + 18 for vertex in face] for face in tube_faces(6, 3)]
+    assert boundary_number(*edges_of(faces)) == 4
+
+
+def test_boundary_loops_of_sparse_vertex_indices():
+    loops = [[10, 2000], [2000, 7], [7, 10], [999999, 42], [42, 5], [5, 999999]]
+    assert boundary_loop_number(np.array(loops)) == 2
+    assert boundary_loop_number(np.empty((0, 2), dtype=np.int64)) == 0
+
+
+def test_long_loop_is_a_single_boundary():
+    # A long loop whose vertex indices are shuffled, so that the labels are
+    # propagated over many union-find passes
+    vertices = np.random.default_rng(0).permutation(10000)
+    loop = np.stack((vertices, np.roll(vertices, -1)), axis=1)
+    assert boundary_number(loop, np.ones(len(loop), dtype=np.int64)) == 1
+
+
+@pytest.mark.parametrize(
+    "closed, genus, boundaries",
+    [(False, 0, 2), (True, 1, 0)],
+    ids=["tube", "torus"],
+)
+def test_mesh_topology(closed, genus, boundaries):
+    ring_size, ring_number = 8, 6
+    angles = np.linspace(0, 2 * np.pi, ring_size, endpoint=False)
+    vertices = [
+        (np.cos(angle) * (2 + ring), np.sin(angle) * (2 + ring), ring)
+        for ring in range(ring_number)
+        for angle in angles
+    ]
+    faces = tube_faces(ring_size, ring_number)
+    if closed:
+        # Glue the last ring to the first one
+        last_ring = (ring_number - 1) * ring_size
+        for k in range(ring_size):
+            following = (k + 1) % ring_size
+            faces.append([last_ring + k, last_ring + following, following, k])
+    mesh = bpy.data.meshes.new("topology_test")
+    mesh.from_pydata(vertices, [], faces)
+    topology = UI_object_with_mesh_to_topology(
+        bpy.data.objects.new("topology_test", mesh)
+    )
+    assert topology.vertex_number == ring_size * ring_number
+    assert topology.face_number == len(faces)
+    assert topology.genus == genus
+    assert topology.boundary_number == boundaries
+    assert topology.boundary_edge_number == boundaries * ring_size
+
+
+def test_topology_assertion():
+    topology = MeshTopology(16, 32, 16, 0, 0, 0, 1)
+    assert_genus_number_boundaries(topology, 1, 0, "unexpected")
+    with pytest.raises(AssertionError, match="unexpected"):
+        assert_genus_number_boundaries(topology, 2, 0, "unexpected")
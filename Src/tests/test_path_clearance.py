@@ -0,0 +1,74 @@
+import bpy
+import numpy as np
+import pytest
+from mesh_to_arrays import UI_object_with_mesh_to_arrays
+from path_clearance import (
+    UI_object_with_path_to_path_graph,
+    mesh_arrays_to_bvh_tree,
+    path_clearances,
+)
+
+RING_SIZE = 32
+
+
+@pytest.fixture
+def tube():
+    """A unit radius open tube of length 4 along the x axis, placed at
+    x = 10 and carrying an Array modifier that is not applied (and thus
+    not exported)"""
+    angles = 2 * np.pi * np.arange(RING_SIZE) / RING_SIZE
+    vertices = [(x, np.cos(angle), np.sin(angle)) for x in range(5) for angle in angles]
+    faces = [
+        (
+            ring * RING_SIZE + k,
+            ring * RING_SIZE + (k + 1) % RING_SIZE,
+            (ring + 1) * RING_SIZE + (k + 1) % RING_SIZE,
+            (ring + 1) * RING_SIZE + k,
+        )
+        for ring in range(4)
+        for k in range(RING_SIZE)
+    ]
+    mesh = bpy.data.meshes.new("clearance_test")
+    mesh.from_pydata(vertices, [], faces)
+    UI_geometry = bpy.data.objects.new("clearance_test", mesh)
+    UI_geometry.location = (10, 0, 0)
+    bpy.context.scene.collection.objects.link(UI_geometry)
+    UI_geometry.modifiers.new("Array_X", "ARRAY").count = 2
+    bpy.context.view_layer.update()
+    yield UI_geometry
+    bpy.data.objects.remove(UI_geometry)
+
+
+def path_object(start, stop):
+    mesh = bpy.data.meshes.new("clearance_test_path")
+    mesh.from_pydata([start, stop], [(0, 1)], [])
+    return bpy.data.objects.new("clearance_test_path", mesh)
+
+
+def test_clearances_within_the_exported_tube(tube):
+    mesh_arrays = UI_object_with_mesh_to_arrays(tube)
+    positions = np.array([[11.0, 0, 0], [12.0, 0.5, 0], [13.0, 0, -0.25]])
+    tangents = np.tile([1.0, 0, 0], (3, 1))
+    distances, free_radii, normals = path_clearances(
+        mesh_arrays_to_bvh_tree(mesh_arrays), positions, tangents
+    )
+    inner_radius = np.cos(np.pi / RING_SIZE)
+    np.testing.assert_allclose(distances, [1.0, 0.5, 0.75], atol=1 - inner_radius)
+    np.testing.assert_allclose(free_radii, distances, atol=0.05)
+    # The normals lie in the planes of the rings
+    np.testing.assert_allclose(normals[:, 0], 0, atol=1e-6)
+
+
+def test_path_graph_ignores_the_unapplied_modifiers(tube):
+    # The path runs through the block and then through the (not exported)
+    # copy of the Array modifier
+    graph = UI_object_with_path_to_path_graph(
+        path_object((10.5, 0, 0), (17.5, 0, 0)),
+        UI_object_with_mesh_to_arrays(tube),
+        0.5,
+    )
+    inside = graph.positions[:, 0] < 13.5
+    outside = graph.positions[:, 0] > 14.5
+    assert np.all(np.isfinite(graph.free_radii[inside]))
+    assert np.all(np.isinf(graph.free_radii[outside]))
+    assert np.all(graph.surface_distances[outside] > 0.9)
@@ -0,0 +1,124 @@
+import numpy as np
+import pytest
+from path_graph import (
+    PathGraph,
+    path_tangents,
+    read_path_graph,
+    resample_path_graph,
+    write_path_graph,
+)
+
+
+def y_graph():
+    """A Y shaped graph: a trunk along the x axis of length 4 (made of two
+    edges) and two branches of length 2 (a single edge each) at its end"""
+    positions = np.array(
+        [[0, 0, 0], [2, 0, 0], [4, 0, 0], [6, 2, 0], [6, -2, 0]], dtype=np.float64
+    )
+    positions[3:] = positions[2] + 2 * (positions[3:] - positions[2]) / np.sqrt(8)
+    edges = np.array([[0, 1], [1, 2], [2, 3], [2, 4]], dtype=np.int32)
+    return positions, edges
+
+
+def square_loop(side=1.0):
+    positions = np.array(
+        [[0, 0, 0], [side, 0, 0], [side, side, 0], [0, side, 0]], dtype=np.float64
+    )
+    return positions, np.array([[0, 1], [1, 2], [2, 3], [3, 0]], dtype=np.int32)
+
+
+def degrees(vertex_number, edges):
+    return np.bincount(edges.ravel(), minlength=vertex_number)
+
+
+def edge_lengths(positions, edges):
+    return np.linalg.norm(positions[edges[:, 1]] - positions[edges[:, 0]], axis=1)
+
+
+def test_resampled_y_graph():
+    positions, edges = y_graph()
+    samples, sample_edges = resample_path_graph(positions, edges, 0.5)
+    assert sample_edges.dtype == np.int32
+    # The 1 trunk and 2 branches are split in 8, 4 and 4 edges
+    assert len(sample_edges) == 16
+    assert len(samples) == 17
+    assert np.allclose(edge_lengths(samples, sample_edges), 0.5)
+    # The branching point and the extremities are kept
+    sample_degrees = degrees(len(samples), sample_edges)
+    assert np.count_nonzero(sample_degrees == 1) == 3
+    assert np.count_nonzero(sample_degrees == 3) == 1
+    assert np.allclose(samples[sample_degrees == 3], [[4, 0, 0]])
+    assert np.allclose(
+        np.sort(samples[sample_degrees == 1], axis=0),
+        np.sort(positions[[0, 3, 4]], axis=0),
+    )
+
+
+def test_step_is_an_upper_bound():
+    positions, edges = y_graph()
+    for step in (0.3, 0.7, 1.9, 10.0):
+        samples, sample_edges = resample_path_graph(positions, edges, step)
+        assert edge_lengths(samples, sample_edges).max() <= step + 1e-9
+
+
+def test_resampled_loop():
+    samples, sample_edges = resample_path_graph(*square_loop(), 0.25)
+    assert len(samples) == len(sample_edges) == 16
+    assert np.all(degrees(len(samples), sample_edges) == 2)
+    # A coarse step still keeps a (triangular) loop
+    samples, sample_edges = resample_path_graph(*square_loop(), 100.0)
+    assert len(samples) == len(sample_edges) == 3
+
+
+def test_disjoint_components():
+    first_positions, first_edges = y_graph()
+    second_positions, second_edges = square_loop()
+    positions = np.concatenate((first_positions, second_positions + [0, 10, 0]))
+    edges = np.concatenate((first_edges, second_edges + len(first_positions)))
+    samples, sample_edges = resample_path_graph(positions, edges, 0.5)
+    assert len(sample_edges) == 16 + 8
+    assert len(samples) == 17 + 8
+
+
+def test_resampling_step_must_be_positive():
+    with pytest.raises(ValueError):
+        resample_path_graph(*y_graph(), 0.0)
+
+
+def test_empty_graph():
+    samples, sample_edges = resample_path_graph(
+        np.empty((0, 3)), np.empty((0, 2), dtype=np.int32), 1.0
+    )
+    assert samples.shape == (0, 3)
+    assert sample_edges.shape == (0, 2)
+
+
+def test_tangents():
+    samples, sample_edges = resample_path_graph(*y_graph(), 0.5)
+    tangents = path_tangents(samples, sample_edges)
+    assert np.allclose(np.linalg.norm(tangents, axis=1), 1)
+    # The trunk runs along the x axis, the branches along the diagonals
+    trunk = samples[:, 0] < 4 - 1e-9
+    assert np.allclose(np.abs(tangents[trunk, 0]), 1)
+    branches = samples[:, 0] > 4 + 1e-9
+    assert np.allclose(np.abs(tangents[branches, :2]), np.sqrt(0.5))
+
+
+def test_path_graph_round_trip(tmp_path):
+    samples, sample_edges = resample_path_graph(*y_graph(), 0.5)
+    sample_number = len(samples)
+    path_graph = PathGraph(
+        samples.astype(np.float32),
+        sample_edges,
+        path_tangents(samples, sample_edges).astype(np.float32),
+        np.ones(sample_number, dtype=np.float32),
+        np.full(sample_number, np.inf, dtype=np.float32),
+        np.tile(np.float32([0, 0, 1]), (sample_number, 1)),
+    )
+    filename = str(tmp_path / "path_graph.npz")
+    write_path_graph(filename, path_graph, 0.5)
+    read, step = read_path_graph(filename)
+    assert step == 0.5
+    for field in PathGraph._fields:
+        assert np.array_equal(getattr(read, field), getattr(path_graph, field))
+        assert getattr(read, field).dtype == getattr(path_graph, field).dtype
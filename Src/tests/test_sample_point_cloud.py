@@ -0,0 +1,121 @@
+import numpy as np
+import pytest
+from mesh_to_arrays import MeshArrays
+from sample_point_cloud import sample_point_cloud, triangle_areas
+from write_ply import CHUNK_SIZE
+
+
+def square_mesh_arrays(side=2.0):
+    """A square of the given side in the z = 0 plane, its corners colored in
+    red, green, blue and white"""
+    return MeshArrays(
+        np.float32([[0, 0, 0], [side, 0, 0], [side, side, 0], [0, side, 0]]),
+        np.tile(np.float32([0, 0, 1]), (4, 1)),
+        np.uint8([[255, 0, 0, 255], [0, 255, 0, 255], [0, 0, 255, 255], [255] * 4]),
+        np.int32([[0, 1, 2], [0, 2, 3]]),
+    )
+
+
+def concatenated_positions(point_cloud):
+    return np.concatenate([chunk.positions for chunk in point_cloud.chunks()])
+
+
+def test_triangle_areas():
+    assert np.allclose(triangle_areas(square_mesh_arrays()), [2.0, 2.0])
+
+
+def test_vertices_sampling_has_no_point_cloud():
+    assert sample_point_cloud(square_mesh_arrays(), "vertices", 100, 0, 0) is None
+
+
+def test_sampling_requires_a_count_or_a_spacing():
+    with pytest.raises(ValueError):
+        sample_point_cloud(square_mesh_arrays(), "uniform", 0, 0, 0)
+    with pytest.raises(ValueError):
+        sample_point_cloud(square_mesh_arrays(), "random", 100, 0, 0)
+
+
+def test_uniform_samples_lie_on_the_surface():
+    point_cloud = sample_point_cloud(square_mesh_arrays(), "uniform", 1000, 0, 0)
+    assert point_cloud.point_number == 1000
+    positions = concatenated_positions(point_cloud)
+    assert positions.shape == (1000, 3)
+    assert np.all(positions[:, 2] == 0)
+    assert np.all((positions[:, :2] >= 0) & (positions[:, :2] <= 2))
+    # Both (equal area) triangles are sampled about evenly
+    upper = np.count_nonzero(positions[:, 1] > positions[:, 0])
+    assert 400 < upper < 600
+    for chunk in point_cloud.chunks():
+        assert len(chunk.triangles) == 0
+        assert np.allclose(chunk.normals, [0, 0, 1])
+        assert chunk.colors.dtype == np.uint8
+
+
+def test_uniform_count_of_a_spacing():
+    point_cloud = sample_point_cloud(square_mesh_arrays(), "uniform", 0, 0.125, 0)
+    assert point_cloud.point_number == 256
+
+
+def test_uniform_chunks_are_reproducible():
+    point_cloud = sample_point_cloud(
+        square_mesh_arrays(), "uniform", CHUNK_SIZE + 10, 0, 7
+    )
+    chunks = list(point_cloud.chunks())
+    assert [len(chunk.positions) for chunk in chunks] == [CHUNK_SIZE, 10]
+    # Iterating once more (e.g. for another export format) yields the same
+    # points, another seed other points
+    assert np.array_equal(
+        np.concatenate([chunk.positions for chunk in chunks]),
+        concatenated_positions(point_cloud),
+    )
+    other = sample_point_cloud(square_mesh_arrays(), "uniform", CHUNK_SIZE + 10, 0, 8)
+    assert not np.array_equal(
+        concatenated_positions(other)[:10], chunks[0].positions[:10]
+    )
+
+
+def test_poisson_disk_samples_are_spaced():
+    spacing = 0.1
+    point_cloud = sample_point_cloud(
+        square_mesh_arrays(), "poisson_disk", 0, spacing, 0
+    )
+    positions = concatenated_positions(point_cloud).astype(np.float64)
+    assert len(positions) == point_cloud.point_number
+    # About the jamming limit of the random sequential adsorption
+    assert 150 < len(positions) < 400
+    distances = np.linalg.norm(positions[:, None] - positions[None], axis=2)
+    np.fill_diagonal(distances, np.inf)
+    assert distances.min() >= spacing * (1 - 1e-6)
+
+
+def test_poisson_disk_spacing_of_a_count():
+    point_cloud = sample_point_cloud(square_mesh_arrays(), "poisson_disk", 300, 0, 0)
+    # The spacing is derived out of the count: the count is approximate
+    assert 200 < point_cloud.point_number < 450
+
+
+def test_voxel_sampling_averages_the_vertices():
+    mesh_arrays = square_mesh_arrays()
+    # A single voxel holds all the vertices
+    point_cloud = sample_point_cloud(mesh_arrays, "voxel", 0, 10.0, 0)
+    (chunk,) = point_cloud.chunks()
+    assert point_cloud.point_number == 1
+    assert np.allclose(chunk.positions, [[1, 1, 0]])
+    assert np.allclose(chunk.normals, [[0, 0, 1]])
+    assert np.array_equal(chunk.colors, [[128, 128, 128, 255]])
+    # Each vertex in its own voxel
+    point_cloud = sample_point_cloud(mesh_arrays, "voxel", 0, 1.0, 0)
+    (chunk,) = point_cloud.chunks()
+    assert point_cloud.point_number == 4
+    assert np.array_equal(
+        np.unique(chunk.positions, axis=0), np.unique(mesh_arrays.positions, axis=0)
+    )
+
+
+def test_samples_without_optional_fields():
+    mesh_arrays = square_mesh_arrays()._replace(normals=None, colors=None)
+    for sampling in ("uniform", "poisson_disk", "voxel"):
+        point_cloud = sample_point_cloud(mesh_arrays, sampling, 100, 0, 0)
+        for chunk in point_cloud.chunks():
+            assert chunk.normals is None
+            assert chunk.colors is None
@@ -0,0 +1,101 @@
+import os
+import bpy
+import numpy as np
+import pytest
+from mesh_snapshot import MeshSnapshot
+from stage_cache import Stage, StageCache, run_stages
+
+
+def snapshot(vertex_number):
+    """A point only snapshot of about 12 bytes per vertex"""
+    return MeshSnapshot(
+        np.zeros((vertex_number, 3), dtype=np.float32),
+        np.zeros((0, 2), dtype=np.int32),
+        np.zeros(0, dtype=np.int32),
+        np.zeros(0, dtype=np.int32),
+        dict(),
+        None,
+        None,
+        dict(),
+    )
+
+
+@pytest.fixture
+def blender_pathfile(tmp_path):
+    pathfile = tmp_path / "Cave.blend"
+    pathfile.write_bytes(b"BLENDER")
+    return str(pathfile)
+
+
+def cached_keys(cache):
+    return sorted(name[: -len(".npz")] for name in os.listdir(cache.directory))
+
+
+def test_keys(tmp_path, blender_pathfile):
+    cache = StageCache(str(tmp_path / "cache"), 1, blender_pathfile)
+    key = cache.key([["array", {"count": 3}]])
+    assert key == cache.key([["array", {"count": 3}]])
+    assert key != cache.key([["array", {"count": 4}]])
+    assert key != cache.key([["array", {"count": 3}], ["remesh", {"size": 1}]])
+    # The key depends on the content of the Blender file
+    with open(blender_pathfile, "ab") as blender_file:
+        blender_file.write(b"modified")
+    other_cache = StageCache(str(tmp_path / "cache"), 1, blender_pathfile)
+    assert key != other_cache.key([["array", {"count": 3}]])
+
+
+def test_store_and_load(tmp_path, blender_pathfile):
+    cache = StageCache(str(tmp_path / "cache"), 1, blender_pathfile)
+    assert cache.load("missing") is None
+    stored = snapshot(10)._replace(
+        attributes={"crease": ("EDGE", "FLOAT", np.arange(4, dtype=np.float32))}
+    )
+    cache.store("key", stored)
+    loaded = cache.load("key")
+    assert np.array_equal(loaded.positions, stored.positions)
+    assert np.array_equal(loaded.attributes["crease"][2], np.arange(4))
+    assert cached_keys(cache) == ["key"]
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path, blender_pathfile):
+    # Two entries of about 0.4 megabytes fit in a 1 megabyte cache
+    cache = StageCache(str(tmp_path / "cache"), 1, blender_pathfile)
+    cache.store("first", snapshot(35000))
+    cache.store("second", snapshot(35000))
+    assert cached_keys(cache) == ["first", "second"]
+    # Age both entries, then use the older one
+    for age, key in ((200, "first"), (100, "second")):
+        path = os.path.join(cache.directory, key + ".npz")
+        os.utime(path, (os.path.getmtime(path) - age,) * 2)
+    cache.load("first")
+    cache.store("third", snapshot(35000))
+    assert cached_keys(cache) == ["first", "third"]
+
+
+def test_run_stages_resumes_from_cache(tmp_path, blender_pathfile):
+    cache = StageCache(str(tmp_path / "cache"), 1, blender_pathfile)
+    calls = list()
+
+    def mesh_object():
+        mesh = bpy.data.meshes.new("stage_cache_test")
+        mesh.from_pydata([(0, 0, 0), (1, 0, 0), (0, 1, 0)], [], [(0, 1, 2)])
+        return bpy.data.objects.new("stage_cache_test", mesh)
+
+    def translation(UI_geometry, name):
+        def translate():
+            calls.append(name)
+            for vertex in UI_geometry.data.vertices:
+                vertex.co.z += 1
+
+        return Stage(name, {"offset": 1}, None, translate)
+
+    UI_geometry = mesh_object()
+    stages = [translation(UI_geometry, "up"), translation(UI_geometry, "up_again")]
+    run_stages(UI_geometry, stages, cache)
+    assert calls == ["up", "up_again"]
+
+    resumed_geometry = mesh_object()
+    stages = [translation(resumed_geometry, name) for name in ("up", "up_again")]
+    run_stages(resumed_geometry, stages, cache)
+    assert calls == ["up", "up_again"]
+    assert [vertex.co.z for vertex in resumed_geometry.data.vertices] == [2, 2, 2]
@@ -0,0 +1,164 @@
+import json
+import os
+import numpy as np
+import pytest
+from chunked_point_cloud import ChunkedPointCloud
+from export_to_tiles import export_to_tiles
+from mesh_to_arrays import MeshArrays
+from sample_point_cloud import sample_point_cloud
+from tile_mesh_arrays import tile_mesh_arrays
+
+
+def grid_mesh_arrays(size=20, extent=10.0):
+    """A (triangulated) square of size x size vertices in the z = 0 plane"""
+    xs, ys = np.meshgrid(np.linspace(0, extent, size), np.linspace(0, extent, size))
+    positions = np.stack((xs.ravel(), ys.ravel(), np.zeros(size * size)), axis=1)
+    corners = (np.arange(size - 1)[:, None] * size + np.arange(size - 1)).ravel()
+    triangles = np.concatenate(
+        (
+            np.stack((corners, corners + 1, corners + size), axis=1),
+            np.stack((corners + 1, corners + size + 1, corners + size), axis=1),
+        )
+    )
+    return MeshArrays(
+        positions.astype(np.float32),
+        np.tile(np.float32([0, 0, 1]), (size * size, 1)),
+        np.arange(size * size * 4, dtype=np.uint8).reshape(-1, 4),
+        triangles.astype(np.int32),
+    )
+
+
+def test_tiles_partition_the_triangles_and_the_vertices():
+    mesh_arrays = grid_mesh_arrays()
+    tiles = list(tile_mesh_arrays(mesh_arrays, 3.0))
+    assert len(tiles) == 16
+    # Each triangle (identified by its corner positions) is in a single tile
+    tiled_triangles = np.concatenate(
+        [
+            tile.triangulation.positions[tile.triangulation.triangles].reshape(-1, 9)
+            for tile in tiles
+        ]
+    )
+    original_triangles = mesh_arrays.positions[mesh_arrays.triangles].reshape(-1, 9)
+    assert len(tiled_triangles) == len(original_triangles)
+    assert np.array_equal(
+        np.unique(tiled_triangles, axis=0), np.unique(original_triangles, axis=0)
+    )
+    # Each vertex is in the point cloud of a single tile
+    tiled_points = np.concatenate([tile.point_cloud.positions for tile in tiles])
+    assert len(tiled_points) == len(mesh_arrays.positions)
+    assert len(np.unique(tiled_points, axis=0)) == len(mesh_arrays.positions)
+
+
+def test_tile_points_lie_in_their_cell():
+    for tile in tile_mesh_arrays(grid_mesh_arrays(), 3.0):
+        points = tile.point_cloud.positions
+        # The last cells are clipped to the grid
+        assert np.all(points >= tile.lower - 1e-6)
+        assert np.all((points < tile.upper) | (points >= 9.0))
+        centroids = tile.triangulation.positions[tile.triangulation.triangles].mean(
+            axis=1
+        )
+        assert np.all(centroids >= tile.lower - 1e-6)
+        assert np.all(centroids < tile.upper)
+
+
+def test_tiles_carry_the_vertex_fields():
+    mesh_arrays = grid_mesh_arrays()
+    for tile in tile_mesh_arrays(mesh_arrays, 4.0):
+        cloud = tile.point_cloud
+        # The vertices are indexed row by row along the x axis
+        indices = np.rint(cloud.positions[:, 1] / (10.0 / 19)).astype(int) * 20
+        indices += np.rint(cloud.positions[:, 0] / (10.0 / 19)).astype(int)
+        assert np.array_equal(cloud.colors, mesh_arrays.colors[indices])
+        assert np.array_equal(cloud.normals, mesh_arrays.normals[indices])
+
+
+def test_single_tile_and_empty_geometry():
+    mesh_arrays = grid_mesh_arrays()
+    tiles = list(tile_mesh_arrays(mesh_arrays, 100.0))
+    assert len(tiles) == 1
+    assert tiles[0].coordinates == (0, 0, 0)
+    assert len(tiles[0].triangulation.triangles) == len(mesh_arrays.triangles)
+    empty = MeshArrays(
+        np.empty((0, 3), dtype=np.float32),
+        None,
+        None,
+        np.empty((0, 3), dtype=np.int32),
+    )
+    assert list(tile_mesh_arrays(empty, 1.0)) == []
+
+
+def test_export_to_tiles_index(tmp_path):
+    mesh_arrays = grid_mesh_arrays()
+    index_filename = export_to_tiles(mesh_arrays, str(tmp_path), 5.0, False)
+    with open(index_filename) as index_file:
+        index = json.load(index_file)
+    assert index["vertex_number"] == len(mesh_arrays.positions)
+    assert index["triangle_number"] == len(mesh_arrays.triangles)
+    assert len(index["tiles"]) == 4
+    assert sum(tile["point_number"] for tile in index["tiles"]) == len(
+        mesh_arrays.positions
+    )
+    assert sum(tile["triangle_number"] for tile in index["tiles"]) == len(
+        mesh_arrays.triangles
+    )
+    for tile in index["tiles"]:
+        for kind in ("triangulation", "point_cloud"):
+            with open(os.path.join(tmp_path, tile[kind]), "rb") as ply_file:
+                assert ply_file.readline() == b"ply\n"
+
+
+def test_tiles_carry_the_corner_uvs():
+    mesh_arrays = grid_mesh_arrays()
+    # The texture coordinates of a corner are the (x, y) of its vertex
+    uvs = mesh_arrays.positions[mesh_arrays.triangles][..., :2]
+    for tile in tile_mesh_arrays(mesh_arrays._replace(uvs=uvs), 3.0):
+        triangulation = tile.triangulation
+        assert np.array_equal(
+            triangulation.uvs,
+            triangulation.positions[triangulation.triangles][..., :2],
+        )
+        assert tile.point_cloud.uvs is None
+
+
+def test_tiles_partition_a_sampled_point_cloud():
+    mesh_arrays = grid_mesh_arrays()
+    points = sample_point_cloud(mesh_arrays, "uniform", 5000, 0.0, 7).points()
+    tiles = list(tile_mesh_arrays(mesh_arrays, 3.0, points))
+    assert len(tiles) == 16
+    tiled_points = np.concatenate([tile.point_cloud.positions for tile in tiles])
+    assert np.array_equal(
+        np.unique(tiled_points, axis=0), np.unique(points.positions, axis=0)
+    )
+    for tile in tiles:
+        assert len(tile.point_cloud.colors) == len(tile.point_cloud.positions)
+        assert np.all(tile.point_cloud.positions >= tile.lower - 1e-6)
+    # The triangulations are unaffected by the point cloud
+    assert sum(len(tile.triangulation.triangles) for tile in tiles) == len(
+        mesh_arrays.triangles
+    )
+
+
+@pytest.mark.parametrize("point_cloud_format", ["ply", "chunked"])
+def test_export_sampled_point_cloud_tiles(tmp_path, point_cloud_format):
+    mesh_arrays = grid_mesh_arrays()
+    point_cloud = sample_point_cloud(mesh_arrays, "poisson_disk", 0, 0.5, 3)
+    index_filename = export_to_tiles(
+        mesh_arrays, str(tmp_path), 5.0, False, point_cloud, point_cloud_format
+    )
+    with open(index_filename) as index_file:
+        index = json.load(index_file)
+    assert index["point_cloud_format"] == point_cloud_format
+    assert index["point_number"] == point_cloud.point_number
+    assert index["vertex_number"] == len(mesh_arrays.positions)
+    for tile in index["tiles"]:
+        filename = os.path.join(tmp_path, tile["point_cloud"])
+        if point_cloud_format == "chunked":
+            assert filename.endswith(".cpc")
+            cloud = ChunkedPointCloud(filename)
+            assert cloud.point_number == tile["point_number"]
+        else:
+            with open(filename, "rb") as ply_file:
+                header = ply_file.read(200)
+            assert b"element vertex " + str(tile["point_number"]).encode() in header
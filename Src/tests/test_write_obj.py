@@ -0,0 +1,93 @@
+import numpy as np
+import pytest
+from mesh_to_arrays import MeshArrays
+from sample_point_cloud import sample_point_cloud
+from write_obj import write_obj_files, write_obj_point_cloud
+
+
+@pytest.fixture
+def quad():
+    """Two triangles sharing the diagonal of the unit square"""
+    return MeshArrays(
+        np.array([[0, 0, 0], [1, 0, 0], [1, 1, 0], [0, 1, 0.5]], dtype=np.float32),
+        np.array([[0, 0, 1]] * 4, dtype=np.float32),
+        np.array(
+            [[255, 0, 0, 255], [0, 255, 0, 255], [0, 0, 255, 255], [51, 102, 0, 0]],
+            dtype=np.uint8,
+        ),
+        np.array([[0, 1, 2], [0, 2, 3]], dtype=np.int32),
+    )
+
+
+def obj_statements(filename):
+    """The lines of the given OBJ file grouped by their leading keyword"""
+    statements = dict()
+    with open(filename) as obj_file:
+        for line in obj_file:
+            keyword, _, values = line.rstrip("\n").partition(" ")
+            statements.setdefault(keyword, list()).append(values.split())
+    return statements
+
+
+def test_triangulation_and_point_cloud(tmp_path, quad):
+    triangulation_filename = str(tmp_path / "quad_triangulation.obj")
+    point_cloud_filename = str(tmp_path / "quad_point_cloud.obj")
+    write_obj_files(triangulation_filename, point_cloud_filename, quad)
+    triangulation = obj_statements(triangulation_filename)
+    assert sorted(triangulation) == ["#", "f", "v", "vn"]
+    vertices = np.array(triangulation["v"], dtype=np.float32)
+    assert vertices.shape == (4, 6)
+    assert np.array_equal(vertices[:, :3], quad.positions)
+    np.testing.assert_allclose(vertices[:, 3:], quad.colors[:, :3] / 255, atol=1e-4)
+    assert np.array_equal(np.array(triangulation["vn"], dtype=np.float32), quad.normals)
+    # One based indices, the normal sharing the index of its vertex
+    assert triangulation["f"] == [
+        ["1//1", "2//2", "3//3"],
+        ["1//1", "3//3", "4//4"],
+    ]
+    # The point cloud is the vertex set alone
+    point_cloud = obj_statements(point_cloud_filename)
+    assert sorted(point_cloud) == ["#", "v"]
+    assert point_cloud["v"] == triangulation["v"]
+
+
+@pytest.mark.parametrize("field", ["normals", "colors"])
+def test_without_optional_field(tmp_path, quad, field):
+    filename = str(tmp_path / "quad.obj")
+    write_obj_files(filename, None, quad._replace(**{field: None}))
+    statements = obj_statements(filename)
+    vertex_width = 3 if field == "colors" else 6
+    assert {len(values) for values in statements["v"]} == {vertex_width}
+    assert ("vn" in statements) == (field != "normals")
+    if field == "normals":
+        assert statements["f"] == [["1", "2", "3"], ["1", "3", "4"]]
+
+
+def test_skipped_outputs(tmp_path, quad):
+    point_cloud_filename = tmp_path / "quad_point_cloud.obj"
+    write_obj_files(None, str(point_cloud_filename), quad)
+    assert [path.name for path in tmp_path.iterdir()] == [point_cloud_filename.name]
+
+
+def test_sampled_point_cloud(tmp_path, quad):
+    point_cloud = sample_point_cloud(quad, "poisson_disk", 0, 0.1, 0)
+    filename = str(tmp_path / "quad_point_cloud.obj")
+    write_obj_point_cloud(filename, point_cloud)
+    statements = obj_statements(filename)
+    assert sorted(statements) == ["#", "v"]
+    vertices = np.array(statements["v"], dtype=np.float32)
+    assert len(vertices) == point_cloud.point_number
+    (points,) = point_cloud.chunks()
+    assert np.array_equal(vertices[:, :3], points.positions)
+
+
+def test_coordinates_round_trip(tmp_path, quad):
+    positions = np.random.default_rng(0).normal(size=(1000, 3)).astype(np.float32)
+    mesh_arrays = quad._replace(
+        positions=positions, normals=None, colors=None, triangles=quad.triangles[:0]
+    )
+    filename = str(tmp_path / "points.obj")
+    write_obj_files(None, filename, mesh_arrays)
+    assert np.array_equal(
+        np.array(obj_statements(filename)["v"], dtype=np.float32), positions
+    )
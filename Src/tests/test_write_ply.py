@@ -0,0 +1,286 @@
+import bpy
+import bmesh
+import numpy as np
+import pytest
+from mesh_to_arrays import MeshArrays, UI_object_with_mesh_to_arrays
+from sample_point_cloud import sample_point_cloud
+from write_ply import (
+    CHUNK_SIZE,
+    StreamedPlyWriter,
+    split_uv_seams,
+    write_ply_files,
+    write_ply_point_cloud,
+)
+
+PLY_TYPES = {"float": "<f4", "uchar": "u1"}
+
+
+def read_ply(filename):
+    """The header lines, the vertex records and the (triangle_number, 3)
+    triangles of a (binary little endian or ascii) PLY file"""
+    with open(filename, "rb") as ply_file:
+        header = list()
+        while not header or header[-1] != "end_header":
+            header.append(ply_file.readline().decode("ascii").rstrip("\n"))
+        body = ply_file.read()
+    vertex_fields = list()
+    vertex_number = face_number = 0
+    for line in header:
+        words = line.split()
+        if words[:2] == ["element", "vertex"]:
+            vertex_number = int(words[2])
+        elif words[:2] == ["element", "face"]:
+            face_number = int(words[2])
+        elif words[0] == "property" and words[1] != "list":
+            vertex_fields.append((words[2], PLY_TYPES[words[1]]))
+    vertex_dtype = np.dtype(vertex_fields)
+    if header[1] == "format ascii 1.0":
+        lines = body.decode("ascii").splitlines()
+        assert len(lines) == vertex_number + face_number
+        vertices = np.array(
+            [tuple(line.split()) for line in lines[:vertex_number]], dtype=vertex_dtype
+        )
+        faces = np.array(
+            [line.split() for line in lines[vertex_number:]], dtype=np.int32
+        ).reshape(-1, 4)
+        assert np.all(faces[:, 0] == 3)
+        return header, vertices, faces[:, 1:]
+    face_dtype = np.dtype([("count", "u1"), ("vertex_indices", "<i4", (3,))])
+    vertices = np.frombuffer(body, dtype=vertex_dtype, count=vertex_number)
+    faces = np.frombuffer(
+        body, dtype=face_dtype, count=face_number, offset=vertices.nbytes
+    )
+    assert len(body) == vertices.nbytes + faces.nbytes
+    assert np.all(faces["count"] == 3)
+    return header, vertices, faces["vertex_indices"]
+
+
+def columns(vertices, names):
+    return np.stack([vertices[name] for name in names], axis=1)
+
+
+def random_mesh_arrays(vertex_number, triangle_number, seed=0):
+    rng = np.random.default_rng(seed)
+    normals = rng.normal(size=(vertex_number, 3))
+    normals /= np.linalg.norm(normals, axis=1, keepdims=True)
+    return MeshArrays(
+        rng.normal(size=(vertex_number, 3)).astype(np.float32),
+        normals.astype(np.float32),
+        rng.integers(0, 256, size=(vertex_number, 4), dtype=np.uint8),
+        rng.integers(0, vertex_number, size=(triangle_number, 3), dtype=np.int32),
+    )
+
+
+@pytest.mark.parametrize(
+    "ply_format, encoding",
+    [("binary", "binary_little_endian"), ("ascii", "ascii")],
+)
+def test_round_trip(tmp_path, ply_format, encoding):
+    # More vertices than a chunk (in binary)
+    vertex_number = CHUNK_SIZE + 3 if ply_format == "binary" else 1000
+    mesh_arrays = random_mesh_arrays(vertex_number, 500)
+    triangulation_filename = str(tmp_path / "mesh_triangulation.ply")
+    point_cloud_filename = str(tmp_path / "mesh_point_cloud.ply")
+    write_ply_files(
+        triangulation_filename, point_cloud_filename, mesh_arrays, ply_format
+    )
+    header, vertices, triangles = read_ply(triangulation_filename)
+    assert header[:2] == ["ply", "format " + encoding + " 1.0"]
+    assert "element vertex " + str(vertex_number) in header
+    assert header[-3:-1] == [
+        "element face 500",
+        "property list uchar int vertex_indices",
+    ]
+    assert vertices.dtype.names == (
+        "x",
+        "y",
+        "z",
+        "nx",
+        "ny",
+        "nz",
+        "red",
+        "green",
+        "blue",
+        "alpha",
+    )
+    # Both encodings hold the float32 values exactly
+    assert np.array_equal(columns(vertices, "xyz"), mesh_arrays.positions)
+    assert np.array_equal(columns(vertices, ["nx", "ny", "nz"]), mesh_arrays.normals)
+    assert np.array_equal(
+        columns(vertices, ["red", "green", "blue", "alpha"]), mesh_arrays.colors
+    )
+    assert np.array_equal(triangles, mesh_arrays.triangles)
+    # The point cloud holds the same vertices and no face
+    cloud_header, cloud_vertices, cloud_triangles = read_ply(point_cloud_filename)
+    assert not any(line.startswith("element face") for line in cloud_header)
+    assert np.array_equal(cloud_vertices, vertices)
+    assert len(cloud_triangles) == 0
+
+
+def test_optional_fields_are_not_declared(tmp_path):
+    mesh_arrays = random_mesh_arrays(5, 2)._replace(normals=None, colors=None)
+    filename = str(tmp_path / "mesh.ply")
+    write_ply_files(filename, None, mesh_arrays)
+    header, vertices, triangles = read_ply(filename)
+    assert vertices.dtype.names == ("x", "y", "z")
+    assert [line for line in header if line.startswith("property")] == [
+        "property float x",
+        "property float y",
+        "property float z",
+        "property list uchar int vertex_indices",
+    ]
+    assert np.array_equal(triangles, mesh_arrays.triangles)
+
+
+def test_empty_geometry(tmp_path):
+    mesh_arrays = random_mesh_arrays(0, 0)
+    for ply_format in ("binary", "ascii"):
+        filename = str(tmp_path / (ply_format + ".ply"))
+        write_ply_files(filename, None, mesh_arrays, ply_format)
+        header, vertices, triangles = read_ply(filename)
+        assert "element vertex 0" in header
+        assert len(vertices) == len(triangles) == 0
+
+
+@pytest.mark.parametrize("ply_format", ["binary", "ascii"])
+def test_sampled_point_cloud(tmp_path, ply_format):
+    mesh_arrays = random_mesh_arrays(100, 50)
+    # The uniform samples come in several chunks
+    point_cloud = sample_point_cloud(mesh_arrays, "uniform", CHUNK_SIZE + 10, 0, 0)
+    filename = str(tmp_path / "point_cloud.ply")
+    write_ply_point_cloud(filename, point_cloud, ply_format)
+    header, vertices, triangles = read_ply(filename)
+    assert "element vertex " + str(CHUNK_SIZE + 10) in header
+    assert len(triangles) == 0
+    positions = np.concatenate([chunk.positions for chunk in point_cloud.chunks()])
+    assert np.array_equal(columns(vertices, "xyz"), positions)
+
+
+def test_streamed_batches_match_a_single_write(tmp_path):
+    mesh_arrays = random_mesh_arrays(CHUNK_SIZE + 100, 300)
+    write_ply_files(
+        str(tmp_path / "whole_triangulation.ply"),
+        str(tmp_path / "whole_point_cloud.ply"),
+        mesh_arrays,
+    )
+    writer = StreamedPlyWriter(
+        str(tmp_path / "streamed_triangulation.ply"),
+        str(tmp_path / "streamed_point_cloud.ply"),
+        mesh_arrays,
+    )
+    # Uneven batches of vertices and triangles
+    for start, stop in ((0, 7), (7, CHUNK_SIZE + 1), (CHUNK_SIZE + 1, None)):
+        writer.add_vertices(
+            mesh_arrays._replace(
+                positions=mesh_arrays.positions[start:stop],
+                normals=mesh_arrays.normals[start:stop],
+                colors=mesh_arrays.colors[start:stop],
+            )
+        )
+    writer.add_triangles(mesh_arrays.triangles[:100])
+    writer.add_triangles(mesh_arrays.triangles[100:])
+    writer.close()
+    for kind in ("triangulation", "point_cloud"):
+        whole = (tmp_path / ("whole_" + kind + ".ply")).read_bytes()
+        assert (tmp_path / ("streamed_" + kind + ".ply")).read_bytes() == whole
+    # The spooled batches are removed
+    assert len(list(tmp_path.iterdir())) == 4
+
+
+def test_uv_seams_are_split():
+    # Two triangles of a square sharing the diagonal (0, 2): the vertex 0 has
+    # distinct texture coordinates in both, and the vertex 4 is in none
+    mesh_arrays = MeshArrays(
+        np.float32([[0, 0, 0], [1, 0, 0], [1, 1, 0], [0, 1, 0], [5, 5, 5]]),
+        None,
+        np.arange(20, dtype=np.uint8).reshape(5, 4),
+        np.int32([[0, 1, 2], [0, 2, 3]]),
+        np.float32([[[0, 0], [1, 0], [1, 1]], [[0.5, 0.5], [1, 1], [0, 1]]]),
+    )
+    split, vertex_uvs = split_uv_seams(mesh_arrays)
+    # The vertices are numbered in the order of their first corner
+    assert np.array_equal(split.positions, mesh_arrays.positions[[0, 1, 2, 0, 3, 4]])
+    assert np.array_equal(split.colors, mesh_arrays.colors[[0, 1, 2, 0, 3, 4]])
+    assert split.normals is None and split.uvs is None
+    assert np.array_equal(split.triangles, [[0, 1, 2], [3, 2, 4]])
+    assert np.array_equal(
+        vertex_uvs, [[0, 0], [1, 0], [1, 1], [0.5, 0.5], [0, 1], [0, 0]]
+    )
+
+
+@pytest.mark.parametrize("ply_format", ["binary", "ascii"])
+def test_uvs_round_trip(tmp_path, ply_format):
+    mesh_arrays = random_mesh_arrays(300, 200, seed=1)
+    # A few distinct texture coordinates per vertex
+    rng = np.random.default_rng(2)
+    uvs = (rng.integers(0, 2, size=(200, 3, 2)) * 0.5).astype(np.float32)
+    mesh_arrays = mesh_arrays._replace(uvs=uvs + mesh_arrays.triangles[..., None])
+    triangulation_filename = str(tmp_path / "mesh_triangulation.ply")
+    point_cloud_filename = str(tmp_path / "mesh_point_cloud.ply")
+    write_ply_files(
+        triangulation_filename, point_cloud_filename, mesh_arrays, ply_format
+    )
+    header, vertices, triangles = read_ply(triangulation_filename)
+    # The texture coordinates follow the colors, as with the Blender exporter
+    assert vertices.dtype.names[-6:] == ("red", "green", "blue", "alpha", "s", "t")
+    assert len(vertices) > len(mesh_arrays.positions)
+    # Each corner keeps its vertex fields and its own texture coordinates
+    corners = vertices[triangles]
+    assert np.array_equal(
+        np.stack([corners[axis] for axis in "xyz"], axis=-1),
+        mesh_arrays.positions[mesh_arrays.triangles],
+    )
+    assert np.array_equal(
+        np.stack([corners["s"], corners["t"]], axis=-1), mesh_arrays.uvs
+    )
+    # The vertices of a same (vertex, UV) pair are shared
+    assert len(np.unique(vertices)) == len(vertices)
+    _, cloud_vertices, _ = read_ply(point_cloud_filename)
+    assert np.array_equal(cloud_vertices, vertices)
+
+
+def test_same_vertices_as_the_blender_exporter(tmp_path):
+    mesh = bpy.data.meshes.new("uv_sphere_test")
+    sphere = bmesh.new()
+    sphere.loops.layers.uv.new("UVMap")
+    bmesh.ops.create_uvsphere(
+        sphere, u_segments=12, v_segments=8, radius=1, calc_uvs=True
+    )
+    sphere.to_mesh(mesh)
+    sphere.free()
+    mesh.shade_smooth()
+    UI_geometry = bpy.data.objects.new("uv_sphere_test", mesh)
+    UI_geometry.location = (1, 2, 3)
+    bpy.context.scene.collection.objects.link(UI_geometry)
+    for UI_object in bpy.context.scene.objects:
+        UI_object.select_set(UI_object == UI_geometry)
+    bpy.context.view_layer.update()
+    blender_filename = str(tmp_path / "blender.ply")
+    bpy.ops.wm.ply_export(
+        filepath=blender_filename,
+        forward_axis="Y",
+        up_axis="Z",
+        apply_modifiers=False,
+        export_selected_objects=True,
+        export_uv=True,
+        export_normals=True,
+        export_colors="NONE",
+        export_triangulated_mesh=True,
+        ascii_format=True,
+    )
+    filename = str(tmp_path / "sphere.ply")
+    write_ply_files(filename, None, UI_object_with_mesh_to_arrays(UI_geometry))
+    bpy.data.objects.remove(UI_geometry)
+
+    def sorted_rows(vertices):
+        rows = np.stack([vertices[name] for name in vertices.dtype.names], axis=1)
+        return rows[np.lexsort(np.round(rows, 4).T[::-1])]
+
+    blender_header, blender_vertices, _ = read_ply(blender_filename)
+    header, vertices, triangles = read_ply(filename)
+    assert vertices.dtype.names == blender_vertices.dtype.names
+    assert len(triangles) == 168
+    # The triangulations of the quads may differ, not the (split) vertices
+    np.testing.assert_allclose(
+        sorted_rows(vertices), sorted_rows(blender_vertices), atol=1e-5
+    )
@@ -0,0 +1,98 @@
+import collections
+import numpy as np
+from mesh_to_arrays import MeshArrays
+
+# A tile of a regular 3D grid partitioning a geometry:
+#  - coordinates: the (i, j, k) integer coordinates of the tile in the grid,
+#  - lower, upper: the bounds of the grid cell of the tile,
+#  - triangulation: the MeshArrays of the triangles whose centroid lies in the
+#    cell (together with all their vertices, re-indexed compactly, and their
+#    UVs),
+#  - point_cloud: the MeshArrays (without triangles) of the points (by default
+#    the vertices) lying in the cell (each point belonging to a single tile).
+Tile = collections.namedtuple(
+    "Tile", ["coordinates", "lower", "upper", "triangulation", "point_cloud"]
+)
+
+
+def _subset(mesh_arrays, vertex_indices, triangles, uvs=None):
+    return MeshArrays(
+        mesh_arrays.positions[vertex_indices],
+        None if mesh_arrays.normals is None else mesh_arrays.normals[vertex_indices],
+        None if mesh_arrays.colors is None else mesh_arrays.colors[vertex_indices],
+        triangles,
+        uvs,
+    )
+
+
+def tile_mesh_arrays(mesh_arrays, tile_size, point_cloud=None):
+    """Partition a geometry along a regular 3D grid of (cubic) tiles.
+
+    The triangles (respectively the points) are assigned to tiles in bulk
+    (out of their centroid, respectively position) and sorted by tile once:
+    each tile is then a contiguous slice of the sorted arrays. The tiles are
+    generated (in order to hold a single tile at once) and only the non
+    empty ones are yielded.
+
+    Args:
+        mesh_arrays (MeshArrays): the geometry to partition
+        tile_size (float): the edge length of the tiles (in world units)
+        point_cloud (MeshArrays): the points (without triangles) partitioned
+           in place of the vertices (e.g. a sampling of the surface). The grid
+           is the one of the vertices: the points lying outside of it are
+           assigned to its border tiles.
+    Yields:
+        Tile: the non empty tiles
+    """
+    positions = mesh_arrays.positions
+    if len(positions) == 0:
+        return
+    lower = positions.min(axis=0).astype(np.float64)
+    extent = positions.max(axis=0) - lower
+    counts = np.maximum(np.ceil(extent / tile_size).astype(np.int64), 1)
+
+    def linear_tile_indexes(points):
+        coordinates = np.floor((points - lower) / tile_size).astype(np.int64)
+        np.clip(coordinates, 0, counts - 1, out=coordinates)
+        return np.ravel_multi_index(coordinates.T, counts)
+
+    triangles = mesh_arrays.triangles
+    centroids = positions[triangles[:, 0]].astype(np.float64)
+    centroids += positions[triangles[:, 1]]
+    centroids += positions[triangles[:, 2]]
+    centroids /= 3.0
+    triangle_tiles = linear_tile_indexes(centroids)
+    del centroids
+    if point_cloud is None:
+        point_cloud = mesh_arrays
+    point_tiles = linear_tile_indexes(point_cloud.positions)
+
+    triangle_order = np.argsort(triangle_tiles, kind="stable")
+    triangle_tiles = triangle_tiles[triangle_order]
+    point_order = np.argsort(point_tiles, kind="stable")
+    point_tiles = point_tiles[point_order]
+
+    for tile in np.union1d(triangle_tiles, point_tiles):
+        first, last = np.searchsorted(triangle_tiles, [tile, tile + 1])
+        tile_triangle_indices = triangle_order[first:last]
+        tile_triangles = triangles[tile_triangle_indices]
+        used_vertices, local_triangles = np.unique(tile_triangles, return_inverse=True)
+        triangulation = _subset(
+            mesh_arrays,
+            used_vertices,
+            local_triangles.reshape(-1, 3).astype(np.int32),
+            None if mesh_arrays.uvs is None else mesh_arrays.uvs[tile_triangle_indices],
+        )
+        first, last = np.searchsorted(point_tiles, [tile, tile + 1])
+        tile_points = _subset(
+            point_cloud, point_order[first:last], np.empty((0, 3), dtype=np.int32)
+        )
+        coordinates = np.unravel_index(tile, counts)
+        cell_lower = lower + np.array(coordinates) * tile_size
+        yield Tile(
+            tuple(int(c) for c in coordinates),
+            cell_lower,
+            cell_lower + tile_size,
+            triangulation,
+            tile_points,
+        )
@@ -0,0 +1,97 @@
+import numpy as np
+from write_ply import CHUNK_SIZE, encode_ascii_rows
+
+
+def _encode_vertices(mesh_arrays, start, stop):
+    # OBJ vertex colors (a widespread extension of the format) are floating
+    # values in [0, 1] that follow the coordinates on the "v" lines. Nine
+    # significant digits round trip the (float32) coordinates.
+    columns = [mesh_arrays.positions[start:stop, axis] for axis in range(3)]
+    column_formats = ["v %.9g", "%.9g", "%.9g"]
+    if mesh_arrays.colors is not None:
+        colors = mesh_arrays.colors[start:stop, :3].astype(np.float32) / 255.0
+        columns += [colors[:, channel] for channel in range(3)]
+        column_formats += ["%.4g"] * 3
+    return encode_ascii_rows(columns, column_formats)
+
+
+def _encode_normals(mesh_arrays, start, stop):
+    columns = [mesh_arrays.normals[start:stop, axis] for axis in range(3)]
+    return encode_ascii_rows(columns, ["vn %.4g", "%.4g", "%.4g"])
+
+
+def _encode_faces(mesh_arrays, start, stop):
+    # OBJ indices are one based, and vertices and normals share the same index
+    triangles = mesh_arrays.triangles[start:stop] + 1
+    if mesh_arrays.normals is None:
+        columns = [triangles[:, corner] for corner in range(3)]
+        return encode_ascii_rows(columns, ["f %d", "%d", "%d"])
+    columns = []
+    for corner in range(3):
+        columns += [triangles[:, corner], triangles[:, corner]]
+    return encode_ascii_rows(columns, ["f %d//%d", "%d//%d", "%d//%d"])
+
+
+def write_obj_files(triangulation_filename, point_cloud_filename, mesh_arrays):
+    """Write (in `OBJ` file format) both the triangulation and the point cloud
+    of the given geometry in a single pass.
+
+    Each chunk of vertices is encoded once and written to both files (the
+    point cloud being the vertex set of the triangulation). The normals and
+    faces are then appended to the triangulation file.
+
+    Args:
+        triangulation_filename (string): the name of the target OBJ file to
+           hold the triangulation (None to skip this output)
+        point_cloud_filename (string): the name of the target OBJ file to hold
+           the point cloud (None to skip this output)
+        mesh_arrays (MeshArrays): the geometry to write
+    """
+    triangulation_file = None
+    point_cloud_file = None
+    try:
+        if triangulation_filename:
+            triangulation_file = open(triangulation_filename, "wb")
+            triangulation_file.write(b"# Generated by Ribs\n")
+        if point_cloud_filename:
+            point_cloud_file = open(point_cloud_filename, "wb")
+            point_cloud_file.write(b"# Generated by Ribs\n")
+        vertex_number = len(mesh_arrays.positions)
+        for start in range(0, vertex_number, CHUNK_SIZE):
+            stop = min(start + CHUNK_SIZE, vertex_number)
+            encoded = _encode_vertices(mesh_arrays, start, stop)
+            for output in (triangulation_file, point_cloud_file):
+                if output:
+                    output.write(encoded)
+        if not triangulation_file:
+            return
+        if mesh_arrays.normals is not None:
+            for start in range(0, vertex_number, CHUNK_SIZE):
+                stop = min(start + CHUNK_SIZE, vertex_number)
+                triangulation_file.write(_encode_normals(mesh_arrays, start, stop))
+        face_number = len(mesh_arrays.triangles)
+        for start in range(0, face_number, CHUNK_SIZE):
+            stop = min(start + CHUNK_SIZE, face_number)
+            triangulation_file.write(_encode_faces(mesh_arrays, start, stop))
+    finally:
+        for output in (triangulation_file, point_cloud_file):
+            if output:
+                output.close()
+
+
+def write_obj_point_cloud(point_cloud_filename, point_cloud):
+    """Write (in `OBJ` file format) a point cloud provided by chunks, that is
+    without ever holding the whole point cloud in memory.
+
+    Args:
+        point_cloud_filename (string): the name of the target OBJ file
+        point_cloud (SampledPointCloud): the point cloud (refer to
+           sample_point_cloud.py)
+    """
+    with open(point_cloud_filename, "wb") as point_cloud_file:
+        point_cloud_file.write(b"# Generated by Ribs\n")
+        for chunk in point_cloud.chunks():
+            chunk_size = len(chunk.positions)
+            for start in range(0, chunk_size, CHUNK_SIZE):
+                stop = min(start + CHUNK_SIZE, chunk_size)
+                point_cloud_file.write(_encode_vertices(chunk, start, stop))
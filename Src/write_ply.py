@@ -0,0 +1,334 @@
+import os
+import shutil
+import tempfile
+import numpy as np
+from mesh_to_arrays import MeshArrays
+
+# Number of vertices (respectively faces) that are encoded and written at once
+CHUNK_SIZE = 1 << 18
+
+
+def _vertex_dtype(mesh_arrays, vertex_uvs=None):
+    # The properties are declared in the order of the Blender PLY exporter
+    fields = [("x", "<f4"), ("y", "<f4"), ("z", "<f4")]
+    if mesh_arrays.normals is not None:
+        fields += [("nx", "<f4"), ("ny", "<f4"), ("nz", "<f4")]
+    if mesh_arrays.colors is not None:
+        fields += [("red", "u1"), ("green", "u1"), ("blue", "u1"), ("alpha", "u1")]
+    if vertex_uvs is not None:
+        fields += [("s", "<f4"), ("t", "<f4")]
+    return np.dtype(fields)
+
+
+def split_uv_seams(mesh_arrays):
+    """Split the vertices of a geometry per (vertex, UV) pair, which is what
+    the Blender PLY exporter does in order to write the texture coordinates
+    as vertex properties: a vertex lying on a UV seam is written once per
+    distinct texture coordinate of its corners.
+
+    The split vertices are numbered in the order of their first corner, the
+    vertices of no triangle being appended (with null texture coordinates).
+
+    Args:
+        mesh_arrays (MeshArrays): the geometry (with UVs)
+    Returns:
+        (MeshArrays, numpy array): the split geometry (without the per corner
+           UVs) and the (vertex_number, 2) float32 texture coordinates of its
+           vertices
+    """
+    corner_vertices = mesh_arrays.triangles.ravel().astype(np.int64)
+    corner_uvs = np.ascontiguousarray(mesh_arrays.uvs, dtype=np.float32).reshape(-1, 2)
+    keys = np.empty(len(corner_vertices), dtype=[("vertex", "<i8"), ("uv", "<u8")])
+    keys["vertex"] = corner_vertices
+    keys["uv"] = corner_uvs.view(np.uint64).ravel()
+    _, first_corners, inverse = np.unique(keys, return_index=True, return_inverse=True)
+    order = np.argsort(first_corners)
+    ranks = np.empty(len(order), dtype=np.int64)
+    ranks[order] = np.arange(len(order))
+    first_corners = first_corners[order]
+
+    referenced = np.zeros(len(mesh_arrays.positions), dtype=bool)
+    referenced[corner_vertices] = True
+    loose_vertices = np.flatnonzero(~referenced)
+    vertices = np.concatenate((corner_vertices[first_corners], loose_vertices))
+    vertex_uvs = np.concatenate(
+        (corner_uvs[first_corners], np.zeros((len(loose_vertices), 2), np.float32))
+    )
+    split = MeshArrays(
+        mesh_arrays.positions[vertices],
+        None if mesh_arrays.normals is None else mesh_arrays.normals[vertices],
+        None if mesh_arrays.colors is None else mesh_arrays.colors[vertices],
+        ranks[inverse.ravel()].reshape(-1, 3).astype(np.int32),
+    )
+    return split, vertex_uvs
+
+
+def _header(vertex_number, face_number, vertex_dtype, ply_format):
+    # No face element is declared when face_number is None
+    ply_types = {"<f4": "float", "u1": "uchar"}
+    if ply_format == "binary":
+        encoding = "binary_little_endian"
+    else:
+        encoding = "ascii"
+    lines = [
+        "ply",
+        "format " + encoding + " 1.0",
+        "comment Generated by Ribs",
+        "element vertex " + str(vertex_number),
+    ]
+    for name in vertex_dtype.names:
+        lines.append(
+            "property "
+            + ply_types[vertex_dtype[name].str.replace("|", "")]
+            + " "
+            + name
+        )
+    if face_number is not None:
+        lines.append("element face " + str(face_number))
+        lines.append("property list uchar int vertex_indices")
+    lines.append("end_header")
+    return ("\n".join(lines) + "\n").encode("ascii")
+
+
+def _vertex_columns(mesh_arrays, vertex_uvs, start, stop):
+    # The (per field) columns of the vertices ranging from start to stop
+    columns = [mesh_arrays.positions[start:stop, axis] for axis in range(3)]
+    if mesh_arrays.normals is not None:
+        columns += [mesh_arrays.normals[start:stop, axis] for axis in range(3)]
+    if mesh_arrays.colors is not None:
+        columns += [mesh_arrays.colors[start:stop, channel] for channel in range(4)]
+    if vertex_uvs is not None:
+        columns += [vertex_uvs[start:stop, axis] for axis in range(2)]
+    return columns
+
+
+def _encode_binary_vertices(mesh_arrays, vertex_uvs, vertex_dtype, start, stop):
+    chunk = np.empty(stop - start, dtype=vertex_dtype)
+    for name, column in zip(
+        vertex_dtype.names, _vertex_columns(mesh_arrays, vertex_uvs, start, stop)
+    ):
+        chunk[name] = column
+    return chunk.tobytes()
+
+
+def encode_ascii_rows(columns, column_formats):
+    """Encode (as text lines) the rows made of the given columns.
+
+    The formatting is realized with a single string interpolation per chunk
+    (as opposed to one per row) which is much faster than `numpy.savetxt()`.
+
+    Args:
+        columns (list of numpy arrays): the columns (of identical length)
+        column_formats (list of strings): the printf style format of each column
+    Returns:
+        bytes: the encoded lines
+    """
+    row_number = len(columns[0])
+    if row_number == 0:
+        return b""
+    rows = np.empty((row_number, len(columns)), dtype=object)
+    for index, column in enumerate(columns):
+        rows[:, index] = column.tolist()
+    row_format = " ".join(column_formats) + "\n"
+    return ((row_format * row_number) % tuple(rows.ravel())).encode("ascii")
+
+
+def _encode_ascii_vertices(mesh_arrays, vertex_uvs, vertex_dtype, start, stop):
+    # Nine significant digits round trip any float32 value
+    column_formats = [
+        "%.9g" if vertex_dtype[name].kind == "f" else "%d"
+        for name in vertex_dtype.names
+    ]
+    return encode_ascii_rows(
+        _vertex_columns(mesh_arrays, vertex_uvs, start, stop), column_formats
+    )
+
+
+_FACE_DTYPE = np.dtype([("count", "u1"), ("vertex_indices", "<i4", (3,))])
+
+
+def _encode_faces(mesh_arrays, start, stop, ply_format):
+    triangles = mesh_arrays.triangles[start:stop]
+    if ply_format == "ascii":
+        columns = [np.full(len(triangles), 3)] + [triangles[:, i] for i in range(3)]
+        return encode_ascii_rows(columns, ["%d"] * 4)
+    chunk = np.empty(stop - start, dtype=_FACE_DTYPE)
+    chunk["count"] = 3
+    chunk["vertex_indices"] = triangles
+    return chunk.tobytes()
+
+
+def write_ply_files(
+    triangulation_filename, point_cloud_filename, mesh_arrays, ply_format="binary"
+):
+    """Write (in `PLY` file format) both the triangulation and the point cloud
+    of the given geometry in a single pass.
+
+    Each chunk of vertices is encoded once and written to both files (the
+    point cloud being the vertex set of the triangulation). The faces are
+    then appended to the triangulation file. When the geometry has UVs, the
+    vertices are split per texture coordinate (refer to split_uv_seams())
+    and carry them as their "s" and "t" properties.
+
+    Args:
+        triangulation_filename (string): the name of the target PLY file to
+           hold the triangulation (None to skip this output)
+        point_cloud_filename (string): the name of the target PLY file to hold
+           the point cloud (None to skip this output)
+        mesh_arrays (MeshArrays): the geometry to write
+        ply_format (string): "binary" (little endian) or "ascii"
+    """
+    vertex_uvs = None
+    if mesh_arrays.uvs is not None:
+        mesh_arrays, vertex_uvs = split_uv_seams(mesh_arrays)
+    vertex_dtype = _vertex_dtype(mesh_arrays, vertex_uvs)
+    if ply_format == "binary":
+        encode_vertices = _encode_binary_vertices
+    else:
+        encode_vertices = _encode_ascii_vertices
+    triangulation_file = None
+    point_cloud_file = None
+    try:
+        if triangulation_filename:
+            triangulation_file = open(triangulation_filename, "wb")
+            triangulation_file.write(
+                _header(
+                    len(mesh_arrays.positions),
+                    len(mesh_arrays.triangles),
+                    vertex_dtype,
+                    ply_format,
+                )
+            )
+        if point_cloud_filename:
+            point_cloud_file = open(point_cloud_filename, "wb")
+            point_cloud_file.write(
+                _header(len(mesh_arrays.positions), None, vertex_dtype, ply_format)
+            )
+        vertex_number = len(mesh_arrays.positions)
+        for start in range(0, vertex_number, CHUNK_SIZE):
+            stop = min(start + CHUNK_SIZE, vertex_number)
+            encoded = encode_vertices(
+                mesh_arrays, vertex_uvs, vertex_dtype, start, stop
+            )
+            for output in (triangulation_file, point_cloud_file):
+                if output:
+                    output.write(encoded)
+        if triangulation_file:
+            face_number = len(mesh_arrays.triangles)
+            for start in range(0, face_number, CHUNK_SIZE):
+                stop = min(start + CHUNK_SIZE, face_number)
+                triangulation_file.write(
+                    _encode_faces(mesh_arrays, start, stop, ply_format)
+                )
+    finally:
+        for output in (triangulation_file, point_cloud_file):
+            if output:
+                output.close()
+
+
+def write_ply_point_cloud(point_cloud_filename, point_cloud, ply_format="binary"):
+    """Write (in `PLY` file format) a point cloud provided by chunks, that is
+    without ever holding the whole point cloud in memory.
+
+    Args:
+        point_cloud_filename (string): the name of the target PLY file
+        point_cloud (SampledPointCloud): the point cloud (refer to
+           sample_point_cloud.py)
+        ply_format (string): "binary" (little endian) or "ascii"
+    """
+    if ply_format == "binary":
+        encode_vertices = _encode_binary_vertices
+    else:
+        encode_vertices = _encode_ascii_vertices
+    vertex_dtype = _vertex_dtype(point_cloud.layout)
+    with open(point_cloud_filename, "wb") as point_cloud_file:
+        point_cloud_file.write(
+            _header(point_cloud.point_number, None, vertex_dtype, ply_format)
+        )
+        for chunk in point_cloud.chunks():
+            chunk_size = len(chunk.positions)
+            for start in range(0, chunk_size, CHUNK_SIZE):
+                stop = min(start + CHUNK_SIZE, chunk_size)
+                point_cloud_file.write(
+                    encode_vertices(chunk, None, vertex_dtype, start, stop)
+                )
+
+
+class StreamedPlyWriter:
+    """Write (in binary `PLY` file format) a triangulation and its point cloud
+    whose vertices and triangles are provided by successive batches (e.g. the
+    patches of an out of core generation), that is without ever holding the
+    whole geometry in memory.
+
+    Since the PLY headers hold the element numbers, the encoded batches are
+    first spooled to temporary files (sitting next to the triangulation file)
+    that are eventually appended to the headers by close().
+    """
+
+    def __init__(self, triangulation_filename, point_cloud_filename, layout):
+        """
+        Args:
+            triangulation_filename (string): the name of the target PLY file to
+               hold the triangulation
+            point_cloud_filename (string): the name of the target PLY file to
+               hold the point cloud
+            layout (MeshArrays): a geometry carrying the same optional fields
+               (normals, colors) as the batches to come
+        """
+        self.triangulation_filename = triangulation_filename
+        self.point_cloud_filename = point_cloud_filename
+        self.vertex_number = 0
+        self.face_number = 0
+        self.__vertex_dtype = _vertex_dtype(layout)
+        directory = os.path.dirname(os.path.abspath(triangulation_filename))
+        self.__vertices = tempfile.TemporaryFile(dir=directory)
+        self.__faces = tempfile.TemporaryFile(dir=directory)
+
+    def add_vertices(self, mesh_arrays):
+        """Append the vertices of the given geometry (its triangles are
+        ignored): they are indexed after the previously added ones"""
+        vertex_number = len(mesh_arrays.positions)
+        for start in range(0, vertex_number, CHUNK_SIZE):
+            stop = min(start + CHUNK_SIZE, vertex_number)
+            self.__vertices.write(
+                _encode_binary_vertices(
+                    mesh_arrays, None, self.__vertex_dtype, start, stop
+                )
+            )
+        self.vertex_number += vertex_number
+
+    def add_triangles(self, triangles):
+        """Append triangles given as (global) indices of added vertices"""
+        for start in range(0, len(triangles), CHUNK_SIZE):
+            chunk = triangles[start : start + CHUNK_SIZE]
+            encoded = np.empty(len(chunk), dtype=_FACE_DTYPE)
+            encoded["count"] = 3
+            encoded["vertex_indices"] = chunk
+            self.__faces.write(encoded.tobytes())
+        self.face_number += len(triangles)
+
+    def close(self):
+        """Write the PLY files out of the spooled batches"""
+        try:
+            with open(self.triangulation_filename, "wb") as triangulation_file:
+                triangulation_file.write(
+                    _header(
+                        self.vertex_number,
+                        self.face_number,
+                        self.__vertex_dtype,
+                        "binary",
+                    )
+                )
+                self.__vertices.seek(0)
+                shutil.copyfileobj(self.__vertices, triangulation_file)
+                self.__faces.seek(0)
+                shutil.copyfileobj(self.__faces, triangulation_file)
+            with open(self.point_cloud_filename, "wb") as point_cloud_file:
+                point_cloud_file.write(
+                    _header(self.vertex_number, None, self.__vertex_dtype, "binary")
+                )
+                self.__vertices.seek(0)
+                shutil.copyfileobj(self.__vertices, point_cloud_file)
+        finally:
+            self.__vertices.close()
+            self.__faces.close()